@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routes import scan, settings, tasks, downloads, subscriptions, utils, library
+from app.api.routes import scan, settings, tasks, downloads, subscriptions, utils, library, cache
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(downloads.router, prefix="/downloads", tags=["download
 api_router.include_router(subscriptions.router, prefix="/subscriptions", tags=["subscriptions"])
 api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
 api_router.include_router(library.router, prefix="/library", tags=["library"])
+api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
\ No newline at end of file
@@ -0,0 +1,38 @@
+from typing import Optional
+from fastapi import APIRouter
+from app.services.external.tmdb_cache import TMDBCache
+from app.services.analysis.llm_cache import LLMCache
+
+router = APIRouter()
+
+@router.get("/tmdb", summary="TMDB Cache Stats")
+def get_tmdb_cache_stats():
+    """
+    Hit/miss counters (of the API process) and stored entry counts.
+    """
+    return TMDBCache.stats()
+
+@router.delete("/tmdb", summary="Clear TMDB Cache")
+def clear_tmdb_cache(endpoint: Optional[str] = None):
+    """
+    Clear cached TMDB responses.
+    - **endpoint**: Only clear one endpoint (search, tv, season, configuration)
+    """
+    removed = TMDBCache.clear(endpoint)
+    return {"status": "success", "removed": removed}
+
+@router.get("/llm", summary="LLM Cache Stats")
+def get_llm_cache_stats():
+    """
+    Hit/miss counters (of the API process) and stored entry counts.
+    """
+    return LLMCache.stats()
+
+@router.delete("/llm", summary="Clear LLM Cache")
+def clear_llm_cache(namespace: Optional[str] = None):
+    """
+    Clear cached LLM answers.
+    - **namespace**: Only clear one call site (naming, season, specials, directory)
+    """
+    removed = LLMCache.clear(namespace)
+    return {"status": "success", "removed": removed}
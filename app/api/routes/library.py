@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from typing import List, Dict, Optional
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import base64
 import os
 from loguru import logger
+from app.services.core.image_cache import DEFAULT_THUMB_WIDTH, THUMB_WIDTHS, ImageCache
 from app.services.core.library import LibraryService
+from app.services.core.streaming import RangeFileResponse, path_tokens, stat_regular_file
+from app.services.system.settings_service import SettingsService
 from app.tasks.library_tasks import task_scan_library
 
 router = APIRouter()
@@ -18,12 +24,52 @@ def trigger_scan():
     return {"status": "success", "message": "Scan started", "task_id": task.id}
 
 @router.get("/items", summary="Get Library Items")
-def get_library_items() -> List[Dict]:
+def get_library_items(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    sort: str = "updated",
+    initial: Optional[str] = None,
+    air_day: Optional[int] = None,
+    is_subscribed: Optional[bool] = None,
+    year: Optional[str] = None,
+    status: Optional[str] = None,
+):
     """
-    Get all library items from the database.
+    Get one page of library items (without overview).
+    - **cursor**: `next_cursor` of the previous page
+    - **sort**: updated | title | year | rating | air_day
+    - **initial**: first letter of the title, `#` for everything else
+    - **status**: current | ended
+
+    Responses carry an ETag/Last-Modified from the library version counter;
+    revalidation with If-None-Match answers 304 while the library is unchanged.
     """
     service = LibraryService()
-    return service.get_all_items()
+    version, changed_at = service.get_library_version()
+    etag = f'W/"library-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if changed_at:
+        headers["Last-Modified"] = format_datetime(changed_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif changed_at and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if changed_at.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        page = service.list_items(cursor=cursor, limit=limit, sort=sort, initial=initial,
+                                  air_day=air_day, is_subscribed=is_subscribed, year=year, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(page, headers=headers)
 
 @router.get("/items/{item_id}/episodes", summary="Get Item Episodes")
 async def get_item_episodes(item_id: int) -> List[Dict]:
@@ -31,6 +77,36 @@ async def get_item_episodes(item_id: int) -> List[Dict]:
     service = LibraryService()
     return await service.get_episodes(item_id)
 
+@router.get("/items/{item_id}/poster", summary="Get Item Poster Thumbnail")
+async def get_item_poster(item_id: int, w: int = DEFAULT_THUMB_WIDTH):
+    """
+    Redirect to the cached thumbnail of an item's poster, generating it on first use.
+    Falls back to the original poster URL if no thumbnail can be made.
+    """
+    if w not in THUMB_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"Width must be one of {THUMB_WIDTHS}")
+    poster = await run_in_threadpool(LibraryService.get_poster_source, item_id)
+    if not poster:
+        raise HTTPException(status_code=404, detail="Poster not found")
+
+    source, version = poster
+    try:
+        name = await ImageCache().thumbnail(source, version, w)
+    except Exception as e:
+        logger.warning(f"Failed to build poster thumbnail for item {item_id}: {e}")
+        name = None
+    target = ImageCache.thumb_url(name) if name else source
+    return RedirectResponse(target, status_code=302, headers={"Cache-Control": "no-cache"})
+
+@router.get("/thumbs/{name}", summary="Serve Poster Thumbnail")
+def get_thumbnail(name: str):
+    """Serve a cached thumbnail. Names are content hashes, so responses never change."""
+    path = ImageCache.thumb_path(name)
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    ImageCache.touch(name)
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 @router.delete("/items/{item_id}", summary="Delete Library Item")
 def delete_library_item(
     item_id: int, 
@@ -48,36 +124,26 @@ def delete_library_item(
         raise HTTPException(status_code=404, detail="Item not found or failed to delete")
     return {"status": "success", "message": "Item deleted"}
 
-@router.get("/stream/{encoded_path}", summary="Stream Video")
-def stream_video(encoded_path: str):
-    """Stream a video file."""
+@router.api_route("/stream/{encoded_path}", methods=["GET", "HEAD"], summary="Stream Video")
+async def stream_video(encoded_path: str, request: Request):
+    """
+    Stream a video file with single/multi-range support (Range, If-Range, If-None-Match).
+    """
     try:
-        # Decode path
-        missing_padding = len(encoded_path) % 4
-        if missing_padding:
-            encoded_path += '=' * (4 - missing_padding)
-        file_path = base64.urlsafe_b64decode(encoded_path).decode()
+        file_path = path_tokens.resolve(encoded_path)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid encoded path")
 
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="File not found")
-
-        # Basic range support provided by FileResponse
-        import mimetypes
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if not mime_type:
-            # Fallback for common types if system registry is minimal
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext == '.mkv':
-                mime_type = 'video/x-matroska'
-            elif ext == '.mp4':
-                mime_type = 'video/mp4'
-            else:
-                mime_type = "application/octet-stream"
-
-        return FileResponse(file_path, media_type=mime_type, filename=os.path.basename(file_path))
-    except Exception as e:
-        logger.error(f"Error streaming video: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    st = await run_in_threadpool(stat_regular_file, file_path)
+    if st is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        chunk_kb = int(SettingsService.get_setting("app.stream_chunk_size_kb", "1024"))
+    except (TypeError, ValueError):
+        chunk_kb = 1024
+    return RangeFileResponse(file_path, st, request.headers, chunk_size=chunk_kb * 1024,
+                             head=request.method == "HEAD")
 
 @router.get("/image/{encoded_path}", summary="Serve Local Image")
 def get_library_image(encoded_path: str):
@@ -16,6 +16,7 @@ router = APIRouter()
 
 class ScanRequest(BaseModel):
     directory_path: str
+    bypass_llm_cache: bool = False  # 忽略已缓存的 LLM 结果
 
 @router.post("/scan")
 async def scan_directory(
@@ -38,7 +39,7 @@ async def scan_directory(
     db.refresh(task)
     
     # 提交到任务队列
-    execute_scan_task(task.id)
+    execute_scan_task(task.id, request.bypass_llm_cache)
     
     return {
         "task_id": task.id,
@@ -12,6 +12,7 @@ from app.services.external.mikan import MikanService
 from app.services.external.bangumi import BangumiService
 from app.services.external.tmdb_service import TMDBService
 from app.services.system.settings_service import SettingsService
+from app.services.core.subscription_filter import subscription_filters
 
 router = APIRouter()
 mikan_service = MikanService()
@@ -212,8 +213,12 @@ def update_subscription(
     # If subgroup changed, update RSS URL
     if "subgroup_id" in payload:
         sub.rss_url = mikan_service.get_rss_url(sub.mikan_id, payload.get("subgroup_id"))
+
+    # Filters or feed may have changed: the next poll must process the whole feed again
+    sub.rss_etag = sub.rss_last_modified = sub.rss_body_hash = None
         
     db.commit()
+    subscription_filters.invalidate(id)
     return sub
 
 @router.delete("/{id}", summary="Delete Subscription")
@@ -279,6 +284,7 @@ def delete_subscription(
     logger.info("Deleting subscription from database...")
     db.delete(sub)
     db.commit()
+    subscription_filters.invalidate(id)
     logger.info(f"✅ Subscription {id} deleted from database")
     return {"message": "Deleted"}
 
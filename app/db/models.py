@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text, JSON, DateTime, ForeignKey, Float
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, Text, JSON, DateTime, ForeignKey, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -17,6 +17,14 @@ class Setting(Base):
     description = Column(Text)  # Help text
     order = Column(Integer, default=0)  # Display order
 
+class VersionCounter(Base):
+    """Monotonic change counters shared by the API and worker processes"""
+    __tablename__ = "version_counters"
+
+    name = Column(String, primary_key=True)  # e.g. "settings"
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 # Legacy models - will be removed after migration
 
 
@@ -103,6 +111,11 @@ class Subscription(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # RSS 条件请求缓存（ETag / Last-Modified / 内容哈希）
+    rss_etag = Column(String)
+    rss_last_modified = Column(String)
+    rss_body_hash = Column(String)
+
 class RSSItem(Base):
     __tablename__ = "rss_items"
     
@@ -149,6 +162,8 @@ class LibraryItem(Base):
     vote_average = Column(Float)
     overview = Column(Text)
     is_subscribed = Column(Boolean, default=False)
+    meta_hash = Column(String)  # Hash of the scanned metadata, unchanged rows are skipped on rescan
+    fingerprint = Column(String)  # Folder mtime, video count, season dirs, poster mtime; unchanged folders skip enrichment
 
     def to_dict(self):
         return {
@@ -167,6 +182,25 @@ class LibraryItem(Base):
             "bangumi_id": self.bangumi_id
         }
 
+    # Columns of the poster wall listing (to_summary), everything except the long texts
+    SUMMARY_COLUMNS = ("id", "title", "path", "poster_path", "season_count", "updated_at",
+                       "year", "status", "air_day", "vote_average", "is_subscribed")
+
+    def to_summary(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "path": self.path,
+            "poster_url": self.poster_path,
+            "season_count": self.season_count,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "year": self.year,
+            "status": self.status,
+            "air_day": self.air_day,
+            "vote_average": self.vote_average,
+            "is_subscribed": self.is_subscribed
+        }
+
 class BangumiEpisode(Base):
     """Cache for Bangumi episode metadata"""
     __tablename__ = "bangumi_episodes"
@@ -179,6 +213,15 @@ class BangumiEpisode(Base):
     summary = Column(Text)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
+class BangumiFetchQueueEntry(Base):
+    """Library items waiting for a Bangumi metadata fetch (deduplicated by item id)"""
+    __tablename__ = "bangumi_fetch_queue"
+
+    item_id = Column(Integer, primary_key=True)
+    queued_at = Column(DateTime, default=datetime.utcnow, index=True)
+    claimed_by = Column(String)  # 领取该条目的 worker 批次（租约）
+    claimed_at = Column(DateTime)  # 租约开始时间，过期后可被重新领取
+
 class BangumiSubjectMapping(Base):
     """Maps LibraryItem + Season to Bangumi Subject ID"""
     __tablename__ = "bangumi_subject_mapping"
@@ -187,3 +230,46 @@ class BangumiSubjectMapping(Base):
     season = Column(Integer, primary_key=True)
     subject_id = Column(Integer)
 
+
+class TMDBCacheEntry(Base):
+    """Persistent cache for TMDB API responses"""
+    __tablename__ = "tmdb_cache"
+
+    key = Column(String, primary_key=True)  # sha1 of endpoint + params + language
+    endpoint = Column(String, index=True)  # "search", "tv", "season", "configuration"
+    payload = Column(Text)  # JSON response body, NULL when TMDB answered 404
+    is_negative = Column(Boolean, default=False)  # Empty result, cached with a shorter TTL
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+class LLMCacheEntry(Base):
+    """Persistent cache for parsed LLM responses"""
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of namespace + prompt template + model + canonical input
+    namespace = Column(String, index=True)  # "naming", "season", "specials", "directory"
+    model = Column(String)
+    response = Column(Text)  # Parsed JSON returned by the model
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+class ImageCacheEntry(Base):
+    """Downloaded poster originals and generated thumbnails under data/image_cache"""
+    __tablename__ = "image_cache"
+
+    key = Column(String, primary_key=True)  # sha1 of kind + source (+ version, width for thumbnails)
+    kind = Column(String)  # "original" or "thumb"
+    file = Column(String)  # Path relative to the cache directory, thumbnails are named by content hash
+    size = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_access = Column(DateTime, default=datetime.utcnow, index=True)
+
+class DirectorySnapshot(Base):
+    """Last known listing of one directory, used for incremental filesystem scans"""
+    __tablename__ = "directory_snapshots"
+
+    path = Column(String, primary_key=True)
+    mtime_ns = Column(BigInteger, default=0)  # Directory mtime when listed, 0 = list again next time
+    files = Column(JSON, default=dict)  # {name: [size, mtime_ns, inode]}
+    subdirs = Column(JSON, default=list)  # [name, ...]
+    scanned_at = Column(DateTime, default=datetime.utcnow)
@@ -61,11 +61,18 @@ def init_db():
             {"key": "llm.model", "value": "gpt-4-turbo", "name": "模型名称", "class_type": "text", "options": None, "category": "llm", "description": "使用的 LLM 模型名称", "order": 4},
         ]
 
+        settings_added = False
         for setting_data in default_settings:
             # Check by key to avoid duplicates
             if not session.query(Setting).filter_by(key=setting_data["key"]).first():
                 setting = Setting(**setting_data)
                 session.add(setting)
+                settings_added = True
+
+        if settings_added:
+            # Let processes holding a settings cache pick up the new keys
+            from app.db.versions import bump_version
+            bump_version(session, "settings")
 
         # 2. Init LLMConfig
         if not session.query(LLMConfig).first():
@@ -0,0 +1,33 @@
+"""
+Helpers for the shared version counters (see VersionCounter).
+
+A process that caches table data locally compares the counter with the
+version it loaded; any writer bumps the counter in the same transaction
+as its change, so other processes notice on their next check.
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.db.models import VersionCounter
+
+
+def get_version(db: Session, name: str) -> int:
+    """Return the current version of a counter (0 if it was never bumped)"""
+    version = db.query(VersionCounter.version).filter(VersionCounter.name == name).scalar()
+    return version or 0
+
+
+def get_version_info(db: Session, name: str) -> Tuple[int, Optional[datetime]]:
+    """Return (version, time of the last bump) of a counter, (0, None) if it was never bumped"""
+    row = db.query(VersionCounter.version, VersionCounter.updated_at).filter(VersionCounter.name == name).first()
+    return (row[0] or 0, row[1]) if row else (0, None)
+
+
+def bump_version(db: Session, name: str) -> None:
+    """Increment a counter. The caller is responsible for committing."""
+    updated = db.query(VersionCounter).filter(VersionCounter.name == name).update(
+        {VersionCounter.version: VersionCounter.version + 1, VersionCounter.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(VersionCounter(name=name, version=1, updated_at=datetime.utcnow()))
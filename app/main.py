@@ -5,7 +5,7 @@ import webbrowser
 import os
 from contextlib import asynccontextmanager # Added for lifespan
 from contextlib import asynccontextmanager
-from app.api.routes import scan, settings, downloads, tasks, subscriptions, logs, library, utils
+from app.api.routes import scan, settings, downloads, tasks, subscriptions, logs, library, utils, cache
 from app.core.logger import setup_logger
 
 @asynccontextmanager
@@ -15,11 +15,16 @@ async def lifespan(app: FastAPI):
     # Initialize DB on startup
     from app.db.session import init_db
     from app.services.system.settings_service import SettingsService
+    from app.services.external.http_client import HttpClients
+    from app.services.analysis.llm_client import LLMClients
     init_db()
     SettingsService.initialize_defaults()
+    # Pooled keep-alive clients for TMDB / Bangumi, owned by the server loop
+    HttpClients.open()
     yield
     # Shutdown
-    pass
+    await HttpClients.aclose()
+    await LLMClients.aclose()
 
 app = FastAPI(title="Hoshino API", lifespan=lifespan)
 
@@ -41,6 +46,7 @@ app.include_router(subscriptions.router, prefix="/api/subscription", tags=["subs
 app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
 app.include_router(library.router, prefix="/api/library", tags=["library"])
 app.include_router(utils.router, prefix="/api/utils", tags=["utils"])
+app.include_router(cache.router, prefix="/api/cache", tags=["cache"])
 
 # 挂载静态文件 (仅在生产环境下且存在 dist 目录时)
 from fastapi.staticfiles import StaticFiles
@@ -53,24 +53,21 @@ class DirectoryAnalyzer:
     """Analyzes directories to identify anime series"""
     
     @staticmethod
-    async def analyze_directory(files: List[FileNode]) -> DirectoryInfo:
+    async def analyze_directory(files: List[FileNode], bypass_cache: bool = False) -> DirectoryInfo:
         """
         Analyze a directory of files to identify if they belong to the same anime
         
         Args:
             files: List of FileNode objects
+            bypass_cache: Ignore cached answers (the fresh answer is still stored)
             
         Returns:
             DirectoryInfo with analysis results
         """
         from .llm_engine import LLMEngine
-        from app.services.system.settings_service import SettingsService
-        from openai import AsyncOpenAI
         
         # Get LLM settings
-        api_key = SettingsService.get_setting("llm.api_key", "")
-        base_url = SettingsService.get_setting("llm.base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-        model = SettingsService.get_setting("llm.model", "qwen-plus")
+        api_key, _, model = LLMEngine._settings()
         
         if not api_key:
             # Return low confidence if no API key
@@ -81,37 +78,28 @@ class DirectoryAnalyzer:
                 reasoning="LLM API key not configured"
             )
         
-        # Prepare file list
-        file_list = "\n".join([f"- {f.name}" for f in files[:50]])  # Limit to 50 files
+        # Prepare file list (sorted, so the same folder always yields the same prompt)
+        file_names = sorted(f.name for f in files)[:50]  # Limit to 50 files
+        file_list = "\n".join([f"- {name}" for name in file_names])
         prompt = DIRECTORY_ANALYSIS_PROMPT.format(files=file_list)
         
-        # Create client
-        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-        
         try:
             # Enable structured output for Qwen models
             extra_params = {}
             if model.startswith("qwen"):
                 extra_params["response_format"] = {"type": "json_object"}
             
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
+            return await LLMEngine._complete_json(
+                "directory", DIRECTORY_ANALYSIS_PROMPT, file_names,
+                [
                     {"role": "system", "content": "你是专业的动漫文件整理助手,擅长分析文件命名模式。"},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.1,
+                parse=lambda data: DirectoryInfo(**data),
+                bypass_cache=bypass_cache,
                 **extra_params
             )
             
-            content = response.choices[0].message.content
-            # Clean up response
-            content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON
-            data = json.loads(content)
-            return DirectoryInfo(**data)
-            
         except Exception as e:
             print(f"Directory analysis error: {e}")
             # Return low confidence on error
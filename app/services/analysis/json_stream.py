@@ -0,0 +1,64 @@
+"""
+Incremental JSON parsing for streamed LLM answers.
+"""
+import json
+from typing import Any, List
+
+class JSONArrayStream:
+    """
+    Extracts the objects of the first JSON array in a text stream as soon as
+    each one is complete. Text around the array (markdown fences,
+    `{"results": ...}`) is ignored, so partial answers stay usable when the
+    stream breaks.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.count = 0  # Objects found so far
+        self.opened = False  # Target array started
+        self.closed = False  # Target array finished
+        self._pos = 0
+        self._depth = 0
+        self._array_depth = None
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Add streamed text, return the objects completed by it"""
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+                if ch == "[" and not self.opened:
+                    self.opened = True
+                    self._array_depth = self._depth
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._start = self._pos
+            elif ch in "]}":
+                if self._array_depth is not None:
+                    if ch == "}" and self._start is not None and self._depth == self._array_depth + 1:
+                        self.count += 1
+                        try:
+                            items.append(json.loads(buffer[self._start:self._pos + 1]))
+                        except ValueError:
+                            pass  # Malformed element, the caller retries the files it is missing
+                        self._start = None
+                    elif ch == "]" and self._depth == self._array_depth:
+                        self.closed = True
+                        self._array_depth = None
+                self._depth -= 1
+            self._pos += 1
+        return items
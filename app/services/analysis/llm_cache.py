@@ -0,0 +1,150 @@
+"""
+Persistent cache of LLM answers (stored in hoshino.db).
+
+Keys combine the call site, a hash of the prompt template, the model and a
+canonical JSON form of the input, so reprocessing an unchanged folder costs
+no tokens while editing a prompt or switching models invalidates naturally.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from loguru import logger
+from sqlalchemy import func
+from app.db.session import SessionLocal
+from app.db.models import LLMCacheEntry
+
+# Sentinel returned by LLMCache.get when nothing usable is cached
+MISS = object()
+
+class LLMCache:
+    """SQLite-backed cache of parsed LLM JSON responses"""
+
+    DEFAULT_TTL_HOURS = 720  # 30 days
+    # Expired rows are purged every N writes
+    PURGE_EVERY = 200
+
+    # Per-process counters
+    _stats = {"hits": 0, "misses": 0, "writes": 0}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        from app.services.system.settings_service import SettingsService
+        return SettingsService.get_setting("llm.cache_enabled", "true") == "true"
+
+    @classmethod
+    def ttl(cls) -> timedelta:
+        from app.services.system.settings_service import SettingsService
+        try:
+            hours = float(SettingsService.get_setting("llm.cache_ttl_hours", str(cls.DEFAULT_TTL_HOURS)))
+        except (TypeError, ValueError):
+            hours = cls.DEFAULT_TTL_HOURS
+        return timedelta(hours=hours)
+
+    @staticmethod
+    def make_key(namespace: str, prompt: str, model: str, data: Any) -> str:
+        """
+        Build the cache key. `prompt` is the template (not the rendered prompt),
+        `data` the canonical input; callers sort file lists before passing them.
+        """
+        template_version = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        raw = json.dumps([namespace, template_version, model, data], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _count(cls, name: str):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    @classmethod
+    def get(cls, key: str) -> Any:
+        """Return the cached response or MISS"""
+        if not cls.enabled():
+            return MISS
+
+        try:
+            with SessionLocal() as db:
+                entry = db.query(LLMCacheEntry).filter(
+                    LLMCacheEntry.key == key,
+                    LLMCacheEntry.expires_at > datetime.utcnow()
+                ).first()
+                if not entry:
+                    cls._count("misses")
+                    return MISS
+
+                cls._count("hits")
+                return json.loads(entry.response)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return MISS
+
+    @classmethod
+    def put(cls, namespace: str, key: str, model: str, data: Any):
+        """Store a successfully parsed response"""
+        if not cls.enabled():
+            return
+
+        now = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                db.merge(LLMCacheEntry(
+                    key=key,
+                    namespace=namespace,
+                    model=model,
+                    response=json.dumps(data, ensure_ascii=False),
+                    created_at=now,
+                    expires_at=now + cls.ttl()
+                ))
+                db.commit()
+
+            with cls._lock:
+                cls._stats["writes"] += 1
+                should_purge = cls._stats["writes"] % cls.PURGE_EVERY == 0
+            if should_purge:
+                cls.purge_expired()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    @staticmethod
+    def purge_expired() -> int:
+        """Delete expired rows, returns the number removed"""
+        with SessionLocal() as db:
+            removed = db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+        return removed
+
+    @staticmethod
+    def clear(namespace: Optional[str] = None) -> int:
+        """Remove all entries (or only those of one call site)"""
+        with SessionLocal() as db:
+            query = db.query(LLMCacheEntry)
+            if namespace:
+                query = query.filter(LLMCacheEntry.namespace == namespace)
+            removed = query.delete(synchronize_session=False)
+            db.commit()
+        return removed
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Hit/miss counters of this process plus a summary of stored entries"""
+        with cls._lock:
+            counters = dict(cls._stats)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+
+        with SessionLocal() as db:
+            rows = db.query(
+                LLMCacheEntry.namespace, func.count(LLMCacheEntry.key)
+            ).group_by(LLMCacheEntry.namespace).all()
+            expired = db.query(func.count(LLMCacheEntry.key)).filter(LLMCacheEntry.expires_at <= datetime.utcnow()).scalar() or 0
+
+        return {
+            "enabled": cls.enabled(),
+            "counters": counters,
+            "entries": {namespace: count for namespace, count in rows},
+            "expired_entries": expired,
+        }
@@ -0,0 +1,102 @@
+"""
+Shared AsyncOpenAI clients.
+
+One client (and one keep-alive httpx pool) per event loop is reused by every
+LLM call. It is rebuilt only when the API key, base URL or the llm.* pool
+settings change, so analysing many directories pays the TLS handshake once.
+A replaced client is closed once the calls still running on it are done.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Set
+import httpx
+from openai import AsyncOpenAI
+from loguru import logger
+
+class _PooledClient:
+    """A client with the settings it was built from and its number of running calls"""
+
+    def __init__(self, signature: tuple, client: AsyncOpenAI):
+        self.signature = signature
+        self.client = client
+        self.users = 0
+        self.retired = False
+
+class LLMClients:
+    """Registry of pooled AsyncOpenAI clients"""
+
+    # event loop -> current client
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PooledClient]" = weakref.WeakKeyDictionary()
+    # Clients replaced after a settings change while calls were still running on them
+    _retired: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Set[_PooledClient]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _pool_settings() -> tuple:
+        from app.services.system.settings_service import SettingsService
+
+        return (
+            int(SettingsService.get_setting("llm.max_connections", "10")),
+            int(SettingsService.get_setting("llm.max_keepalive_connections", "5")),
+            float(SettingsService.get_setting("llm.timeout", "120")),
+            float(SettingsService.get_setting("llm.connect_timeout", "10")),
+        )
+
+    @staticmethod
+    def _build(api_key: str, base_url: str, pool: tuple) -> AsyncOpenAI:
+        max_connections, max_keepalive, timeout, connect_timeout = pool
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout)
+        )
+        logger.debug(f"Opening pooled LLM client for {base_url}")
+        # 429/503 are retried by RateLimiter("llm"), which also pauses the other callers
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+    @staticmethod
+    async def _close(pooled: _PooledClient):
+        try:
+            await pooled.client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close LLM client: {e}")
+
+    @classmethod
+    @asynccontextmanager
+    async def use(cls, api_key: str, base_url: str) -> AsyncIterator[AsyncOpenAI]:
+        """
+        Client of the running event loop for the duration of a call, rebuilt when settings changed.
+        A replaced client is closed as soon as its last running call is done.
+        """
+        loop = asyncio.get_running_loop()
+        signature = (api_key, base_url) + cls._pool_settings()
+
+        pooled = cls._clients.get(loop)
+        if pooled is None or pooled.signature != signature or pooled.client.is_closed():
+            previous = pooled
+            pooled = cls._clients[loop] = _PooledClient(signature, cls._build(api_key, base_url, signature[2:]))
+            if previous is not None:
+                previous.retired = True
+                if previous.users:
+                    cls._retired.setdefault(loop, set()).add(previous)
+                else:
+                    await cls._close(previous)
+
+        pooled.users += 1
+        try:
+            yield pooled.client
+        finally:
+            pooled.users -= 1
+            if pooled.retired and not pooled.users:
+                cls._retired.get(loop, set()).discard(pooled)
+                await cls._close(pooled)
+
+    @classmethod
+    async def aclose(cls):
+        """Close every client that belongs to the running event loop"""
+        loop = asyncio.get_running_loop()
+        clients = cls._retired.pop(loop, set())
+        current = cls._clients.pop(loop, None)
+        if current is not None:
+            clients.add(current)
+        for pooled in clients:
+            await cls._close(pooled)
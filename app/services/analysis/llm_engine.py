@@ -1,10 +1,15 @@
 from app.db.session import SessionLocal
 from app.db.models import LLMConfig
+import asyncio
 import json
 from openai import AsyncOpenAI
 from app.models.payload import AnimeNamingPayload
 from app.models.result import AnimeNamingResult, BatchNamingResult
 from loguru import logger
+from app.services.external.rate_limiter import RateLimiter
+from app.services.analysis.llm_cache import LLMCache, MISS
+from app.services.analysis.llm_client import LLMClients
+from app.services.analysis.json_stream import JSONArrayStream
 
 SYSTEM_PROMPT = """
 你是一个专业的动漫文件整理专家。
@@ -38,7 +43,101 @@ SYSTEM_PROMPT = """
 }
 """
 
+SEASON_MATCH_PROMPT = """
+你是一个动漫元数据整理专家。
+我将提供一组文件名，以及 TMDB 上该作品的季度列表 (季度编号、名称、首播日期、集数)。
+你的任务是判断这些文件属于哪一季。
+
+规则:
+1. 结合文件名中的标题后缀 (如 "Zoku", "2nd Season", "续")、年份与集数范围，和 TMDB 季度名称、首播日期、集数进行比对。
+2. OVA / SP / Special 属于 Season 0。
+3. 如果无法确定，请降低置信度。
+
+输出格式 (JSON):
+{
+  "best_match_season": 2,
+  "confidence": 0.9,
+  "reasoning": "文件名包含 Zoku，对应 TMDB 第二季"
+}
+"""
+
 class LLMEngine:
+    # Extra attempts for a naming chunk whose answer was truncated or malformed
+    CHUNK_RETRIES = 2
+
+    @staticmethod
+    def _settings():
+        """(api_key, base_url, model) from the settings table"""
+        from app.services.system.settings_service import SettingsService
+
+        api_key = SettingsService.get_setting("llm.api_key", "")
+        base_url = SettingsService.get_setting("llm.base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+        model = SettingsService.get_setting("llm.model", "qwen-plus")
+        return api_key, base_url, model
+
+    @staticmethod
+    async def _complete_json(namespace: str, template: str, cache_input, messages: list, parse=None, bypass_cache: bool = False, **params):
+        """
+        Run a chat completion and return its parsed JSON answer, going through LLMCache.
+        `template` and `cache_input` (canonical, order-independent input) form the cache key;
+        `parse` converts the JSON and must raise on unusable answers, which are not cached.
+        """
+        api_key, base_url, model = LLMEngine._settings()
+        parse = parse or (lambda data: data)
+        key = LLMCache.make_key(namespace, template, model, cache_input)
+
+        if not bypass_cache:
+            cached = LLMCache.get(key)
+            if cached is not MISS:
+                logger.debug(f"LLM cache hit ({namespace})")
+                return parse(cached)
+
+        async with LLMClients.use(api_key, base_url) as client:
+            response = await RateLimiter.for_upstream("llm").call(
+                client.chat.completions.create,
+                model=model,
+                messages=messages,
+                temperature=0.1,
+                **params
+            )
+
+        content = response.choices[0].message.content
+        # Basic cleanup if model adds markdown logic
+        content = content.replace("```json", "").replace("```", "").strip()
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            logger.debug(f"Raw content: {content}")
+            raise
+
+        result = parse(data)
+        LLMCache.put(namespace, key, model, data)
+        return result
+
+    @staticmethod
+    def _expect_dict(data) -> dict:
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(data)}")
+        return data
+
+    @staticmethod
+    def _to_batch(data) -> BatchNamingResult:
+        """Accept the response formats models actually return, raise ValueError otherwise"""
+        if isinstance(data, list):
+            # Model returned array directly
+            return BatchNamingResult(results=[AnimeNamingResult(**item) for item in data])
+        if isinstance(data, dict):
+            if "results" in data:
+                # Standard format with results field
+                return BatchNamingResult(results=[AnimeNamingResult(**item) for item in data["results"]])
+            # Single object or malformed - try to parse as single result
+            logger.warning(f"LLM Warning: Response missing 'results' field. Data: {data}")
+            try:
+                return BatchNamingResult(results=[AnimeNamingResult(**data)])
+            except Exception:
+                raise ValueError("Cannot parse response as AnimeNamingResult")
+        raise ValueError(f"Unexpected response type: {type(data)}")
+
     @staticmethod
     async def test_connection(config: LLMConfig) -> bool:
         """
@@ -60,135 +159,220 @@ class LLMEngine:
             return False
 
     @staticmethod
-    async def analyze(payload: AnimeNamingPayload) -> BatchNamingResult:
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count: CJK characters ~1 token each, other text ~4 characters per token"""
+        cjk = sum(1 for ch in text if ord(ch) > 0x2E80)
+        return cjk + (len(text) - cjk) // 4 + 1
+
+    @staticmethod
+    def _chunk_payload(payload: AnimeNamingPayload, budget: int) -> list[AnimeNamingPayload]:
+        """Split the file list into chunks whose prompt stays within `budget` tokens; every chunk keeps the shared context"""
+        base = LLMEngine._estimate_tokens(SYSTEM_PROMPT) + LLMEngine._estimate_tokens(
+            payload.model_copy(update={"files": []}).model_dump_json()
+        )
+
+        chunks, current, used = [], [], base
+        for file_node in payload.files:
+            # Each file costs its JSON plus roughly one result object in the answer
+            cost = LLMEngine._estimate_tokens(file_node.model_dump_json()) * 3
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used = [], base
+            current.append(file_node)
+            used += cost
+        if current:
+            chunks.append(current)
+        return [payload.model_copy(update={"files": files}) for files in chunks]
+
+    @staticmethod
+    async def _stream_completion(messages: list, **params):
+        """Stream a chat completion, yielding text deltas"""
+        api_key, base_url, model = LLMEngine._settings()
+        limiter = RateLimiter.for_upstream("llm")
+        async with LLMClients.use(api_key, base_url) as client:
+            for attempt in range(limiter.MAX_RETRIES + 1):
+                # The slot is held until the stream is consumed
+                async with limiter.slot():
+                    try:
+                        stream = await client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=0.1,
+                            stream=True,
+                            **params
+                        )
+                    except Exception as e:
+                        if limiter.retry_error(e, attempt):
+                            continue
+                        raise
+                    async with stream:
+                        async for event in stream:
+                            if event.choices and event.choices[0].delta.content:
+                                yield event.choices[0].delta.content
+                    return
+
+    @staticmethod
+    async def _stream_naming(payload: AnimeNamingPayload):
+        """Yield naming results as soon as each element of the answer array is complete"""
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": payload.model_dump_json()}
+        ]
+        parser = JSONArrayStream()
+        async for text in LLMEngine._stream_completion(messages):
+            for item in parser.feed(text):
+                try:
+                    yield AnimeNamingResult(**item)
+                except Exception as e:
+                    logger.warning(f"LLM Warning: Skipping invalid result {item}: {e}")
+
+        if parser.opened and not parser.closed:
+            raise ValueError(f"Response truncated after {parser.count} results")
+        if not parser.opened:
+            # No array in the answer (e.g. a single object) - parse it as a whole
+            content = parser.buffer.replace("```json", "").replace("```", "").strip()
+            for result in LLMEngine._to_batch(json.loads(content)).results:
+                yield result
+
+    @staticmethod
+    async def _stream_chunk(payload: AnimeNamingPayload, emit, bypass_cache: bool = False):
         """
-        Sends payload to LLM and returns structured result.
+        Name one chunk, passing each result to `emit` as it arrives.
+        When the stream breaks, the results already parsed are kept and only the
+        remaining files are sent again.
+        """
+        _, _, model = LLMEngine._settings()
+        # File order does not change the answer, so it is not part of the key
+        cache_input = payload.model_dump()
+        cache_input["files"] = sorted(cache_input["files"], key=lambda f: (f["rel_path"], f["name"]))
+        key = LLMCache.make_key("naming", SYSTEM_PROMPT, model, cache_input)
+
+        if not bypass_cache:
+            cached = LLMCache.get(key)
+            if cached is not MISS:
+                for result in LLMEngine._to_batch(cached).results:
+                    await emit(result)
+                return
+
+        results = []
+        named = set()
+        for attempt in range(LLMEngine.CHUNK_RETRIES + 1):
+            remaining = [f for f in payload.files if f.name not in named]
+            if not remaining:
+                break
+            try:
+                async for result in LLMEngine._stream_naming(payload.model_copy(update={"files": remaining})):
+                    if result.original_name in named:
+                        continue
+                    named.add(result.original_name)
+                    results.append(result)
+                    await emit(result)
+            except json.JSONDecodeError as e:
+                logger.error(f"LLM Error: Invalid JSON response - {e} (attempt {attempt + 1}, {len(named)}/{len(payload.files)} files named)")
+            except Exception as e:
+                logger.error(f"LLM Error: {e} (attempt {attempt + 1}, {len(named)}/{len(payload.files)} files named)")
+            else:
+                # Complete answer (files the model left out are not asked again)
+                LLMCache.put("naming", key, model, {"results": [r.model_dump() for r in results]})
+                return
+            if attempt < LLMEngine.CHUNK_RETRIES:
+                await asyncio.sleep(attempt + 1)
+
+    @staticmethod
+    async def analyze_stream(payload: AnimeNamingPayload, bypass_cache: bool = False):
+        """
+        Stream naming results (in chunk order) while they are being generated.
+        Large directories are split into token-budgeted chunks that run in parallel;
+        results of later chunks are held back until the earlier ones are done.
         """
-        # Fetch settings from new settings service
         from app.services.system.settings_service import SettingsService
-        
-        api_key = SettingsService.get_setting("llm.api_key", "")
-        base_url = SettingsService.get_setting("llm.base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-        model = SettingsService.get_setting("llm.model", "qwen-plus")
-        
+
+        api_key, _, _ = LLMEngine._settings()
         if not api_key:
             logger.error("LLM Error: No API Key configured")
-            return BatchNamingResult(results=[])
+            return
 
-        # Initialize Client Per Request (or cached if settings haven't changed)
-        # For simplicity and thread-safety, we init here. Overhead is low for httpx client usually.
-        client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        budget = max(500, int(SettingsService.get_setting("llm.chunk_token_budget", "3000")))
+        parallel = max(1, int(SettingsService.get_setting("llm.max_parallel_chunks", "4")))
+        chunks = LLMEngine._chunk_payload(payload, budget)
+        if len(chunks) > 1:
+            logger.info(f"LLM naming: {len(payload.files)} files split into {len(chunks)} chunks")
+
+        semaphore = asyncio.Semaphore(parallel)
+        queues = [asyncio.Queue() for _ in chunks]
+        done = object()
+
+        async def run(index: int, chunk: AnimeNamingPayload):
+            try:
+                async with semaphore:
+                    await LLMEngine._stream_chunk(chunk, queues[index].put, bypass_cache)
+            except Exception as e:
+                logger.error(f"LLM Error: {e}")
+            finally:
+                queues[index].put_nowait(done)
 
+        tasks = [asyncio.ensure_future(run(i, chunk)) for i, chunk in enumerate(chunks)]
         try:
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": payload.model_dump_json()}
-                ],
-                # response_format={"type": "json_object"}, # Ensure valid JSON (if model supports it)
-                temperature=0.1
-            )
-            
-            content = response.choices[0].message.content
-            # Basic cleanup if model adds markdown logic
-            content = content.replace("```json", "").replace("```", "").strip()
-            
-            data = json.loads(content)
-            
-            # Handle different response formats
-            if isinstance(data, list):
-                # Model returned array directly
-                results = [AnimeNamingResult(**item) for item in data]
-                return BatchNamingResult(results=results)
-            elif isinstance(data, dict):
-                if "results" in data:
-                    # Standard format with results field
-                    results = [AnimeNamingResult(**item) for item in data["results"]]
-                    return BatchNamingResult(results=results)
-                else:
-                    # Single object or malformed - try to parse as single result
-                    logger.warning(f"LLM Warning: Response missing 'results' field. Data: {data}")
-                    # Try to parse as single AnimeNamingResult
-                    try:
-                        result = AnimeNamingResult(**data)
-                        return BatchNamingResult(results=[result])
-                    except:
-                        # Cannot parse, return empty
-                        logger.error("LLM Error: Cannot parse response as AnimeNamingResult")
-                        return BatchNamingResult(results=[])
-            else:
-                logger.error(f"LLM Error: Unexpected response type: {type(data)}")
-                return BatchNamingResult(results=[])
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    yield item
+        finally:
+            # The consumer stopped early (or was cancelled): wait for the chunks to unwind
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-        except json.JSONDecodeError as e:
-            logger.error(f"LLM Error: Invalid JSON response - {e}")
-            logger.debug(f"Raw content: {content}")
-            return BatchNamingResult(results=[])
-        except Exception as e:
-            logger.error(f"LLM Error: {e}")
-            return BatchNamingResult(results=[])
+    @staticmethod
+    async def analyze(payload: AnimeNamingPayload, bypass_cache: bool = False) -> BatchNamingResult:
+        """
+        Sends payload to LLM and returns structured result.
+        """
+        results = [result async for result in LLMEngine.analyze_stream(payload, bypass_cache)]
+        return BatchNamingResult(results=results)
 
     @staticmethod
-    async def identify_season_with_context(files: list[str], tmdb_seasons: list[dict]) -> dict:
+    async def identify_season_with_context(files: list[str], tmdb_seasons: list[dict], bypass_cache: bool = False) -> dict:
         """
         Ask LLM to identify season based on files and TMDB context.
         """
-        from app.services.system.settings_service import SettingsService
-        
-        api_key = SettingsService.get_setting("llm.api_key", "")
-        base_url = SettingsService.get_setting("llm.base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-        model = SettingsService.get_setting("llm.model", "qwen-plus")
-
+        api_key, _, _ = LLMEngine._settings()
         if not api_key:
             return None
 
-        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-
         # Prepare context
         context_data = {
-            "files": files[:10], # Limit to first 10 files to save context
+            "files": sorted(files)[:10], # Limit to first 10 files to save context
             "tmdb_seasons": tmdb_seasons
         }
 
         try:
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
+            return await LLMEngine._complete_json(
+                "season", SEASON_MATCH_PROMPT, context_data,
+                [
                     {"role": "system", "content": SEASON_MATCH_PROMPT},
                     {"role": "user", "content": json.dumps(context_data, ensure_ascii=False)}
                 ],
-                temperature=0.1
+                parse=LLMEngine._expect_dict,
+                bypass_cache=bypass_cache
             )
             
-            content = response.choices[0].message.content
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
-            
         except Exception as e:
             logger.error(f"LLM Season Match Error: {e}")
             return None
 
     @staticmethod
-    async def identify_specials_with_context(files: list[str], tmdb_specials: list[dict]) -> dict:
+    async def identify_specials_with_context(files: list[str], tmdb_specials: list[dict], bypass_cache: bool = False) -> dict:
         """
         Ask LLM to map special files (OVAs, CMs) to TMDB Season 0 episodes.
         Returns: { "filename": episode_number, ... }
         """
-        from app.services.system.settings_service import SettingsService
-        
-        api_key = SettingsService.get_setting("llm.api_key", "")
-        base_url = SettingsService.get_setting("llm.base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-        model = SettingsService.get_setting("llm.model", "qwen-plus")
-
+        api_key, _, _ = LLMEngine._settings()
         if not api_key:
             return {}
 
-        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-
         SPECIALS_MATCH_PROMPT = """
 你是一个动漫元数据整理专家。
 我将提供一组被识别为 "Specials" (Season 0) 的文件名列表，以及 TMDB 上的 Season 0 剧集列表。
@@ -220,23 +404,20 @@ class LLMEngine:
         ]
 
         context_data = {
-            "files": files,
+            "files": sorted(files),
             "tmdb_specials": simple_specials
         }
 
         try:
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
+            result = await LLMEngine._complete_json(
+                "specials", SPECIALS_MATCH_PROMPT, context_data,
+                [
                     {"role": "system", "content": SPECIALS_MATCH_PROMPT},
                     {"role": "user", "content": json.dumps(context_data, ensure_ascii=False)}
                 ],
-                temperature=0.1
+                parse=LLMEngine._expect_dict,
+                bypass_cache=bypass_cache
             )
-            
-            content = response.choices[0].message.content
-            content = content.replace("```json", "").replace("```", "").strip()
-            result = json.loads(content)
             return result.get("mappings", {})
             
         except Exception as e:
@@ -0,0 +1,81 @@
+"""
+Persistent, deduplicated queue of library items waiting for a Bangumi metadata fetch.
+
+Items are keyed by id, so queueing an item that is already waiting is a no-op.
+Workers lease items in batches: one UPDATE marks a batch with the worker's claim
+token, and rows are only deleted once their fetch succeeded. Items of a failed
+fetch or of a crashed worker stay leased and are claimed again when the lease
+expires, so nothing queued is ever lost. Claiming needs no UPDATE ... RETURNING
+and works on any SQLite version.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+from loguru import logger
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from app.db.session import SessionLocal
+from app.db.models import BangumiFetchQueueEntry
+
+# Leased items not completed within this delay are handed out again
+LEASE = timedelta(minutes=30)
+
+class BangumiFetchQueue:
+    @staticmethod
+    def push(item_ids: Iterable[int]) -> int:
+        """Queue items, returns how many were not waiting yet"""
+        now = datetime.utcnow()
+        rows = [{"item_id": item_id, "queued_at": now} for item_id in dict.fromkeys(item_ids)]
+        if not rows:
+            return 0
+        table = BangumiFetchQueueEntry.__table__
+        stmt = insert(table)
+        try:
+            with SessionLocal() as db:
+                # An item leased by a running fetch is queued again: its data may have changed since
+                result = db.connection().execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["item_id"],
+                        set_={"queued_at": stmt.excluded.queued_at, "claimed_by": None, "claimed_at": None},
+                        where=table.c.claimed_by.isnot(None),
+                    ),
+                    rows,
+                )
+                db.commit()
+                return result.rowcount
+        except Exception as e:
+            logger.error(f"Failed to queue Bangumi fetch for {len(rows)} items: {e}")
+            return 0
+
+    @staticmethod
+    def claim(limit: int) -> Tuple[str, List[int]]:
+        """Lease up to `limit` of the oldest available items, returns (claim token, item ids)"""
+        table = BangumiFetchQueueEntry.__table__
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        available = select(table.c.item_id).where(
+            or_(table.c.claimed_by.is_(None), table.c.claimed_at < now - LEASE)
+        ).order_by(table.c.queued_at).limit(limit).scalar_subquery()
+        with SessionLocal() as db:
+            db.execute(update(table).where(table.c.item_id.in_(available)).values(claimed_by=token, claimed_at=now))
+            ids = db.execute(select(table.c.item_id).where(table.c.claimed_by == token)).scalars().all()
+            db.commit()
+        return token, ids
+
+    @staticmethod
+    def complete(token: str, item_ids: Iterable[int]):
+        """Remove items fetched under a claim (items queued again meanwhile are kept)"""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        table = BangumiFetchQueueEntry.__table__
+        with SessionLocal() as db:
+            db.execute(delete(table).where(table.c.claimed_by == token, table.c.item_id.in_(item_ids)))
+            db.commit()
+
+    @staticmethod
+    def leased() -> int:
+        """Number of items currently leased (being fetched, or waiting for their lease to expire)"""
+        table = BangumiFetchQueueEntry.__table__
+        with SessionLocal() as db:
+            return db.query(BangumiFetchQueueEntry).filter(table.c.claimed_by.isnot(None)).count()
@@ -0,0 +1,204 @@
+"""
+Local cache of library posters with fixed-width thumbnails.
+
+Originals (TMDB URLs) are downloaded once into data/image_cache/originals;
+thumbnails are written to data/image_cache/thumbs named by the hash of their
+content, so their URLs can be cached by browsers forever. Entries are evicted
+least-recently-used first when the cache exceeds app.image_cache_mb.
+Resizing needs Pillow; without it the original image is cached and served as is.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from loguru import logger
+from app.db.session import SessionLocal, DATA_DIR
+from app.db.models import ImageCacheEntry
+from app.services.core.streaming import path_tokens
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+CACHE_DIR = os.path.join(DATA_DIR, "image_cache")
+THUMB_WIDTHS = (185, 342, 500, 780)  # Same steps as the TMDB poster sizes
+DEFAULT_THUMB_WIDTH = 342
+THUMB_URL_PREFIX = "/api/library/thumbs/"
+LOCAL_IMAGE_PREFIX = "/api/library/image/"
+THUMB_NAME = re.compile(r"^[0-9a-f]{32}\.(webp|jpg|png|gif)$")
+
+# last_access is only rewritten when older than this, serving a thumbnail is read-only otherwise
+TOUCH_INTERVAL = timedelta(hours=1)
+
+def _key(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def _thumb_key(source: str, version: Optional[str], width: int) -> str:
+    return _key("thumb", source, version or "", width)
+
+def _render(original: str, width: int) -> Tuple[bytes, str]:
+    """Resize an image to `width` (never upscaled), returns (bytes, extension)"""
+    if not PIL_AVAILABLE:
+        ext = os.path.splitext(original)[1].lower().lstrip(".")
+        with open(original, "rb") as f:
+            return f.read(), "jpg" if ext == "jpeg" else (ext if ext in ("webp", "png", "gif") else "jpg")
+
+    with Image.open(original) as img:
+        img.load()
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        if Image.registered_extensions().get(".webp"):
+            img.save(out, "WEBP", quality=82, method=4)
+            return out.getvalue(), "webp"
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+        return out.getvalue(), "jpg"
+
+class ImageCache:
+    """Poster originals and thumbnails, indexed in the image_cache table"""
+
+    def __init__(self):
+        from app.services.system.settings_service import SettingsService
+        try:
+            self.budget = int(float(SettingsService.get_setting("app.image_cache_mb", "512")) * 1024 * 1024)
+        except (TypeError, ValueError):
+            self.budget = 512 * 1024 * 1024
+
+    @staticmethod
+    def thumb_url(name: str) -> str:
+        return THUMB_URL_PREFIX + name
+
+    @staticmethod
+    def thumb_path(name: str) -> Optional[str]:
+        """File of a thumbnail URL name, None for names that are not thumbnails"""
+        return os.path.join(CACHE_DIR, "thumbs", name) if THUMB_NAME.match(name) else None
+
+    @staticmethod
+    def lookup(sources: Iterable[Tuple[str, Optional[str]]], width: int = DEFAULT_THUMB_WIDTH) -> Dict[Tuple[str, Optional[str]], str]:
+        """Existing thumbnail names for (source, version) pairs, in one query"""
+        keys = {_thumb_key(source, version, width): (source, version) for source, version in sources}
+        if not keys:
+            return {}
+        with SessionLocal() as db:
+            rows = db.query(ImageCacheEntry.key, ImageCacheEntry.file).filter(ImageCacheEntry.key.in_(list(keys))).all()
+        return {keys[key]: os.path.basename(file) for key, file in rows}
+
+    @staticmethod
+    def touch(name: str):
+        """Mark a thumbnail as used (throttled to one write per TOUCH_INTERVAL)"""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            db.query(ImageCacheEntry).filter(
+                ImageCacheEntry.file == os.path.join("thumbs", name),
+                ImageCacheEntry.last_access < now - TOUCH_INTERVAL
+            ).update({"last_access": now}, synchronize_session=False)
+            db.commit()
+
+    @staticmethod
+    def _get(key: str) -> Optional[str]:
+        """Cached file of a key, None if unknown or missing on disk"""
+        with SessionLocal() as db:
+            entry = db.query(ImageCacheEntry).filter(ImageCacheEntry.key == key).first()
+            if entry is None:
+                return None
+            path = os.path.join(CACHE_DIR, entry.file)
+            if not os.path.exists(path):
+                db.delete(entry)
+                db.commit()
+                return None
+            entry.last_access = datetime.utcnow()
+            db.commit()
+            return path
+
+    def _put(self, key: str, kind: str, file: str, data: bytes):
+        path = os.path.join(CACHE_DIR, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with SessionLocal() as db:
+            db.merge(ImageCacheEntry(key=key, kind=kind, file=file, size=len(data),
+                                     created_at=datetime.utcnow(), last_access=datetime.utcnow()))
+            db.commit()
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits the size budget"""
+        with SessionLocal() as db:
+            rows = db.query(ImageCacheEntry.key, ImageCacheEntry.file, ImageCacheEntry.size)\
+                .order_by(ImageCacheEntry.last_access).all()
+            total = sum(size or 0 for _, _, size in rows)
+            if total <= self.budget:
+                return
+            # Thumbnails are content-addressed and may be shared by several keys
+            users = Counter(file for _, file, _ in rows)
+            victims = []
+            for key, file, size in rows:
+                if total <= self.budget:
+                    break
+                victims.append(key)
+                total -= size or 0
+                users[file] -= 1
+                if users[file] == 0:
+                    try:
+                        os.remove(os.path.join(CACHE_DIR, file))
+                    except FileNotFoundError:
+                        pass
+            for i in range(0, len(victims), 500):
+                db.query(ImageCacheEntry).filter(ImageCacheEntry.key.in_(victims[i:i + 500]))\
+                    .delete(synchronize_session=False)
+            db.commit()
+        logger.info(f"Image cache: evicted {len(victims)} entries to stay within {self.budget // (1024 * 1024)} MB")
+
+    async def _original(self, source: str) -> Optional[str]:
+        """Local file of a poster source: the library file itself, or the downloaded URL"""
+        if source.startswith(LOCAL_IMAGE_PREFIX):
+            try:
+                path = path_tokens.resolve(source[len(LOCAL_IMAGE_PREFIX):])
+            except ValueError:
+                return None
+            return path if os.path.isfile(path) else None
+        if not source.startswith(("http://", "https://")):
+            return None
+
+        key = _key("original", source)
+        path = await asyncio.to_thread(self._get, key)
+        if path:
+            return path
+
+        from app.services.external.http_client import HttpClients
+        resp = await HttpClients.get("images").get(source, follow_redirects=True)
+        resp.raise_for_status()
+        ext = os.path.splitext(source.split("?", 1)[0])[1].lower() or ".jpg"
+        file = os.path.join("originals", key + ext)
+        await asyncio.to_thread(self._put, key, "original", file, resp.content)
+        return os.path.join(CACHE_DIR, file)
+
+    async def thumbnail(self, source: str, version: Optional[str] = None,
+                        width: int = DEFAULT_THUMB_WIDTH) -> Optional[str]:
+        """
+        Thumbnail name (content hash + extension) of a poster source, generated on first use.
+        `version` changes the key when a local poster file may have been replaced.
+        """
+        key = _thumb_key(source, version, width)
+        path = await asyncio.to_thread(self._get, key)
+        if path:
+            return os.path.basename(path)
+
+        original = await self._original(source)
+        if not original:
+            return None
+        data, ext = await asyncio.to_thread(_render, original, width)
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+        await asyncio.to_thread(self._put, key, "thumb", os.path.join("thumbs", name), data)
+        return name
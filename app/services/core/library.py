@@ -1,14 +1,79 @@
+import asyncio
+import hashlib
+import json
 import os
 import re
-from typing import List, Optional, Dict
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Dict, Set, Tuple
 from loguru import logger
 from app.services.system.settings_service import SettingsService
 from app.services.external.tmdb_service import TMDBService
+from app.services.core.snapshot import SnapshotIndex
+from app.db.versions import bump_version, get_version_info
+
+# Version counter bumped with every change to library_items (ETag of the item listing)
+LIBRARY_VERSION_KEY = "library"
+
+class EpisodeIndexCache:
+    """
+    In-process LRU of scanned episode files per library item.
+    Entries remember the mtime of every directory of the series folder: a file the
+    organizer moves in (or removes) changes its directory's mtime, so an entry is only
+    served while a stat of those directories still matches. Keys add the item's path and
+    the library version, so a rescan in any process invalidates the entry as well.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        # item id -> (key, videos, seasons, {directory: mtime_ns})
+        self._entries: "OrderedDict[int, Tuple[Tuple, List[Dict], Set[int], Dict[str, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unchanged(dirs: Dict[str, int]) -> bool:
+        """True if every directory still has the recorded mtime (0 = unknown, never matches)"""
+        for path, mtime_ns in dirs.items():
+            try:
+                if not mtime_ns or os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def get(self, item_id: int, key: Tuple) -> Optional[Tuple[List[Dict], Set[int]]]:
+        """Cached (videos, seasons) of an item, None if missing or stale. Stats the directories."""
+        with self._lock:
+            entry = self._entries.get(item_id)
+        if entry is None or entry[0] != key or not self._unchanged(entry[3]):
+            return None
+        with self._lock:
+            if item_id in self._entries:
+                self._entries.move_to_end(item_id)
+        return entry[1], entry[2]
+
+    def put(self, item_id: int, key: Tuple, videos: List[Dict], seasons: Set[int], dirs: Dict[str, int]):
+        with self._lock:
+            self._entries[item_id] = (key, videos, seasons, dirs)
+            self._entries.move_to_end(item_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, item_id: Optional[int] = None):
+        with self._lock:
+            if item_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(item_id, None)
+
+episode_cache = EpisodeIndexCache()
 
 class AnimeItem:
     def __init__(self, title: str, path: str, poster_url: Optional[str] = None, season_count: int = 0,
                  year: str = None, status: str = None, air_day: int = None, tmdb_id: int = None,
-                 vote_average: float = 0.0, overview: str = None):
+                 vote_average: float = 0.0, overview: str = None, fingerprint: str = None,
+                 enriched: bool = True):
         self.title = title
         self.path = path
         self.poster_url = poster_url
@@ -19,6 +84,10 @@ class AnimeItem:
         self.tmdb_id = tmdb_id
         self.vote_average = vote_average
         self.overview = overview
+        # Fingerprint of the folder contents; enriched=False means it matched the stored
+        # fingerprint and the metadata fields were not fetched
+        self.fingerprint = fingerprint
+        self.enriched = enriched
 
     def to_dict(self):
         return {
@@ -32,6 +101,9 @@ class AnimeItem:
         }
 
 class LibraryService:
+    BATCH_SIZE = 500  # Rows per IN (...) query, stays below SQLite's variable limit
+    WRITE_BATCH_SIZE = 100  # Processed folders per upsert transaction during a scan
+
     def __init__(self):
         self.settings = SettingsService()
         self.tmdb = TMDBService()
@@ -47,10 +119,9 @@ class LibraryService:
             return {"added": 0, "updated": 0, "removed": 0}
 
         from app.db.session import SessionLocal
-        from app.db.models import LibraryItem, Subscription
-        from datetime import datetime
+        from app.db.models import Subscription
 
-        stats = {"added": 0, "updated": 0, "removed": 0}
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
         
         # Load subscriptions for matching
         with SessionLocal() as db:
@@ -59,10 +130,13 @@ class LibraryService:
             def normalize(s): return re.sub(r'\s+', '', s.lower()) if s else ""
             sub_map = {normalize(s.title): True for s in subs}
         
-        # Track current paths to identify deletions at the end
-        current_paths = set()
-
         try:
+            # Refresh the directory snapshot: only folders whose mtime changed are listed again
+            index = SnapshotIndex(target_path)
+            diff = index.refresh()
+            logger.info(f"Library snapshot: +{len(diff.added)} -{len(diff.removed)} ~{len(diff.modified)} files "
+                        f"({diff.listed_dirs} dirs listed, {diff.reused_dirs} reused)")
+
             # Find all candidate anime folders
             candidate_paths = []
             
@@ -70,108 +144,70 @@ class LibraryService:
                 if depth > 1: # Max depth 1 means Root -> Category -> Anime
                     return
                 
-                try:
-                    with os.scandir(path) as it:
-                        for entry in it:
-                            if entry.is_dir():
-                                # Check if this folder looks like an anime (has video or seasons)
-                                # Or if it is a category (assume if it doesn't match above, we scan inside)
-                                
-                                is_anime = False
-                                has_seasons = False
-                                has_video = False
-                                
-                                # Quick check content
-                                try:
-                                    with os.scandir(entry.path) as sub_it:
-                                        for sub in sub_it:
-                                            if sub.is_dir() and ("season" in sub.name.lower() or "specials" in sub.name.lower()):
-                                                has_seasons = True
-                                                break
-                                            if sub.is_file() and sub.name.lower().endswith(('.mp4', '.mkv', '.avi', '.m4v')):
-                                                has_video = True
-                                except Exception:
-                                    pass
-                                
-                                if has_seasons or has_video:
-                                    candidate_paths.append((entry.path, entry.name))
-                                else:
-                                    # Treat as category/container, recurse
-                                    scan_dir(entry.path, depth + 1)
-                except Exception as e:
-                    logger.warning(f"Error scanning dir {path}: {e}")
-
-            scan_dir(target_path)
-
-            for path, name in candidate_paths:
-                item_data = await self._process_anime_folder(path, name)
-                if item_data:
-                    current_paths.add(item_data.path)
+                listing = index.listdir(path)
+                if listing is None:
+                    return
+                for name in listing[0]:
+                    entry_path = os.path.join(path, name)
+                    # Check if this folder looks like an anime (has video or seasons)
+                    # Or if it is a category (assume if it doesn't match above, we scan inside)
+                    sub_listing = index.listdir(entry_path)
+                    if sub_listing is None:
+                        continue
+                    sub_dirs, sub_files = sub_listing
+                    has_seasons = any("season" in d.lower() or "specials" in d.lower() for d in sub_dirs)
+                    has_video = any(f.lower().endswith(('.mp4', '.mkv', '.avi', '.m4v')) for f in sub_files)
                     
+                    if has_seasons or has_video:
+                        candidate_paths.append((entry_path, name))
+                    else:
+                        # Treat as category/container, recurse
+                        scan_dir(entry_path, depth + 1)
+
+            scan_dir(index.root)
+
+            # Pipeline: folders are processed concurrently (filesystem probes in the thread pool,
+            # TMDB lookups as tasks) and streamed to a single writer that upserts in batches
+            existing = await asyncio.to_thread(self._load_hashes)
+            try:
+                concurrency = max(1, int(self.settings.get_setting("app.library_concurrency", "8")))
+            except (TypeError, ValueError):
+                concurrency = 8
+            semaphore = asyncio.Semaphore(concurrency)
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def process(path, name):
+                known = existing.get(path)
+                async with semaphore:
+                    item_data = await self._process_anime_folder(path, name, index, known[2] if known else None)
+                if item_data:
                     # Check subscription status
                     # Logic: exact match or stripped match of title
-                    is_sub = False
-                    if normalize(item_data.title) in sub_map:
-                        is_sub = True
-                    
-                    with SessionLocal() as db:
-                        existing = db.query(LibraryItem).filter(LibraryItem.path == item_data.path).first()
-                        if existing:
-                            # Update if changed
-                            # Always update metadata significantly
-                            existing.season_count = item_data.season_count
-                            existing.poster_path = item_data.poster_url
-                            existing.updated_at = datetime.utcnow()
-                            existing.year = item_data.year
-                            existing.status = item_data.status
-                            existing.air_day = item_data.air_day
-                            existing.tmdb_id = item_data.tmdb_id
-                            existing.vote_average = item_data.vote_average
-                            existing.overview = item_data.overview
-                            existing.is_subscribed = is_sub
-                            
-                            db.commit()
-                            stats["updated"] += 1
-                            
-                            # Proactively trigger metadata fetch
-                            try:
-                                from app.tasks.library_tasks import task_fetch_bangumi_metadata
-                                task_fetch_bangumi_metadata(existing.id)
-                            except Exception: pass
-                        else:
-                            # Insert new
-                            new_item = LibraryItem(
-                                title=item_data.title,
-                                path=item_data.path,
-                                poster_path=item_data.poster_url,
-                                season_count=item_data.season_count,
-                                year=item_data.year,
-                                status=item_data.status,
-                                air_day=item_data.air_day,
-                                tmdb_id=item_data.tmdb_id,
-                                vote_average=item_data.vote_average,
-                                overview=item_data.overview,
-                                is_subscribed=is_sub
-                            )
-                            db.add(new_item)
-                            db.commit()
-                            db.refresh(new_item)
-                            stats["added"] += 1
-                            
-                            # Proactively trigger metadata fetch for new items
-                            try:
-                                from app.tasks.library_tasks import task_fetch_bangumi_metadata
-                                task_fetch_bangumi_metadata(new_item.id)
-                            except Exception: pass
-            
-            # Remove stale items
-            with SessionLocal() as db:
-                all_items = db.query(LibraryItem).all()
-                for item in all_items:
-                    if item.path not in current_paths:
-                        db.delete(item)
-                        stats["removed"] += 1
-                db.commit()
+                    queue.put_nowait((item_data, normalize(item_data.title) in sub_map))
+
+            async def writer():
+                batch = []
+                while True:
+                    entry = await queue.get()
+                    if entry is not None:
+                        batch.append(entry)
+                    if batch and (entry is None or len(batch) >= self.WRITE_BATCH_SIZE):
+                        await asyncio.to_thread(self._reconcile, batch, stats, None, existing)
+                        batch = []
+                    if entry is None:
+                        return
+
+            writer_task = asyncio.create_task(writer())
+            try:
+                await asyncio.gather(*(process(path, name) for path, name in candidate_paths))
+                queue.put_nowait(None)
+                await writer_task
+            finally:
+                writer_task.cancel()
+
+            # Rows of folders that are gone are removed; folders that failed to process are kept
+            current_paths = {path for path, _ in candidate_paths}
+            await asyncio.to_thread(self._reconcile, [], stats, lambda p: p not in current_paths, existing)
                 
         except Exception as e:
             logger.error(f"Error scanning library: {e}")
@@ -181,6 +217,168 @@ class LibraryService:
         logger.info(f"Library scan completed: {stats}")
         return stats
 
+    async def refresh_paths(self, paths: List[str]) -> Dict[str, int]:
+        """
+        Refresh only the library items containing `paths` (used by the directory watcher).
+        Paths outside every known item (a new series or category) fall back to a full scan.
+        """
+        target_path = self.settings.get_setting("app.target_library_path")
+        if not target_path or not os.path.exists(target_path):
+            return {"added": 0, "updated": 0, "removed": 0}
+
+        from app.db.session import SessionLocal
+        from app.db.models import Subscription
+
+        target_path = os.path.normpath(target_path)
+        existing = self._load_hashes()
+        with SessionLocal() as db:
+            def normalize(s): return re.sub(r'\s+', '', s.lower()) if s else ""
+            sub_map = {normalize(s.title): True for s in db.query(Subscription).all()}
+
+        folders = set()
+        for path in paths:
+            path = os.path.normpath(path)
+            if path != target_path and not path.startswith(target_path + os.sep):
+                continue
+            owner = next((p for p in existing if path == p or path.startswith(p + os.sep)), None)
+            if owner is None:
+                logger.info(f"Library change outside known items ({path}), running full scan")
+                return await self.scan_and_refresh()
+            folders.add(owner)
+
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        processed = []
+        vanished = set()
+        for folder in sorted(folders):
+            if not os.path.isdir(folder):
+                vanished.add(folder)
+                continue
+
+            item_data = await self._process_anime_folder(folder, os.path.basename(folder),
+                                                         fingerprint=existing[folder][2])
+            if item_data:
+                processed.append((item_data, normalize(item_data.title) in sub_map))
+
+        self._reconcile(processed, stats, stale=lambda p: p in vanished, existing=existing)
+        logger.info(f"Library refresh of {len(folders)} folders completed: {stats}")
+        return stats
+
+    # Columns written by the scanner; title and path identify the folder and are never updated
+    _SCANNED_COLUMNS = ("poster_path", "season_count", "year", "status", "air_day",
+                        "tmdb_id", "vote_average", "overview", "is_subscribed")
+
+    @classmethod
+    def _item_row(cls, item_data: AnimeItem, is_sub: bool) -> Dict:
+        """LibraryItem column values of a processed folder, including its meta_hash"""
+        row = {
+            "title": item_data.title,
+            "path": item_data.path,
+            "poster_path": item_data.poster_url,
+            "season_count": item_data.season_count,
+            "year": item_data.year,
+            "status": item_data.status,
+            "air_day": item_data.air_day,
+            "tmdb_id": item_data.tmdb_id,
+            "vote_average": item_data.vote_average,
+            "overview": item_data.overview,
+            "is_subscribed": is_sub,
+        }
+        payload = json.dumps([row[c] for c in cls._SCANNED_COLUMNS], ensure_ascii=False, default=str)
+        row["meta_hash"] = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        row["fingerprint"] = item_data.fingerprint
+        return row
+
+    @staticmethod
+    def _load_hashes() -> Dict[str, Tuple[int, str, str]]:
+        """Existing library rows as {path: (id, meta_hash, fingerprint)}, in one query"""
+        from app.db.session import SessionLocal
+        from app.db.models import LibraryItem
+
+        with SessionLocal() as db:
+            return {path: (item_id, meta_hash, fingerprint) for item_id, path, meta_hash, fingerprint
+                    in db.query(LibraryItem.id, LibraryItem.path, LibraryItem.meta_hash, LibraryItem.fingerprint)}
+
+    def _reconcile(self, processed: List[Tuple[AnimeItem, bool]], stats: Dict[str, int],
+                   stale: Optional[Callable[[str], bool]] = None,
+                   existing: Optional[Dict[str, Tuple[int, str, str]]] = None):
+        """
+        Apply processed folders to library_items in one transaction.
+        Rows whose hash and fingerprint match `existing` (loaded with _load_hashes when not
+        given) are skipped, the rest are upserted with executemany, and existing rows for
+        which `stale(path)` is true are deleted. Folders that were not enriched only get
+        their subscription flag updated.
+        """
+        from app.db.session import SessionLocal
+        from app.db.models import LibraryItem
+        from sqlalchemy import bindparam, or_, update
+        from sqlalchemy.dialects.sqlite import insert
+
+        if existing is None:
+            existing = self._load_hashes()
+        with SessionLocal() as db:
+            now = datetime.utcnow()
+            rows = []
+            flags = []
+            for item_data, is_sub in processed:
+                if not item_data.enriched:
+                    stats["unchanged"] += 1
+                    flags.append({"b_path": item_data.path, "b_sub": is_sub})
+                    continue
+                row = self._item_row(item_data, is_sub)
+                current = existing.get(row["path"])
+                if current and current[1] == row["meta_hash"] and current[2] == row["fingerprint"]:
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if current else "added"] += 1
+                row["updated_at"] = now
+                rows.append(row)
+
+            stale_ids = [item_id for path, (item_id, _, _) in existing.items() if stale and stale(path)]
+            if not rows and not flags and not stale_ids:
+                return
+
+            flagged = 0
+            if flags:
+                # The stored meta_hash no longer matches once the flag changes, clear it
+                flagged = db.connection().execute(
+                    update(LibraryItem.__table__)
+                    .where(LibraryItem.path == bindparam("b_path"))
+                    .where(or_(LibraryItem.is_subscribed.is_(None), LibraryItem.is_subscribed != bindparam("b_sub")))
+                    .values(is_subscribed=bindparam("b_sub"), meta_hash=None),
+                    flags,
+                ).rowcount
+
+            changed_ids = []
+            if rows:
+                stmt = insert(LibraryItem)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[LibraryItem.path],
+                    set_={c: stmt.excluded[c] for c in self._SCANNED_COLUMNS + ("meta_hash", "fingerprint", "updated_at")},
+                )
+                db.execute(stmt, rows)
+
+                paths = [row["path"] for row in rows]
+                for i in range(0, len(paths), self.BATCH_SIZE):
+                    batch = paths[i:i + self.BATCH_SIZE]
+                    changed_ids.extend(item_id for (item_id,) in
+                                       db.query(LibraryItem.id).filter(LibraryItem.path.in_(batch)))
+
+            for i in range(0, len(stale_ids), self.BATCH_SIZE):
+                batch = stale_ids[i:i + self.BATCH_SIZE]
+                db.query(LibraryItem).filter(LibraryItem.id.in_(batch)).delete(synchronize_session=False)
+            stats["removed"] += len(stale_ids)
+            # Only real changes invalidate listing ETags and episode caches
+            if rows or stale_ids or flagged:
+                bump_version(db, LIBRARY_VERSION_KEY)
+            db.commit()
+
+        # Proactively queue metadata fetch for new and changed items
+        if changed_ids:
+            try:
+                from app.tasks.library_tasks import queue_bangumi_fetch
+                queue_bangumi_fetch(changed_ids)
+            except Exception: pass
+
     def get_all_items(self) -> List[Dict]:
         """Get all library items from DB"""
         from app.db.session import SessionLocal
@@ -190,6 +388,109 @@ class LibraryService:
             items = db.query(LibraryItem).order_by(LibraryItem.title).all()
             return [item.to_dict() for item in items]
 
+    @staticmethod
+    def get_library_version() -> Tuple[int, Optional[datetime]]:
+        """(version, last change) of library_items, for conditional requests"""
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            return get_version_info(db, LIBRARY_VERSION_KEY)
+
+    # sort name -> (column, default for NULLs, descending)
+    ITEM_SORTS = {
+        "updated": ("updated_at", datetime.min, True),
+        "title": ("title", "", False),
+        "year": ("year", "", True),
+        "rating": ("vote_average", 0.0, True),
+        "air_day": ("air_day", 7, False),
+    }
+
+    # status filter -> TMDB series statuses
+    ITEM_STATUSES = {
+        "current": ("Returning Series", "In Production"),
+        "ended": ("Ended", "Canceled"),
+    }
+
+    def list_items(self, cursor: Optional[str] = None, limit: int = 100, sort: str = "updated",
+                   initial: Optional[str] = None, air_day: Optional[int] = None,
+                   is_subscribed: Optional[bool] = None, year: Optional[str] = None,
+                   status: Optional[str] = None) -> Dict:
+        """
+        One page of library items (slim projection, without overview) for the poster wall.
+        Keyset pagination: `next_cursor` is opaque and only valid with the same sort and filters.
+        `initial` filters on the first letter of the title, "#" for titles not starting with A-Z;
+        `status` is "current" (airing) or "ended".
+        Raises ValueError for an unknown sort or status or an invalid cursor.
+        """
+        from app.db.session import SessionLocal
+        from app.db.models import LibraryItem
+        from sqlalchemy import and_, func, not_, or_
+        from sqlalchemy.orm import load_only
+        import base64
+
+        if sort not in self.ITEM_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        if status and status not in self.ITEM_STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        column_name, default, descending = self.ITEM_SORTS[sort]
+        column = getattr(LibraryItem, column_name)
+        key = func.coalesce(column, default)
+
+        with SessionLocal() as db:
+            query = db.query(LibraryItem).options(
+                load_only(*(getattr(LibraryItem, c) for c in LibraryItem.SUMMARY_COLUMNS + ("fingerprint",)))
+            )
+            if initial:
+                first = func.upper(func.substr(LibraryItem.title, 1, 1))
+                if initial == "#":
+                    query = query.filter(not_(first.between("A", "Z")))
+                else:
+                    query = query.filter(first == initial[:1].upper())
+            if air_day is not None:
+                query = query.filter(LibraryItem.air_day == air_day)
+            if is_subscribed is not None:
+                query = query.filter(LibraryItem.is_subscribed == is_subscribed)
+            if year:
+                query = query.filter(LibraryItem.year == year)
+            if status:
+                query = query.filter(LibraryItem.status.in_(self.ITEM_STATUSES[status]))
+
+            if cursor:
+                try:
+                    padded = cursor + "=" * (-len(cursor) % 4)
+                    value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+                    if column_name == "updated_at":
+                        value = datetime.fromisoformat(value)
+                except Exception:
+                    raise ValueError("Invalid cursor")
+                if descending:
+                    query = query.filter(or_(key < value, and_(key == value, LibraryItem.id < last_id)))
+                else:
+                    query = query.filter(or_(key > value, and_(key == value, LibraryItem.id > last_id)))
+
+            order = (key.desc(), LibraryItem.id.desc()) if descending else (key.asc(), LibraryItem.id.asc())
+            rows = query.order_by(*order).limit(limit + 1).all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                value = getattr(last, column_name)
+                value = default if value is None else value
+                payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value, last.id])
+                next_cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+            items = [item.to_summary() for item in rows]
+            fingerprints = {item.id: item.fingerprint for item in rows}
+
+        # Posters point at cached thumbnails (immutable URLs) or at the endpoint generating them
+        from app.services.core.image_cache import ImageCache
+        thumbs = ImageCache.lookup((item["poster_url"], fingerprints[item["id"]]) for item in items if item["poster_url"])
+        for item in items:
+            if item["poster_url"]:
+                name = thumbs.get((item["poster_url"], fingerprints[item["id"]]))
+                item["poster_url"] = ImageCache.thumb_url(name) if name else f"/api/library/items/{item['id']}/poster"
+        return {"items": items, "next_cursor": next_cursor}
+
     def get_item(self, item_id: int) -> Optional[Dict]:
         """Get a single library item"""
         from app.db.session import SessionLocal
@@ -199,33 +500,49 @@ class LibraryService:
             item = db.query(LibraryItem).filter(LibraryItem.id == item_id).first()
             return item.to_dict() if item else None
 
-    async def get_episodes(self, item_id: int) -> List[Dict]:
-        """Get all video files for an item and enrich with TMDB metadata"""
-        item = self.get_item(item_id)
-        if not item:
-            return []
-            
-        path = item["path"]
-        if not os.path.exists(path):
-            return []
-            
+    @staticmethod
+    def get_poster_source(item_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        """(poster_path, fingerprint) of an item, None if it has no poster"""
+        from app.db.session import SessionLocal
+        from app.db.models import LibraryItem
+
+        with SessionLocal() as db:
+            row = db.query(LibraryItem.poster_path, LibraryItem.fingerprint).filter(LibraryItem.id == item_id).first()
+            return (row[0], row[1]) if row and row[0] else None
+
+    @staticmethod
+    def _episode_cache_key(item: Dict) -> Tuple:
+        """(path, library version) of an item"""
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            return item["path"], get_version_info(db, LIBRARY_VERSION_KEY)[0]
+
+    @staticmethod
+    def _scan_episodes(path: str) -> Tuple[List[Dict], Set[int], Dict[str, int]]:
+        """
+        Video files of a series folder with parsed season/episode numbers, and the
+        mtime of every directory listed (for EpisodeIndexCache). Blocking.
+        """
+        from app.services.core.streaming import PathTokens
+
         videos = []
-        import base64
-        import re
-        
         # Regex for SxxExx or Exx
         se_pattern = re.compile(r'[sS](\d+)[eE](\d+)')
         ep_pattern = re.compile(r'[eE](\d+)')
-        num_pattern = re.compile(r'[^0-9](\d{1,3})[^0-9]') # Fallback for simple numbers
         
         found_seasons = set()
+        dirs = {}
         
-        # 1. Scan files
-        for root, _, files in os.walk(path):
-            for f in files:
+        # From the directory snapshot, only changed folders are listed again
+        index = SnapshotIndex(path)
+        index.refresh(persist=False)
+        for root, _, files in index.walk():
+            dirs[root] = index.mtime_ns(root)
+            for f, meta in files.items():
                 if f.lower().endswith(('.mp4', '.mkv', '.avi', '.m4v', '.webm')):
                     full_path = os.path.join(root, f)
-                    encoded_path = base64.urlsafe_b64encode(full_path.encode()).decode()
+                    encoded_path = PathTokens.encode(full_path)
                     
                     # Try to parse season and episode
                     s_num, e_num = None, None
@@ -248,10 +565,31 @@ class LibraryService:
                         "name": f,
                         "path": full_path,
                         "stream_url": f"/api/library/stream/{encoded_path}",
-                        "size": os.path.getsize(full_path),
+                        "size": meta[0],
                         "season": s_num,
                         "episode": e_num
                     })
+        return videos, found_seasons, dirs
+
+    async def get_episodes(self, item_id: int) -> List[Dict]:
+        """Get all video files for an item and enrich with TMDB metadata"""
+        item = self.get_item(item_id)
+        if not item:
+            return []
+            
+        path = item["path"]
+        # 1. Scanned files, served from the episode cache while the folder is unchanged
+        cache_key = self._episode_cache_key(item)
+        cached = await asyncio.to_thread(episode_cache.get, item_id, cache_key)
+        if cached is None:
+            if not os.path.exists(path):
+                return []
+            videos, found_seasons, dirs = await asyncio.to_thread(self._scan_episodes, path)
+            episode_cache.put(item_id, cache_key, videos, found_seasons, dirs)
+        else:
+            videos, found_seasons = cached
+        # Entries are shared with the cache, the merge below adds fields
+        videos = [dict(v) for v in videos]
         
         # 2. Fetch Bangumi Metadata from Cache ONLY
         series_title = item.get("title", "Unknown")
@@ -298,8 +636,8 @@ class LibraryService:
         # Trigger background fetch if missing
         if missing_metadata:
             try:
-                from app.tasks.library_tasks import task_fetch_bangumi_metadata
-                task_fetch_bangumi_metadata(item_id)
+                from app.tasks.library_tasks import queue_bangumi_fetch
+                queue_bangumi_fetch([item_id])
             except Exception as e:
                 logger.error(f"Failed to trigger background metadata fetch: {e}")
 
@@ -325,7 +663,73 @@ class LibraryService:
         final_videos.sort(key=lambda x: (x.get("season") or 999, x.get("episode") or 999, x["name"]))
         return final_videos
 
-    async def fetch_item_metadata_background(self, item_id: int):
+    def _metadata_fresh_after(self, item_ids: List[int]) -> Tuple[Dict[int, datetime], Set[int]]:
+        """
+        For each item the time after which fetched episode metadata counts as fresh
+        (TTL cutoff, or the item's last change if later), and the items whose mapped
+        Bangumi subjects all have episodes fetched after it.
+        """
+        from app.db.session import SessionLocal
+        from app.db.models import BangumiEpisode, BangumiSubjectMapping, LibraryItem
+        from sqlalchemy import func
+
+        try:
+            ttl_hours = float(self.settings.get_setting("bangumi.metadata_ttl_hours", "24"))
+        except (TypeError, ValueError):
+            ttl_hours = 24.0
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+
+        with SessionLocal() as db:
+            changed = dict(db.query(LibraryItem.id, LibraryItem.updated_at).filter(LibraryItem.id.in_(item_ids)))
+            subjects: Dict[int, Set[int]] = {}
+            for item_id, subject_id in db.query(BangumiSubjectMapping.item_id, BangumiSubjectMapping.subject_id)\
+                    .filter(BangumiSubjectMapping.item_id.in_(item_ids)):
+                subjects.setdefault(item_id, set()).add(subject_id)
+            all_subjects = set().union(*subjects.values()) if subjects else set()
+            fetched = dict(db.query(BangumiEpisode.subject_id, func.min(BangumiEpisode.updated_at))
+                           .filter(BangumiEpisode.subject_id.in_(all_subjects))
+                           .group_by(BangumiEpisode.subject_id)) if all_subjects else {}
+
+        fresh_after = {item_id: max(cutoff, updated_at or cutoff) for item_id, updated_at in changed.items()}
+        fresh = {
+            item_id for item_id, after in fresh_after.items()
+            if subjects.get(item_id) and all(fetched.get(sid) and fetched[sid] >= after for sid in subjects[item_id])
+        }
+        return fresh_after, fresh
+
+    async def fetch_metadata_batch(self, item_ids: List[int], failed_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        Fetch Bangumi metadata for a batch of items with one shared BangumiService.
+        Items whose episode metadata is still fresh are skipped; ids of failed fetches
+        are appended to `failed_ids`.
+        """
+        from app.services.external.bangumi import BangumiService
+
+        stats = {"fetched": 0, "fresh": 0, "failed": 0}
+        fresh_after, fresh = await asyncio.to_thread(self._metadata_fresh_after, item_ids)
+        stats["fresh"] = len(fresh)
+        pending = [item_id for item_id in item_ids if item_id in fresh_after and item_id not in fresh]
+        if not pending:
+            return stats
+
+        bgm_service = BangumiService()
+
+        async def fetch(item_id):
+            try:
+                await self.fetch_item_metadata_background(item_id, fresh_after[item_id], bgm_service)
+                stats["fetched"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                if failed_ids is not None:
+                    failed_ids.append(item_id)
+                logger.error(f"Background metadata fetch failed for item {item_id}: {e}")
+
+        # Concurrency is bounded by the Bangumi rate limiter
+        await asyncio.gather(*(fetch(item_id) for item_id in pending))
+        return stats
+
+    async def fetch_item_metadata_background(self, item_id: int, fresh_after: Optional[datetime] = None,
+                                             bgm_service=None):
         """Fetch and save metadata in the background. Triggered by worker."""
         item = self.get_item(item_id)
         if not item: return
@@ -335,7 +739,9 @@ class LibraryService:
         path = item["path"]
         
         found_seasons = set()
-        for root, _, files in os.walk(path):
+        index = SnapshotIndex(path)
+        index.refresh(persist=False)
+        for root, _, files in index.walk():
             for f in files:
                 if f.lower().endswith(('.mp4', '.mkv', '.avi', '.m4v', '.webm')):
                     folder_match = re.search(r'Season\s*(\d+)', root, re.I)
@@ -348,22 +754,22 @@ class LibraryService:
                         else:
                             found_seasons.add(1)
         
-        import asyncio
         tasks = []
         for s in found_seasons:
             if s == 0: continue
-            tasks.append(self._sync_season_metadata(s, series_title, bangumi_id, item_id))
+            tasks.append(self._sync_season_metadata(s, series_title, bangumi_id, item_id, fresh_after, bgm_service))
         
         if tasks:
             await asyncio.gather(*tasks)
 
-    async def _sync_season_metadata(self, s: int, series_title: str, bangumi_id: int, item_id: int):
+    async def _sync_season_metadata(self, s: int, series_title: str, bangumi_id: int, item_id: int,
+                                    fresh_after: Optional[datetime] = None, bgm_service=None):
         """Fetch from API and save to DB. NO RETURN."""
         from app.services.external.bangumi import BangumiService
         from app.db.session import SessionLocal
         from app.db.models import BangumiEpisode, LibraryItem, BangumiSubjectMapping
         
-        bgm_service = BangumiService()
+        bgm_service = bgm_service or BangumiService()
         target_subject_id = None
         
         # 1. Try to find existing mapping for this season
@@ -391,13 +797,18 @@ class LibraryService:
                         db.query(LibraryItem).filter(LibraryItem.id == item_id).update({"bangumi_id": target_subject_id})
                     db.commit()
         
-        # 3. Fetch episodes if not in cache
+        # 3. Fetch episodes if not in cache (or cached before `fresh_after`)
         if target_subject_id:
             with SessionLocal() as db:
                 exists = db.query(BangumiEpisode).filter(BangumiEpisode.subject_id == target_subject_id).first()
-                if exists: return
+                if exists and (fresh_after is None or (exists.updated_at and exists.updated_at >= fresh_after)):
+                    return
                 
                 bgm_eps = await bgm_service.get_episodes(target_subject_id)
+                if not bgm_eps:
+                    return
+                if exists:
+                    db.query(BangumiEpisode).filter(BangumiEpisode.subject_id == target_subject_id).delete()
                 for be in bgm_eps:
                     ep_num = int(be.get("sort", 0))
                     if ep_num == 0: ep_num = int(be.get("number", 0))
@@ -411,38 +822,55 @@ class LibraryService:
                     ))
                 db.commit()
 
-    async def _process_anime_folder(self, folder_path: str, folder_name: str) -> Optional[AnimeItem]:
-        """Process a single anime folder"""
+    @staticmethod
+    def _probe_folder(folder_path: str, index: Optional[SnapshotIndex] = None) -> Tuple[int, Optional[str], str]:
+        """
+        Filesystem part of folder processing: (season count, local poster url, fingerprint). Blocking.
+        The fingerprint covers the folder mtime, video count, season dirs and poster mtime.
+        """
+        if index is None:
+            index = SnapshotIndex(folder_path)
+            index.refresh(persist=False)
+        sub_dirs, folder_files = index.listdir(folder_path) or ([], {})
+
+        # Check for seasons
+        season_dirs = [name for name in sub_dirs if "season" in name.lower() or "specials" in name.lower()]
+        seasons = len(season_dirs)
+        video_count = sum(1 for _, _, files in index.walk(folder_path)
+                          for f in files if f.endswith(('.mp4', '.mkv', '.avi')))
+        if seasons == 0 and video_count:
+            # Might be a single season folder structure or flat structure
+            # For now assume if it has video files it's at least 1 season
+            seasons = 1
+
+        # Check for local images
+        poster_url = None
+        poster_mtime = 0
+        local_images = ["poster.jpg", "poster.png", "folder.jpg", "cover.jpg"]
+        for img_name in local_images:
+            if img_name in folder_files:
+                import base64
+                encoded_path = base64.urlsafe_b64encode(os.path.join(folder_path, img_name).encode()).decode()
+                poster_url = f"/api/library/image/{encoded_path}"
+                poster_mtime = folder_files[img_name][1]
+                break
+
+        payload = json.dumps([index.mtime_ns(folder_path), video_count, season_dirs, poster_url, poster_mtime],
+                             ensure_ascii=False)
+        fingerprint = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return seasons, poster_url, fingerprint
+
+    async def _process_anime_folder(self, folder_path: str, folder_name: str, index: Optional[SnapshotIndex] = None,
+                                    fingerprint: Optional[str] = None) -> Optional[AnimeItem]:
+        """
+        Process a single anime folder (read from the directory snapshot when given).
+        When the folder still matches `fingerprint` TMDB is not queried and the
+        returned item has enriched=False.
+        """
         try:
-            # Check for seasons
-            seasons = 0
-            with os.scandir(folder_path) as it:
-                for entry in it:
-                    if entry.is_dir() and (
-                        "season" in entry.name.lower() or 
-                        "specials" in entry.name.lower()
-                    ):
-                        seasons += 1
-            if seasons == 0:
-                # Might be a single season folder structure or flat structure
-                # For now assume if it has video files it's at least 1 season
-                has_video = False
-                for root, _, files in os.walk(folder_path):
-                    if any(f.endswith(('.mp4', '.mkv', '.avi')) for f in files):
-                        has_video = True
-                        break
-                if has_video:
-                    seasons = 1
-
-            # Check for local images
-            poster_url = None
-            local_images = ["poster.jpg", "poster.png", "folder.jpg", "cover.jpg"]
-            for img_name in local_images:
-                if os.path.exists(os.path.join(folder_path, img_name)):
-                    import base64
-                    encoded_path = base64.urlsafe_b64encode(os.path.join(folder_path, img_name).encode()).decode()
-                    poster_url = f"/api/library/image/{encoded_path}"
-                    break
+            seasons, poster_url, current_fingerprint = await asyncio.to_thread(self._probe_folder, folder_path, index)
+            if fingerprint and current_fingerprint == fingerprint:
+                return AnimeItem(title=folder_name, path=folder_path, fingerprint=fingerprint, enriched=False)
             
             # Metadata holders
             year = None
@@ -451,10 +879,11 @@ class LibraryService:
             tmdb_id = None
             vote_average = 0.0
             overview = None
+            details = None
 
             # Fetch TMDB metadata
             try:
-                tmdb_results = await self.tmdb.search_anime(folder_name)
+                tmdb_results = await self.tmdb.search_anime(folder_name, raise_errors=True)
                 if tmdb_results:
                     best_match = tmdb_results[0]
                     tmdb_id = best_match.id
@@ -464,7 +893,7 @@ class LibraryService:
                         poster_url = f"https://image.tmdb.org/t/p/w500{best_match.poster_path}"
                     
                     # Get detailed info
-                    details = await self.tmdb.get_tv_details(tmdb_id)
+                    details = await self.tmdb.get_tv_details(tmdb_id, raise_errors=True)
                     if details:
                         first_air = details.get('first_air_date', '')
                         if first_air:
@@ -482,8 +911,13 @@ class LibraryService:
                                 air_day = dt.weekday()
                             except:
                                 pass
+                if not details:
+                    # No API key, no match or no details: retry the lookup on the next scan
+                    current_fingerprint = None
             except Exception as e:
                 logger.warning(f"TMDB fetch failed for {folder_name}: {e}")
+                # Leave the fingerprint empty so the next scan retries the lookup
+                current_fingerprint = None
 
             return AnimeItem(
                 title=folder_name,
@@ -495,7 +929,8 @@ class LibraryService:
                 air_day=air_day,
                 tmdb_id=tmdb_id,
                 vote_average=vote_average,
-                overview=overview
+                overview=overview,
+                fingerprint=current_fingerprint
             )
         except Exception as e:
             logger.error(f"Error processing folder {folder_name}: {e}")
@@ -566,6 +1001,7 @@ class LibraryService:
             
             # Delete the Item itself
             db.delete(item)
+            bump_version(db, LIBRARY_VERSION_KEY)
             db.commit()
             
             logger.info(f"Item {item_id} deleted successfully")
@@ -0,0 +1,79 @@
+"""
+Scan-scoped memo of title -> TMDB resolutions.
+
+Sibling folders of one show (Season 1, Season 2, SPs ...) and rule-engine
+groups resolve to the same titles; within one organizer scan each lookup is
+done once. Concurrent directories share in-flight lookups instead of racing.
+Lookups run with raise_errors=True: a failed request (network error, 5xx) is
+raised to the caller and dropped from the memo, so the next directory retries it
+instead of inheriting an empty result.
+"""
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+from app.services.external.tmdb_service import TMDBService, TMDBCandidate
+
+class TitleResolution:
+    """Best TMDB candidate of a title and its confidence"""
+
+    def __init__(self, candidate: TMDBCandidate, confidence: float):
+        self.candidate = candidate
+        self.confidence = confidence
+
+class ResolutionCache:
+    """Memoizes search / details / season / configuration lookups for one scan"""
+
+    def __init__(self, tmdb_service: TMDBService):
+        self.tmdb_service = tmdb_service
+        # (kind, key) -> task of the lookup
+        self._tasks: Dict[Tuple[str, Any], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(title: str) -> str:
+        return " ".join(title.split()).lower()
+
+    async def _memo(self, kind: str, key: Any, factory):
+        task = self._tasks.get((kind, key))
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = self._tasks[(kind, key)] = asyncio.ensure_future(factory())
+
+            def forget_failed(t):
+                # Failed lookups are not kept, the next directory retries them
+                if t.cancelled() or t.exception() is not None:
+                    self._tasks.pop((kind, key), None)
+            task.add_done_callback(forget_failed)
+        # shield: a cancelled waiter must not cancel the lookup other directories wait on
+        return await asyncio.shield(task)
+
+    async def resolve(self, title: str, year: Optional[int] = None) -> Optional[TitleResolution]:
+        """Search TMDB and pick the best candidate, None if nothing was found"""
+        query = " ".join(title.split())
+
+        async def lookup():
+            candidates = await self.tmdb_service.search_anime(query, year, raise_errors=True)
+            if not candidates:
+                return None
+            # Score every candidate once
+            scored = [(c, self.tmdb_service.calculate_confidence(c, query, year)) for c in candidates]
+            candidate, confidence = max(scored, key=lambda s: s[1])
+            return TitleResolution(candidate, confidence)
+
+        return await self._memo("search", (self.normalize(title), year), lookup)
+
+    async def details(self, tv_id: int) -> Optional[Dict[str, Any]]:
+        """TV details, including the season list"""
+        return await self._memo("tv", tv_id, lambda: self.tmdb_service.get_tv_details(tv_id, raise_errors=True))
+
+    async def season(self, tv_id: int, season_number: int) -> Optional[Dict[str, Any]]:
+        return await self._memo("season", (tv_id, season_number),
+                                lambda: self.tmdb_service.get_season_details(tv_id, season_number, raise_errors=True))
+
+    async def configuration(self) -> Dict[str, Any]:
+        return await self._memo("configuration", None, lambda: self.tmdb_service.get_configuration(raise_errors=True))
+
+    def summary(self) -> str:
+        return f"TMDB 解析缓存: 命中 {self.hits} 次, 查询 {self.misses} 次"
@@ -1,41 +1,93 @@
 import os
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Iterator, Tuple
 from app.models.payload import FileNode
+from app.services.core.snapshot import SnapshotIndex, SnapshotDiff
 
 VIDEO_EXTENSIONS = {'.mkv', '.mp4', '.avi', '.mov', '.iso', '.ts', '.ass', '.srt', '.sub', '.vtt'}
+MB = 1024 * 1024
 
 class ScannerService:
     @staticmethod
-    def scan_directory(path: str) -> Dict[str, List[FileNode]]:
+    def iter_files(path: str) -> Iterator[Tuple[str, FileNode]]:
+        """
+        单次遍历目录树，惰性生成 (所在目录, FileNode)。
+        基于 os.scandir：先按扩展名过滤再取 stat (DirEntry 自带缓存)，
+        与 os.walk 一样不进入符号链接目录，无法读取的目录直接跳过。
+        """
+        root = os.path.normpath(path)
+        prefix_len = len(os.path.join(root, ""))
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(dirpath) as it:
+                    for entry in it:
+                        name = entry.name
+                        dot = name.rfind(".")
+                        if dot > 0 and name[dot:].lower() in VIDEO_EXTENSIONS:
+                            try:
+                                if not entry.is_file():
+                                    if entry.is_dir(follow_symlinks=False):
+                                        subdirs.append(entry.path)
+                                    continue
+                                size = entry.stat().st_size
+                            except OSError:
+                                continue  # Broken symlink or removed while scanning
+                            yield dirpath, FileNode(
+                                name=name,
+                                size_mb=round(size / MB, 2),
+                                # Relative path from the scan root might be useful for display
+                                rel_path=entry.path[prefix_len:]
+                            )
+                        elif entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+            except OSError:
+                continue
+            # Depth-first, visiting subdirectories in listing order
+            stack.extend(reversed(subdirs))
+
+    @staticmethod
+    def scan_directory(path: str, incremental: bool = False) -> Dict[str, List[FileNode]]:
         """
         递归扫描目录并按父目录分组视频文件。
+        incremental: 使用持久化的目录快照，只重新列出 mtime 变化过的目录
         Returns: { "directory_path": [FileNode, ...] }
         """
+        if incremental:
+            return ScannerService.scan_incremental(path)[0]
+        if not os.path.isdir(path):
+            raise ValueError(f"Invalid directory path: {path}")
+
+        # Requirement says "group by directory", so we treat each leaf dir as a unit.
         result = {}
-        root_path = Path(path)
-        
-        if not root_path.exists() or not root_path.is_dir():
+        for dirpath, node in ScannerService.iter_files(path):
+            result.setdefault(dirpath, []).append(node)
+        return result
+
+    @staticmethod
+    def scan_incremental(path: str) -> Tuple[Dict[str, List[FileNode]], SnapshotDiff]:
+        """
+        基于持久化目录快照扫描：只重新列出 mtime 变化过的目录。
+        返回与 scan_directory 相同的分组结果，以及与上次扫描相比新增 / 删除 / 修改的文件
+        (首次扫描时所有文件都视为新增)。
+        """
+        if not os.path.isdir(path):
             raise ValueError(f"Invalid directory path: {path}")
 
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            current_dir_files = []
-            for f in filenames:
-                file_path = Path(dirpath) / f
-                if file_path.suffix.lower() in VIDEO_EXTENSIONS:
-                    # Calculate relative path from the scan root, or just from the immediate parent
-                    # Requirement says "group by directory", so we treat each leaf dir as a unit.
-                    
-                    size_mb = file_path.stat().st_size / (1024 * 1024)
-                    node = FileNode(
-                        name=f,
-                        size_mb=round(size_mb, 2),
-                        # Relative path from the scan root might be useful for display
-                        rel_path=str(file_path.relative_to(root_path))
-                    )
-                    current_dir_files.append(node)
-            
+        index = SnapshotIndex(path)
+        diff = index.refresh()
+        result = {}
+        for dirpath, _, files in index.walk():
+            current_dir_files = [
+                FileNode(
+                    name=name,
+                    size_mb=round(meta[0] / MB, 2),
+                    rel_path=os.path.relpath(os.path.join(dirpath, name), index.root)
+                )
+                for name, meta in sorted(files.items())
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+            ]
             if current_dir_files:
                 result[dirpath] = current_dir_files
-                
-        return result
+        return result, diff
@@ -0,0 +1,206 @@
+"""
+Persisted directory snapshots for incremental filesystem scans.
+
+Every directory below a root is stored with its mtime and file listing
+(size, mtime, inode). On the next refresh only directories whose mtime
+changed are listed again; the rest are answered from the snapshot. Adding,
+removing or renaming an entry changes the mtime of its directory, which is
+how downloads and the organizer touch the library. Rewriting a file in place
+does not, so such edits are only noticed once their directory is listed again.
+Rows are shared by every root containing a directory, so only the scan that
+owns the changes (the library root, a scanned directory) persists them.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from loguru import logger
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+from app.db.session import SessionLocal
+from app.db.models import DirectorySnapshot
+
+# A directory modified this recently may change again within the same mtime tick;
+# it is stored with mtime 0 so the next refresh lists it again
+RACY_WINDOW_NS = 2 * 10**9
+# Rows written / deleted per statement
+BATCH_SIZE = 500
+
+class SnapshotDiff:
+    """Files added, removed and modified since the previous snapshot"""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.modified: List[str] = []
+        self.listed_dirs = 0  # Directories read from disk
+        self.reused_dirs = 0  # Directories answered from the snapshot
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def changed_dirs(self) -> Set[str]:
+        """Parent directories of every changed file"""
+        return {os.path.dirname(p) for p in self.added + self.removed + self.modified}
+
+    def to_dict(self) -> Dict:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "modified": self.modified,
+            "listed_dirs": self.listed_dirs,
+            "reused_dirs": self.reused_dirs,
+        }
+
+    def __repr__(self):
+        return (f"<SnapshotDiff +{len(self.added)} -{len(self.removed)} ~{len(self.modified)} "
+                f"(listed {self.listed_dirs}, reused {self.reused_dirs} dirs)>")
+
+class SnapshotIndex:
+    """Snapshot of one directory tree"""
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        # path -> (mtime_ns, {name: [size, mtime_ns, inode]}, [subdir, ...])
+        self.dirs: Dict[str, Tuple[int, Dict[str, list], List[str]]] = {}
+
+    def _load(self) -> Dict[str, Tuple[int, Dict[str, list], List[str]]]:
+        prefix = self.root.rstrip(os.sep) + os.sep
+        try:
+            with SessionLocal() as db:
+                rows = db.query(DirectorySnapshot).filter(or_(
+                    DirectorySnapshot.path == self.root,
+                    DirectorySnapshot.path.startswith(prefix, autoescape=True)
+                )).all()
+                return {r.path: (r.mtime_ns or 0, r.files or {}, r.subdirs or []) for r in rows}
+        except Exception as e:
+            logger.warning(f"Failed to load directory snapshot of {self.root}: {e}")
+            return {}
+
+    def _save(self, changed: Dict[str, Tuple[int, Dict[str, list], List[str]]], vanished: List[str]):
+        if not changed and not vanished:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {"path": path, "mtime_ns": mtime_ns, "files": files, "subdirs": subdirs, "scanned_at": now}
+            for path, (mtime_ns, files, subdirs) in changed.items()
+        ]
+        try:
+            with SessionLocal() as db:
+                for i in range(0, len(rows), BATCH_SIZE):
+                    stmt = insert(DirectorySnapshot).values(rows[i:i + BATCH_SIZE])
+                    db.execute(stmt.on_conflict_do_update(
+                        index_elements=[DirectorySnapshot.path],
+                        set_={
+                            "mtime_ns": stmt.excluded.mtime_ns,
+                            "files": stmt.excluded.files,
+                            "subdirs": stmt.excluded.subdirs,
+                            "scanned_at": stmt.excluded.scanned_at,
+                        }
+                    ))
+                for i in range(0, len(vanished), BATCH_SIZE):
+                    db.query(DirectorySnapshot).filter(
+                        DirectorySnapshot.path.in_(vanished[i:i + BATCH_SIZE])
+                    ).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to save directory snapshot of {self.root}: {e}")
+
+    @staticmethod
+    def _list(path: str) -> Tuple[Dict[str, list], List[str]]:
+        files, subdirs = {}, []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = [st.st_size, st.st_mtime_ns, st.st_ino]
+                except OSError:
+                    continue  # Broken symlink or entry removed while listing
+        return files, sorted(subdirs)
+
+    def refresh(self, persist: bool = True) -> SnapshotDiff:
+        """
+        Bring the snapshot up to date and return what changed since the last refresh.
+        With persist=False the stored snapshot is only read: reads of a subtree (one
+        series) do not consume the changes a later refresh of the whole root reports.
+        """
+        old = self._load()
+        diff = SnapshotDiff()
+        current = {}
+        changed = {}
+        visited = set()
+        now_ns = time.time_ns()
+
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            # Symlinked directories may form loops
+            if (st.st_dev, st.st_ino) in visited:
+                continue
+            visited.add((st.st_dev, st.st_ino))
+
+            previous = old.get(path)
+            if previous is not None and previous[0] and previous[0] == st.st_mtime_ns:
+                current[path] = previous
+                diff.reused_dirs += 1
+            else:
+                try:
+                    files, subdirs = self._list(path)
+                except OSError as e:
+                    logger.warning(f"Failed to list {path}: {e}")
+                    continue
+                mtime_ns = st.st_mtime_ns if now_ns - st.st_mtime_ns > RACY_WINDOW_NS else 0
+                current[path] = changed[path] = (mtime_ns, files, subdirs)
+                diff.listed_dirs += 1
+
+                old_files = previous[1] if previous is not None else {}
+                for name, meta in files.items():
+                    before = old_files.get(name)
+                    if before is None:
+                        diff.added.append(os.path.join(path, name))
+                    elif list(before) != meta:
+                        diff.modified.append(os.path.join(path, name))
+                diff.removed.extend(os.path.join(path, name) for name in old_files if name not in files)
+
+            # Depth-first, in name order
+            stack.extend(os.path.join(path, d) for d in reversed(current[path][2]))
+
+        vanished = [path for path in old if path not in current]
+        for path in vanished:
+            diff.removed.extend(os.path.join(path, name) for name in old[path][1])
+
+        self.dirs = current
+        if persist:
+            self._save(changed, vanished)
+        logger.debug(f"Snapshot of {self.root}: {diff}")
+        return diff
+
+    def mtime_ns(self, path: str) -> int:
+        """Directory mtime as of the last refresh, 0 if unknown or still inside the racy window"""
+        entry = self.dirs.get(os.path.normpath(path))
+        return entry[0] if entry is not None else 0
+
+    def listdir(self, path: str) -> Optional[Tuple[List[str], Dict[str, list]]]:
+        """(subdirs, files) of a directory as of the last refresh, None if unknown"""
+        entry = self.dirs.get(os.path.normpath(path))
+        return (entry[2], entry[1]) if entry is not None else None
+
+    def walk(self, path: Optional[str] = None) -> Iterator[Tuple[str, List[str], Dict[str, list]]]:
+        """Top-down traversal like os.walk, served from the snapshot. Yields (dirpath, subdirs, files)."""
+        stack = [os.path.normpath(path) if path else self.root]
+        while stack:
+            dirpath = stack.pop()
+            entry = self.dirs.get(dirpath)
+            if entry is None:
+                continue
+            _, files, subdirs = entry
+            yield dirpath, subdirs, files
+            stack.extend(os.path.join(dirpath, d) for d in reversed(subdirs))
@@ -0,0 +1,294 @@
+"""
+Ranged file streaming for the library player.
+
+Implements single and multi-range (multipart/byteranges) responses with
+ETag/Last-Modified validation (If-None-Match, If-Range). The body is sent with
+the ASGI zero-copy extension (os.sendfile in the server) when the server offers
+it, otherwise with os.pread in configurable chunks from the thread pool.
+"""
+import base64
+import binascii
+import mimetypes
+import os
+import secrets
+import stat as stat_module
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import anyio
+from anyio import to_thread
+from loguru import logger
+from starlette.responses import Response
+
+# Types missing from minimal mime registries
+EXTRA_MEDIA_TYPES = {
+    ".mkv": "video/x-matroska",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".m4v": "video/x-m4v",
+    ".avi": "video/x-msvideo",
+}
+
+# Ranges per request beyond which the request is served whole (multi-range abuse)
+MAX_RANGES = 16
+
+class PathTokens:
+    """LRU of stream URL tokens (urlsafe base64 of the path) to decoded paths"""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._paths: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def encode(path: str) -> str:
+        return base64.urlsafe_b64encode(path.encode()).decode()
+
+    def resolve(self, token: str) -> str:
+        """Decoded path of a token, raises ValueError for invalid tokens"""
+        with self._lock:
+            path = self._paths.get(token)
+            if path is not None:
+                self._paths.move_to_end(token)
+                return path
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            path = base64.urlsafe_b64decode(padded).decode()
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid path token: {e}")
+        with self._lock:
+            self._paths[token] = path
+            if len(self._paths) > self.maxsize:
+                self._paths.popitem(last=False)
+        return path
+
+path_tokens = PathTokens()
+
+def guess_media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    if media_type:
+        return media_type
+    return EXTRA_MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+def make_etag(st: os.stat_result) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted, merged inclusive (start, end) pairs.
+    Returns None when the header should be ignored (malformed, not bytes, too many
+    ranges) and [] when no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        # Positions are plain digits (int() would also take signs, spaces and underscores)
+        if not sep or not (first or last):
+            return None
+        if not all(value.isascii() and value.isdigit() for value in (first, last) if value):
+            return None
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and start > end:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    tags = [t.strip() for t in header.split(",")]
+    if "*" in tags:
+        return True
+    if weak:
+        tags = [t[2:] if t.startswith("W/") else t for t in tags]
+    return etag in tags
+
+class RangeFileResponse(Response):
+    """Response streaming a file, honouring Range, If-Range and If-None-Match"""
+
+    def __init__(self, path: str, st: os.stat_result, request_headers, chunk_size: int = 1024 * 1024,
+                 media_type: Optional[str] = None, head: bool = False):
+        self.path = path
+        self.size = st.st_size
+        self.chunk_size = max(4096, chunk_size)
+        self.media_type = media_type or guess_media_type(path)
+        self.head = head
+        self.etag = make_etag(st)
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.background = None
+        self.status_code, headers, self.parts = self._plan(request_headers)
+        self.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+    def _base_headers(self) -> Dict[str, str]:
+        return {
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": self.last_modified,
+            "cache-control": "no-cache",
+        }
+
+    def _if_range_ok(self, if_range: Optional[str]) -> bool:
+        """Range applies only if If-Range (when sent) still matches the file (strong comparison)"""
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == self.etag
+        try:
+            return parsedate_to_datetime(if_range) == parsedate_to_datetime(self.last_modified)
+        except (TypeError, ValueError):
+            return False
+
+    def _plan(self, request_headers) -> Tuple[int, Dict[str, str], List[Tuple[bytes, int, int]]]:
+        """Status, headers and body parts [(preamble, start, end)] of the response"""
+        headers = self._base_headers()
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, self.etag, weak=True):
+            return 304, headers, []
+
+        range_header = request_headers.get("range")
+        ranges = None
+        if range_header and self._if_range_ok(request_headers.get("if-range")):
+            ranges = parse_range(range_header, self.size)
+
+        if ranges is None:
+            headers["content-type"] = self.media_type
+            headers["content-length"] = str(self.size)
+            return 200, headers, [(b"", 0, self.size - 1)] if self.size else []
+
+        if not ranges:
+            headers["content-range"] = f"bytes */{self.size}"
+            headers["content-length"] = "0"
+            return 416, headers, []
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers["content-type"] = self.media_type
+            headers["content-range"] = f"bytes {start}-{end}/{self.size}"
+            headers["content-length"] = str(end - start + 1)
+            return 206, headers, [(b"", start, end)]
+
+        boundary = secrets.token_hex(16)
+        parts = []
+        length = 0
+        for start, end in ranges:
+            preamble = (
+                f"--{boundary}\r\n"
+                f"Content-Type: {self.media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{self.size}\r\n\r\n"
+            ).encode("latin-1")
+            # Parts after the first are preceded by the CRLF ending the previous one
+            if parts:
+                preamble = b"\r\n" + preamble
+            parts.append((preamble, start, end))
+            length += len(preamble) + end - start + 1
+        epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        parts.append((epilogue, 0, -1))
+        length += len(epilogue)
+        headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        headers["content-length"] = str(length)
+        return 206, headers, parts
+
+    async def __call__(self, scope, receive, send):
+        spec_version = tuple(map(int, scope.get("asgi", {}).get("spec_version", "2.0").split(".")))
+        if spec_version >= (2, 4):
+            # send() raises once the client is gone
+            try:
+                await self._send(scope, send)
+            except OSError:
+                logger.debug(f"Client disconnected while streaming {self.path}")
+            return
+
+        # Older servers silently drop send() after a disconnect: stop reading the file
+        # as soon as http.disconnect arrives, like starlette's FileResponse
+        async with anyio.create_task_group() as task_group:
+            async def run_until_first_complete(func):
+                await func()
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(run_until_first_complete, partial(self._send, scope, send))
+            await run_until_first_complete(partial(self._listen_for_disconnect, receive))
+
+    @staticmethod
+    async def _listen_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+
+    async def _send(self, scope, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if self.head or not self.parts:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        fd = await to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            for preamble, start, end in self.parts:
+                if preamble:
+                    await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                if end < start:
+                    continue
+                if zerocopy:
+                    # The server copies the file with os.sendfile
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": fd,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True,
+                    })
+                    continue
+                offset = start
+                while offset <= end:
+                    length = min(self.chunk_size, end - offset + 1)
+                    chunk = await to_thread.run_sync(os.pread, fd, length, offset)
+                    if not chunk:
+                        # Content-Length cannot be honoured any more: fail so the server aborts the connection
+                        raise RuntimeError(f"File shrank while streaming: {self.path}")
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    offset += len(chunk)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+def stat_regular_file(path: str) -> Optional[os.stat_result]:
+    """stat() of a regular file, None if it does not exist or is not a file"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st if stat_module.S_ISREG(st.st_mode) else None
@@ -0,0 +1,165 @@
+"""
+Compiled RSS filters of subscriptions.
+
+A SubscriptionFilter holds everything needed to match feed titles against one
+subscription: the precompiled filter regex, the include and exclude keywords
+matched against the title lowercased once (long lists are folded into one
+alternation pattern, found in a single pass), and the wanted resolution.
+Regexes made of tag lookaheads only, as built by the subscription dialog, are
+turned into include keywords. Filters are cached per subscription and rebuilt
+when their filter fields change.
+"""
+import re
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+from loguru import logger
+
+# 1080p / 1080P / 1080i, 1920x1080 / 1920×1080, 4K / UHD
+RESOLUTION_PATTERN = re.compile(
+    r"(?<![0-9])(?:(2160|1440|1080|720|576|480)[pi]|[0-9]{3,4}\s*[x×]\s*(2160|1440|1080|720|576|480))(?![0-9a-z])"
+    r"|(?<![0-9a-z])(4k|uhd)(?![0-9a-z])",
+    re.IGNORECASE,
+)
+
+# (?=.*Tag1)(?=.*Tag2) from the subscription dialog: every tag must be in the title
+TAG_LOOKAHEAD = re.compile(r"\(\?=\.\*((?:\\[^0-9A-Za-z]|[^\\()\[\]{}.*+?^$|])+)\)")
+
+# Keyword count from which one combined regex beats per-keyword substring scans
+COMBINED_MIN_KEYWORDS = 16
+
+def lookahead_tags(regex: str) -> Optional[list]:
+    """Literal tags of a regex made only of (?=.*tag) lookaheads, None for any other regex"""
+    tags = []
+    end = 0
+    for match in TAG_LOOKAHEAD.finditer(regex):
+        if match.start() != end:
+            return None
+        tags.append(re.sub(r"\\(.)", r"\1", match.group(1)))
+        end = match.end()
+    return tags if tags and end == len(regex) else None
+
+def parse_resolution(text: Optional[str]) -> Optional[str]:
+    """Normalized resolution ("2160p", "1080p", ...) found in a title, None if there is none"""
+    if not text:
+        return None
+    match = RESOLUTION_PATTERN.search(text)
+    if not match:
+        return None
+    lines = match.group(1) or match.group(2)
+    return f"{lines}p" if lines else "2160p"
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher over an already lowercased title.
+    Small lists are scanned keyword by keyword (str.find is faster than a regex there);
+    from COMBINED_MIN_KEYWORDS on, all keywords are found in one pass of an alternation regex.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(str(kw).lower() for kw in keywords if kw))
+        self.pattern = None
+        if len(self.keywords) >= COMBINED_MIN_KEYWORDS:
+            # Longest first, so a keyword is not hidden by one of its prefixes
+            alternatives = sorted(self.keywords, key=len, reverse=True)
+            self.pattern = re.compile("|".join(re.escape(kw) for kw in alternatives))
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def any_in(self, lowered: str) -> bool:
+        if self.pattern is not None:
+            return self.pattern.search(lowered) is not None
+        for kw in self.keywords:
+            if kw in lowered:
+                return True
+        return False
+
+    def all_in(self, lowered: str) -> bool:
+        if self.pattern is not None:
+            found = set(self.pattern.findall(lowered))
+            if len(found) == len(self.keywords):
+                return True
+            # Matches do not overlap: keywords inside or across another match are checked directly
+            return all(kw in lowered for kw in self.keywords if kw not in found)
+        for kw in self.keywords:
+            if kw not in lowered:
+                return False
+        return True
+
+class SubscriptionFilter:
+    """Title filter of one subscription"""
+
+    def __init__(self, regex: Optional[str] = None, include: Iterable[str] = (),
+                 exclude: Iterable[str] = (), resolution: Optional[str] = None, label: str = ""):
+        self.regex = None
+        self.invalid = False
+        tags = lookahead_tags(regex) if regex else None
+        if tags:
+            include = [*include, *tags]
+        elif regex:
+            try:
+                self.regex = re.compile(regex, re.IGNORECASE)
+            except re.error as e:
+                # Same as before: an invalid regex matches nothing
+                logger.error(f"Invalid regex for sub {label}: {e}")
+                self.invalid = True
+        self.include = KeywordMatcher(include)
+        self.exclude = KeywordMatcher(exclude)
+        self.keywords = bool(self.include or self.exclude)
+        self.resolution = parse_resolution(resolution)
+        if resolution and not self.resolution:
+            logger.warning(f"Unknown filter resolution for sub {label}: {resolution}")
+
+    @staticmethod
+    def signature(subscription) -> Tuple:
+        """Filter fields of a subscription, the cache is rebuilt when they change"""
+        return (
+            subscription.filter_regex or "",
+            tuple(subscription.filter_keywords or ()),
+            tuple(subscription.exclude_keywords or ()),
+            subscription.filter_resolution or "",
+        )
+
+    @classmethod
+    def from_subscription(cls, subscription) -> "SubscriptionFilter":
+        regex, include, exclude, resolution = cls.signature(subscription)
+        return cls(regex, include, exclude, resolution, label=str(subscription.id))
+
+    def matches(self, title: str) -> bool:
+        """检查标题是否匹配过滤规则"""
+        if self.invalid:
+            return False
+        if self.keywords:
+            lowered = title.lower()
+            if self.exclude.any_in(lowered) or not self.include.all_in(lowered):
+                return False
+        if self.resolution:
+            # Titles without a recognizable resolution are not rejected
+            found = parse_resolution(title)
+            if found and found != self.resolution:
+                return False
+        return self.regex is None or self.regex.search(title) is not None
+
+class SubscriptionFilterCache:
+    """Compiled filters by subscription id"""
+
+    def __init__(self):
+        self._filters: Dict[int, Tuple[Tuple, SubscriptionFilter]] = {}
+        self._lock = Lock()
+
+    def get(self, subscription) -> SubscriptionFilter:
+        signature = SubscriptionFilter.signature(subscription)
+        with self._lock:
+            entry = self._filters.get(subscription.id)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+        compiled = SubscriptionFilter.from_subscription(subscription)
+        with self._lock:
+            self._filters[subscription.id] = (signature, compiled)
+        return compiled
+
+    def invalidate(self, subscription_id: int):
+        with self._lock:
+            self._filters.pop(subscription_id, None)
+
+subscription_filters = SubscriptionFilterCache()
@@ -1,7 +1,8 @@
-import httpx
 from typing import List, Optional, Dict, Any
 from loguru import logger
 from app.services.system.settings_service import SettingsService
+from app.services.external.http_client import HttpClients
+from app.services.external.rate_limiter import RateLimiter
 
 class BangumiService:
     BASE_URL = "https://api.bgm.tv"
@@ -31,24 +32,25 @@ class BangumiService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, params=params, headers=self.headers, timeout=10)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                results = []
-                # Legacy search structure is {"results": int, "list": [...]}
-                if "list" in data and data["list"]:
-                    for item in data["list"]:
-                        results.append({
-                            "id": item["id"],
-                            "name": item["name"],
-                            "name_cn": item.get("name_cn", ""),
-                            "images": item.get("images", {}),
-                            "score": item.get("rating", {}).get("score", 0),
-                            "summary": item.get("summary", "")
-                        })
-                return results
+            resp = await RateLimiter.for_upstream("bangumi").request(
+                HttpClients.get("bangumi"), "GET", url, params=params, headers=self.headers
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            
+            results = []
+            # Legacy search structure is {"results": int, "list": [...]}
+            if "list" in data and data["list"]:
+                for item in data["list"]:
+                    results.append({
+                        "id": item["id"],
+                        "name": item["name"],
+                        "name_cn": item.get("name_cn", ""),
+                        "images": item.get("images", {}),
+                        "score": item.get("rating", {}).get("score", 0),
+                        "summary": item.get("summary", "")
+                    })
+            return results
         except Exception as e:
             logger.error(f"Failed to search Bangumi: {e}")
             return []
@@ -61,10 +63,11 @@ class BangumiService:
         url = f"{self.BASE_URL}/v0/subjects/{subject_id}"
         
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, headers=self.headers, timeout=10)
-                resp.raise_for_status()
-                return resp.json()
+            resp = await RateLimiter.for_upstream("bangumi").request(
+                HttpClients.get("bangumi"), "GET", url, headers=self.headers
+            )
+            resp.raise_for_status()
+            return resp.json()
         except Exception as e:
             logger.error(f"Failed to get Bangumi subject {subject_id}: {e}")
             return {}
@@ -81,23 +84,24 @@ class BangumiService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, params=params, headers=self.headers, timeout=10)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                # Format to look like v0 episodes for compatibility
-                episodes = []
-                for ep in data.get("eps", []):
-                    # Filter regular episodes (type 0)
-                    if ep.get("type") == 0:
-                        episodes.append({
-                            "sort": ep.get("sort"),
-                            "name": ep.get("name"),
-                            "name_cn": ep.get("name_cn"),
-                            "desc": ep.get("desc") or ep.get("summary") or ""
-                        })
-                return episodes
+            resp = await RateLimiter.for_upstream("bangumi").request(
+                HttpClients.get("bangumi"), "GET", url, params=params, headers=self.headers
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            
+            # Format to look like v0 episodes for compatibility
+            episodes = []
+            for ep in data.get("eps", []):
+                # Filter regular episodes (type 0)
+                if ep.get("type") == 0:
+                    episodes.append({
+                        "sort": ep.get("sort"),
+                        "name": ep.get("name"),
+                        "name_cn": ep.get("name_cn"),
+                        "desc": ep.get("desc") or ep.get("summary") or ""
+                    })
+            return episodes
         except Exception as e:
             logger.error(f"Failed to get episodes for Bangumi legacy subject {subject_id}: {e}")
             return []
@@ -0,0 +1,74 @@
+"""
+Long-lived pooled HTTP clients for the external metadata services.
+
+httpx connections belong to the event loop that opened them, so clients are
+kept per (event loop, upstream). The FastAPI lifespan opens and closes the
+clients of the server loop; Huey worker threads run their tasks on a
+persistent loop (see app.worker.run_async) and close theirs on shutdown.
+"""
+import asyncio
+import weakref
+from typing import Dict
+import httpx
+from loguru import logger
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Known upstreams (anything else gets a client with the same defaults)
+UPSTREAMS = ("tmdb", "bangumi")
+
+class HttpClients:
+    """Registry of pooled httpx.AsyncClient instances"""
+
+    # event loop -> {upstream: client}
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _build(upstream: str) -> httpx.AsyncClient:
+        from app.services.system.settings_service import SettingsService
+
+        limits = httpx.Limits(
+            max_connections=int(SettingsService.get_setting("http.max_connections", "20")),
+            max_keepalive_connections=int(SettingsService.get_setting("http.max_keepalive_connections", "10")),
+            keepalive_expiry=float(SettingsService.get_setting("http.keepalive_expiry", "60"))
+        )
+        timeout = httpx.Timeout(
+            float(SettingsService.get_setting("http.timeout", "10")),
+            connect=float(SettingsService.get_setting("http.connect_timeout", "5"))
+        )
+        logger.debug(f"Opening pooled HTTP client for {upstream} (http2={HTTP2_AVAILABLE})")
+        return httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+
+    @classmethod
+    def get(cls, upstream: str) -> httpx.AsyncClient:
+        """Return the pooled client of an upstream for the running event loop"""
+        loop = asyncio.get_running_loop()
+        clients = cls._clients.get(loop)
+        if clients is None:
+            clients = cls._clients[loop] = {}
+
+        client = clients.get(upstream)
+        if client is None or client.is_closed:
+            client = clients[upstream] = cls._build(upstream)
+        return client
+
+    @classmethod
+    def open(cls, *upstreams: str):
+        """Eagerly create clients for the running event loop"""
+        for upstream in upstreams or UPSTREAMS:
+            cls.get(upstream)
+
+    @classmethod
+    async def aclose(cls):
+        """Close every client that belongs to the running event loop"""
+        loop = asyncio.get_running_loop()
+        clients = cls._clients.pop(loop, {})
+        for upstream, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client for {upstream}: {e}")
@@ -2,13 +2,27 @@
 import requests
 import feedparser
 from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from loguru import logger
+from app.services.external.rate_limiter import RateLimiter
 import re
 import html
+import hashlib
+import threading
+
+# One keep-alive session per thread (requests.Session is not thread-safe)
+_local = threading.local()
 
 class MikanService:
     BASE_URL = "https://mikanani.me"
+
+    @staticmethod
+    def session() -> requests.Session:
+        """Keep-alive session of the calling thread"""
+        session = getattr(_local, "session", None)
+        if session is None:
+            session = _local.session = requests.Session()
+        return session
     
     def search(self, keyword: str) -> List[dict]:
         """搜索番剧，返回结果列表"""
@@ -17,7 +31,7 @@ class MikanService:
         
         try:
             # Mikan search page returns HTML
-            resp = requests.get(url, params=params, timeout=30)
+            resp = RateLimiter.for_upstream("mikan").request_sync(requests, "GET", url, params=params, timeout=30)
             resp.raise_for_status()
             
             soup = BeautifulSoup(resp.text, 'html.parser')
@@ -96,7 +110,7 @@ class MikanService:
         url = f"{self.BASE_URL}/Home/Bangumi/{mikan_id}"
         
         try:
-            resp = requests.get(url, timeout=30)
+            resp = RateLimiter.for_upstream("mikan").request_sync(requests, "GET", url, timeout=30)
             resp.raise_for_status()
             
             # User reported needed to unescape HTML entities first
@@ -277,47 +291,78 @@ class MikanService:
     def parse_rss(self, rss_url: str) -> List[dict]:
         """解析 RSS feed，返回条目列表"""
         try:
-            logger.info(f"Fetching RSS: {rss_url}")
-            # Use requests with timeout to prevent hanging
-            resp = requests.get(rss_url, timeout=30)
-            resp.raise_for_status()
-            
-            feed = feedparser.parse(resp.content)
-            items = []
-            
-            if hasattr(feed, 'bozo') and feed.bozo:
-                logger.warning(f"Feed parsing warning: {feed.bozo_exception}")
-            
-            for entry in feed.entries:
-                torrent_url = None
-                magnet = None
-                
-                # Check standard enclosure for torrent file
-                for link in entry.get('links', []):
-                    if link.get('type') == 'application/x-bittorrent':
-                        torrent_url = link.get('href')
-                        
-                # Some feeds put magnet in link
-                if entry.get('link', '').startswith("magnet:"):
-                    magnet = entry.link
-                    
-                items.append({
-                    "guid": entry.get('guid', entry.get('link')), # Fallback to link if guid missing
-                    "title": entry.title,
-                    "link": entry.link,
-                    "torrent_url": torrent_url,
-                    "magnet": magnet, 
-                    # published_parsed returns time.struct_time
-                    "pub_date": entry.get('published_parsed')
-                })
-            
-            logger.info(f"Parsed {len(items)} items from RSS")
+            items, _ = self.fetch_rss(rss_url)
             return items
-            
         except Exception as e:
             logger.error(f"Failed to parse RSS: {e}")
             return []
 
+    def fetch_rss(self, rss_url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                  body_hash: Optional[str] = None) -> Tuple[Optional[List[dict]], dict]:
+        """
+        Conditional fetch of a feed, returns (items, validators).
+        items is None when the feed is unchanged (304, or same body hash), validators holds the
+        etag/last_modified/body_hash to send next time. Raises on request errors.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        logger.info(f"Fetching RSS: {rss_url}")
+        # Use requests with timeout to prevent hanging
+        resp = RateLimiter.for_upstream("mikan").request_sync(self.session(), "GET", rss_url,
+                                                              headers=headers, timeout=30)
+        if resp.status_code == 304:
+            logger.debug(f"RSS not modified: {rss_url}")
+            return None, {"etag": etag, "last_modified": last_modified, "body_hash": body_hash}
+        resp.raise_for_status()
+
+        validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "body_hash": hashlib.sha1(resp.content).hexdigest(),
+        }
+        if body_hash and validators["body_hash"] == body_hash:
+            logger.debug(f"RSS body unchanged: {rss_url}")
+            return None, validators
+        return self._parse_feed(resp.content), validators
+
+    @staticmethod
+    def _parse_feed(content: bytes) -> List[dict]:
+        feed = feedparser.parse(content)
+        items = []
+        
+        if hasattr(feed, 'bozo') and feed.bozo:
+            logger.warning(f"Feed parsing warning: {feed.bozo_exception}")
+        
+        for entry in feed.entries:
+            torrent_url = None
+            magnet = None
+            
+            # Check standard enclosure for torrent file
+            for link in entry.get('links', []):
+                if link.get('type') == 'application/x-bittorrent':
+                    torrent_url = link.get('href')
+                    
+            # Some feeds put magnet in link
+            if entry.get('link', '').startswith("magnet:"):
+                magnet = entry.link
+                
+            items.append({
+                "guid": entry.get('guid', entry.get('link')), # Fallback to link if guid missing
+                "title": entry.title,
+                "link": entry.link,
+                "torrent_url": torrent_url,
+                "magnet": magnet, 
+                # published_parsed returns time.struct_time
+                "pub_date": entry.get('published_parsed')
+            })
+        
+        logger.info(f"Parsed {len(items)} items from RSS")
+        return items
+
     def extract_magnet(self, item: dict) -> str:
         """从 RSS 条目中提取磁力链接"""
         # Placeholder if we need to extract from description or fetch page
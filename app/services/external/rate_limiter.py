@@ -0,0 +1,216 @@
+"""
+Client-side rate limiting for external services (TMDB, Bangumi, Mikan, LLM).
+
+Every upstream gets a token bucket (requests per second + burst), a
+concurrency limit and shared back-off: when one request is answered with
+429/503, all callers of that upstream pause until Retry-After has passed.
+Limits are read from the settings table ("<upstream>.rate_limit",
+"<upstream>.max_concurrency") and picked up without a restart.
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from loguru import logger
+
+# Status codes that mean "slow down and try again"
+RETRY_STATUS = {429, 503}
+
+# upstream -> (requests per second, max concurrency)
+DEFAULT_LIMITS = {
+    "tmdb": (20.0, 8),
+    "bangumi": (5.0, 4),
+    "mikan": (2.0, 4),
+    "llm": (2.0, 3),
+}
+
+class RateLimiter:
+    """Token bucket + concurrency governor for one upstream"""
+
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 1.0  # seconds
+    BACKOFF_CAP = 60.0
+
+    _instances: Dict[str, "RateLimiter"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self.name = name
+        self._default_rate, self._default_concurrency = DEFAULT_LIMITS.get(name, (5.0, 4))
+        self._lock = threading.Lock()
+        self._tokens: Optional[float] = None
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        # Slots in use, checked against the configured limit on every acquire so it can change at runtime
+        self._async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, list]" = weakref.WeakKeyDictionary()
+        self._thread_active = 0
+        self._thread_condition = threading.Condition()
+
+    @classmethod
+    def for_upstream(cls, name: str) -> "RateLimiter":
+        """Return the process-wide limiter of an upstream"""
+        limiter = cls._instances.get(name)
+        if limiter is None:
+            with cls._instances_lock:
+                limiter = cls._instances.setdefault(name, cls(name))
+        return limiter
+
+    # --- Configuration ---
+
+    @property
+    def rate(self) -> float:
+        from app.services.system.settings_service import SettingsService
+        try:
+            rate = float(SettingsService.get_setting(f"{self.name}.rate_limit", str(self._default_rate)))
+        except (TypeError, ValueError):
+            rate = self._default_rate
+        return rate if rate > 0 else self._default_rate
+
+    @property
+    def concurrency(self) -> int:
+        from app.services.system.settings_service import SettingsService
+        try:
+            limit = int(SettingsService.get_setting(f"{self.name}.max_concurrency", str(self._default_concurrency)))
+        except (TypeError, ValueError):
+            limit = self._default_concurrency
+        return max(1, limit)
+
+    # --- Token bucket ---
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before sending"""
+        rate = self.rate
+        burst = max(1.0, rate)
+        with self._lock:
+            now = time.monotonic()
+            if self._tokens is None:
+                self._tokens = burst
+            else:
+                self._tokens = min(burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+
+            # Tokens may go negative: that is the queue of callers already waiting
+            self._tokens -= 1
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def block(self, seconds: float):
+        """Pause every caller of this upstream for `seconds`"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _retry_delay(self, retry_after: Optional[str], attempt: int) -> float:
+        """Delay before retrying: Retry-After if given, else exponential back-off, both jittered"""
+        delay = None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+
+        if delay is None:
+            backoff = min(self.BACKOFF_CAP, self.BACKOFF_BASE * (2 ** attempt))
+            return backoff / 2 + random.uniform(0, backoff / 2)
+        delay = min(self.BACKOFF_CAP, max(0.0, delay))
+        return delay + random.uniform(0, max(0.5, delay * 0.1))
+
+    # --- Concurrency ---
+
+    def _get_async_slots(self) -> list:
+        """[slots in use, condition] of the running loop"""
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots.setdefault(loop, [0, asyncio.Condition()])
+        return slots
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot and a rate token for one request (async)"""
+        slots = self._get_async_slots()
+        condition = slots[1]
+        async with condition:
+            await condition.wait_for(lambda: slots[0] < self.concurrency)
+            slots[0] += 1
+        try:
+            wait = self._reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            async with condition:
+                slots[0] -= 1
+                # Every waiter re-checks the limit, which may have been raised meanwhile
+                condition.notify_all()
+
+    @contextmanager
+    def slot_sync(self):
+        """Hold a concurrency slot and a rate token for one request (blocking)"""
+        with self._thread_condition:
+            self._thread_condition.wait_for(lambda: self._thread_active < self.concurrency)
+            self._thread_active += 1
+        try:
+            wait = self._reserve()
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            with self._thread_condition:
+                self._thread_active -= 1
+                self._thread_condition.notify_all()
+
+    # --- Requests ---
+
+    def _back_off(self, status: Optional[int], headers, attempt: int) -> bool:
+        """Pause every caller after a 429/503 and return True if the request should be sent again"""
+        if status not in RETRY_STATUS or attempt == self.MAX_RETRIES:
+            return False
+        delay = self._retry_delay(headers.get("Retry-After") if headers is not None else None, attempt)
+        logger.warning(f"{self.name} returned {status}, backing off {delay:.1f}s (attempt {attempt + 1}/{self.MAX_RETRIES})")
+        self.block(delay)
+        return True
+
+    def retry_error(self, error: Exception, attempt: int) -> bool:
+        """
+        Same as for responses, for SDK errors carrying the HTTP response
+        (openai.APIStatusError: status_code and response.headers)
+        """
+        response = getattr(error, "response", None)
+        return self._back_off(getattr(error, "status_code", None), getattr(response, "headers", None), attempt)
+
+    async def request(self, client, method: str, url: str, **kwargs):
+        """Send a request through an httpx.AsyncClient, retrying on 429/503"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            async with self.slot():
+                response = await client.request(method, url, **kwargs)
+            if not self._back_off(response.status_code, response.headers, attempt):
+                return response
+        return response
+
+    def request_sync(self, session, method: str, url: str, **kwargs):
+        """Send a request through a requests.Session (or the requests module), retrying on 429/503"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            with self.slot_sync():
+                response = session.request(method, url, **kwargs)
+            if not self._back_off(response.status_code, response.headers, attempt):
+                return response
+        return response
+
+    async def call(self, fn, *args, **kwargs):
+        """Await an SDK call in a slot, retrying when it raises a 429/503 error"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                async with self.slot():
+                    return await fn(*args, **kwargs)
+            except Exception as e:
+                if not self.retry_error(e, attempt):
+                    raise
@@ -0,0 +1,148 @@
+"""
+Persistent TMDB response cache, shared by every TMDBService instance and
+by both the API and the worker process (stored in hoshino.db).
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from loguru import logger
+from sqlalchemy import func
+from app.db.session import SessionLocal
+from app.db.models import TMDBCacheEntry
+
+# Sentinel returned by TMDBCache.get when nothing usable is cached
+MISS = object()
+
+class TMDBCache:
+    """SQLite-backed cache keyed by endpoint + request params (including language)"""
+
+    # Time-to-live per endpoint
+    TTL = {
+        "search": timedelta(days=3),
+        "tv": timedelta(hours=12),  # next_episode_to_air changes while a show is airing
+        "season": timedelta(days=1),
+        "configuration": timedelta(days=7),
+    }
+    DEFAULT_TTL = timedelta(hours=12)
+    # Empty results and 404s are retried sooner
+    NEGATIVE_TTL = timedelta(hours=6)
+    # Expired rows are purged every N writes
+    PURGE_EVERY = 500
+
+    # Per-process counters
+    _stats = {"hits": 0, "negative_hits": 0, "misses": 0, "writes": 0}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        from app.services.system.settings_service import SettingsService
+        return SettingsService.get_setting("tmdb.cache_enabled", "true") == "true"
+
+    @staticmethod
+    def make_key(endpoint: str, path: str, params: Dict[str, Any]) -> str:
+        """Build a stable cache key. Credentials are never part of the key."""
+        clean_params = {k: str(v) for k, v in params.items() if k != "api_key"}
+        raw = json.dumps([endpoint, path, clean_params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _count(cls, name: str):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    @classmethod
+    def get(cls, key: str) -> Any:
+        """Return the cached response (None for a cached 404) or MISS"""
+        if not cls.enabled():
+            return MISS
+
+        try:
+            with SessionLocal() as db:
+                entry = db.query(TMDBCacheEntry).filter(
+                    TMDBCacheEntry.key == key,
+                    TMDBCacheEntry.expires_at > datetime.utcnow()
+                ).first()
+                if not entry:
+                    cls._count("misses")
+                    return MISS
+
+                cls._count("negative_hits" if entry.is_negative else "hits")
+                return json.loads(entry.payload) if entry.payload is not None else None
+        except Exception as e:
+            logger.warning(f"TMDB cache read failed: {e}")
+            return MISS
+
+    @classmethod
+    def put(cls, endpoint: str, key: str, data: Any, negative: bool = False):
+        """Store a response. `negative` marks empty results (and 404s, passed as data=None)."""
+        if not cls.enabled():
+            return
+
+        ttl = cls.NEGATIVE_TTL if negative or data is None else cls.TTL.get(endpoint, cls.DEFAULT_TTL)
+        now = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                db.merge(TMDBCacheEntry(
+                    key=key,
+                    endpoint=endpoint,
+                    payload=json.dumps(data, ensure_ascii=False) if data is not None else None,
+                    is_negative=negative or data is None,
+                    created_at=now,
+                    expires_at=now + ttl
+                ))
+                db.commit()
+
+            with cls._lock:
+                cls._stats["writes"] += 1
+                should_purge = cls._stats["writes"] % cls.PURGE_EVERY == 0
+            if should_purge:
+                cls.purge_expired()
+        except Exception as e:
+            logger.warning(f"TMDB cache write failed: {e}")
+
+    @staticmethod
+    def purge_expired() -> int:
+        """Delete expired rows, returns the number removed"""
+        with SessionLocal() as db:
+            removed = db.query(TMDBCacheEntry).filter(
+                TMDBCacheEntry.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+        return removed
+
+    @staticmethod
+    def clear(endpoint: Optional[str] = None) -> int:
+        """Remove all entries (or only those of one endpoint)"""
+        with SessionLocal() as db:
+            query = db.query(TMDBCacheEntry)
+            if endpoint:
+                query = query.filter(TMDBCacheEntry.endpoint == endpoint)
+            removed = query.delete(synchronize_session=False)
+            db.commit()
+        return removed
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Hit/miss counters of this process plus a summary of stored entries"""
+        with cls._lock:
+            counters = dict(cls._stats)
+        lookups = counters["hits"] + counters["negative_hits"] + counters["misses"]
+        counters["hit_rate"] = round((counters["hits"] + counters["negative_hits"]) / lookups, 4) if lookups else 0.0
+
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            rows = db.query(
+                TMDBCacheEntry.endpoint, func.count(TMDBCacheEntry.key)
+            ).group_by(TMDBCacheEntry.endpoint).all()
+            expired = db.query(func.count(TMDBCacheEntry.key)).filter(TMDBCacheEntry.expires_at <= now).scalar() or 0
+            negative = db.query(func.count(TMDBCacheEntry.key)).filter(TMDBCacheEntry.is_negative == True).scalar() or 0
+
+        return {
+            "enabled": cls.enabled(),
+            "counters": counters,
+            "entries": {endpoint: count for endpoint, count in rows},
+            "negative_entries": negative,
+            "expired_entries": expired,
+        }
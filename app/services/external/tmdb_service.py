@@ -1,6 +1,10 @@
+import asyncio
 import httpx
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from app.core.config import get_settings
+from app.services.external.tmdb_cache import TMDBCache, MISS
+from app.services.external.http_client import HttpClients
+from app.services.external.rate_limiter import RateLimiter
 from loguru import logger
 
 class TMDBCandidate:
@@ -47,18 +51,11 @@ class TMDBService:
         self.api_key = SettingsService.get_setting("tmdb.api_key", "")
         self.config_cache = {}
 
-    async def get_configuration(self) -> Dict[str, Any]:
-        """Fetch and cache TMDB configuration (images, etc)"""
-        if self.config_cache:
-            return self.config_cache
-
-        if not self.api_key and not self.bearer_token:
-            return {}
-
+    def _auth(self) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Build auth headers/params, preferring the v4 Bearer Token"""
         headers = {}
         params = {}
 
-        # Prioritize Bearer Token
         if self.bearer_token:
              headers['Authorization'] = f"Bearer {self.bearer_token}"
         elif self.api_key:
@@ -67,29 +64,64 @@ class TMDBService:
                  headers['Authorization'] = f"Bearer {self.api_key}"
              else:
                  params['api_key'] = self.api_key
+        return headers, params
+
+    async def _get_json(self, endpoint: str, path: str, params: Dict[str, Any], is_empty=None) -> Optional[Dict[str, Any]]:
+        """
+        GET a TMDB endpoint through the persistent response cache.
+
+        Returns None for a 404. Network and other HTTP errors are raised and never cached.
+        `is_empty(data)` marks a response for negative caching (shorter TTL).
+        Cache reads and writes hit SQLite, so they run in a worker thread.
+        """
+        key = TMDBCache.make_key(endpoint, path, params)
+        cached = await asyncio.to_thread(TMDBCache.get, key)
+        if cached is not MISS:
+            return cached
+
+        headers, auth_params = self._auth()
+        response = await RateLimiter.for_upstream("tmdb").request(
+            HttpClients.get("tmdb"),
+            "GET",
+            f"{self.base_url}{path}",
+            params={**params, **auth_params},
+            headers=headers
+        )
+
+        if response.status_code == 404:
+            await asyncio.to_thread(TMDBCache.put, endpoint, key, None, negative=True)
+            return None
+
+        response.raise_for_status()
+        data = response.json()
+        await asyncio.to_thread(TMDBCache.put, endpoint, key, data, negative=bool(is_empty and is_empty(data)))
+        return data
+
+    async def get_configuration(self, raise_errors: bool = False) -> Dict[str, Any]:
+        """Fetch and cache TMDB configuration (images, etc); raise_errors: raise request errors instead of returning {}"""
+        if self.config_cache:
+            return self.config_cache
+
+        if not self.api_key and not self.bearer_token:
+            return {}
 
         try:
-             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/configuration",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                self.config_cache = response.json()
-                return self.config_cache
+            self.config_cache = await self._get_json("configuration", "/configuration", {}) or {}
+            return self.config_cache
         except Exception as e:
             logger.error(f"TMDB Config Error: {e}")
+            if raise_errors:
+                raise
             return {}
         
-    async def search_anime(self, query: str, year: Optional[int] = None) -> List[TMDBCandidate]:
+    async def search_anime(self, query: str, year: Optional[int] = None, raise_errors: bool = False) -> List[TMDBCandidate]:
         """
         Search for anime on TMDB
         
         Args:
             query: Anime title to search for
             year: Optional year to filter results
+            raise_errors: Raise request errors instead of returning an empty list
             
         Returns:
             List of TMDBCandidate objects
@@ -104,69 +136,53 @@ class TMDBService:
         default_lang = SettingsService.get_setting("tmdb.language", "zh-CN")
         # Search language (fallback to default_lang)
         search_lang = SettingsService.get_setting("tmdb.search_language", default_lang)
-        
-        params = {
-            'query': query,
-            'language': search_lang,
-            'include_adult': 'false'
-        }
 
-        headers = {}
         params = {
             'query': query,
             'language': search_lang,
             'include_adult': 'false'
         }
-
-        # Prioritize Bearer Token
-        if self.bearer_token:
-             headers['Authorization'] = f"Bearer {self.bearer_token}"
-        elif self.api_key:
-             if self.api_key.startswith("ey"):
-                 headers['Authorization'] = f"Bearer {self.api_key}"
-             else:
-                 params['api_key'] = self.api_key
         
         if year:
             params['first_air_date_year'] = year
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/search/tv",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                results = data.get('results', [])
-                
-                # Filter for animation genre and Japanese origin
-                anime_results = [
-                    TMDBCandidate(result) 
-                    for result in results
-                    if self.ANIMATION_GENRE_ID in result.get('genre_ids', [])
-                    and ('JP' in result.get('origin_country', []) or 
-                         result.get('original_language') == 'ja')
-                ]
+            data = await self._get_json(
+                "search", "/search/tv", params,
+                is_empty=lambda d: not d.get('results')
+            ) or {}
                 
-                return anime_results
+            results = data.get('results', [])
+            
+            # Filter for animation genre and Japanese origin
+            anime_results = [
+                TMDBCandidate(result) 
+                for result in results
+                if self.ANIMATION_GENRE_ID in result.get('genre_ids', [])
+                and ('JP' in result.get('origin_country', []) or 
+                     result.get('original_language') == 'ja')
+            ]
+            
+            return anime_results
                 
         except httpx.HTTPStatusError as e:
             logger.error(f"TMDB API HTTP Error: {e.response.status_code} - {e.response.text}")
+            if raise_errors:
+                raise
             return []
         except Exception as e:
             logger.exception("TMDB API Error")
+            if raise_errors:
+                raise
             return []
     
-    async def get_tv_details(self, tv_id: int) -> Optional[Dict[str, Any]]:
+    async def get_tv_details(self, tv_id: int, raise_errors: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get detailed information about a TV show
         
         Args:
             tv_id: TMDB TV show ID
+            raise_errors: Raise request errors instead of returning None
             
         Returns:
             Dictionary with TV show details
@@ -179,45 +195,24 @@ class TMDBService:
         language = SettingsService.get_setting("tmdb.language", "zh-CN")
         
         params = {
-            'language': language
-        }
-        
-        headers = {}
-        params = {
-            'language': language
+            'language': language,
+            # Append useful metadata: alternative_titles, external_ids, keywords
+            'append_to_response': 'alternative_titles,external_ids,keywords,content_ratings'
         }
         
-        # Prioritize Bearer Token
-        if self.bearer_token:
-             headers['Authorization'] = f"Bearer {self.bearer_token}"
-        elif self.api_key:
-             if self.api_key.startswith("ey"):
-                 headers['Authorization'] = f"Bearer {self.api_key}"
-             else:
-                 params['api_key'] = self.api_key
-        
         try:
-            # Append useful metadata: alternative_titles, external_ids, keywords
-            params['append_to_response'] = 'alternative_titles,external_ids,keywords,content_ratings'
-            
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/tv/{tv_id}",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
-                
+            return await self._get_json("tv", f"/tv/{tv_id}", params)
         except Exception as e:
             logger.error(f"TMDB API Error: {e}")
+            if raise_errors:
+                raise
             return None
 
-    async def get_season_details(self, tv_id: int, season_number: int) -> Optional[Dict[str, Any]]:
+    async def get_season_details(self, tv_id: int, season_number: int,
+                                 raise_errors: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get detailed information about a season, including episodes
+        (raise_errors: raise request errors instead of returning None)
         """
         if not self.api_key and not self.bearer_token:
             return None
@@ -225,32 +220,19 @@ class TMDBService:
         from app.services.system.settings_service import SettingsService
         language = SettingsService.get_setting("tmdb.language", "zh-CN")
         
-        headers = {}
         params = {
             'language': language
         }
         
-        if self.bearer_token:
-             headers['Authorization'] = f"Bearer {self.bearer_token}"
-        elif self.api_key:
-             if self.api_key.startswith("ey"):
-                 headers['Authorization'] = f"Bearer {self.api_key}"
-             else:
-                 params['api_key'] = self.api_key
-        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/tv/{tv_id}/season/{season_number}",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
-                
+            return await self._get_json(
+                "season", f"/tv/{tv_id}/season/{season_number}", params,
+                is_empty=lambda d: not d.get('episodes')
+            )
         except Exception as e:
             logger.error(f"TMDB API Error (Season {season_number}): {e}")
+            if raise_errors:
+                raise
             return None
     
     def calculate_confidence(self, candidate: TMDBCandidate, query: str, year: Optional[int] = None) -> float:
@@ -4,17 +4,60 @@ Settings service for type-safe access to key-value settings
 from typing import Optional, List, Dict, Any
 from app.db.session import SessionLocal
 from app.db.models import Setting
+from app.db.versions import get_version, bump_version
+import threading
+import time
 import json
 
+SETTINGS_VERSION_KEY = "settings"
+
 class SettingsService:
     """Service for accessing and managing settings"""
-    
+
+    # Process-wide cache of the settings table (key -> value).
+    # Writes in this process invalidate it directly; writes from another process
+    # (API vs Huey worker) are noticed through the shared "settings" version counter.
+    _cache: Optional[Dict[str, str]] = None
+    _cache_version: Optional[int] = None
+    _cache_checked_at: float = 0.0
+    _cache_lock = threading.Lock()
+    # Seconds between checks of the version counter
+    VERSION_CHECK_INTERVAL = 2.0
+
+    @staticmethod
+    def _cached_values() -> Dict[str, str]:
+        """Return the cached settings, reloading them if another writer bumped the version"""
+        cls = SettingsService
+        cache = cls._cache
+        if cache is not None and time.monotonic() - cls._cache_checked_at < cls.VERSION_CHECK_INTERVAL:
+            return cache
+
+        with cls._cache_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if cls._cache is not None and time.monotonic() - cls._cache_checked_at < cls.VERSION_CHECK_INTERVAL:
+                return cls._cache
+
+            with SessionLocal() as db:
+                version = get_version(db, SETTINGS_VERSION_KEY)
+                if cls._cache is None or version != cls._cache_version:
+                    rows = db.query(Setting.key, Setting.value).all()
+                    cls._cache = {key: value for key, value in rows}
+                    cls._cache_version = version
+            cls._cache_checked_at = time.monotonic()
+            return cls._cache
+
+    @staticmethod
+    def invalidate_cache():
+        """Drop the in-process settings cache; the next read reloads the table"""
+        with SettingsService._cache_lock:
+            SettingsService._cache = None
+            SettingsService._cache_version = None
+
     @staticmethod
     def get_setting(key: str, default: str = "") -> str:
         """Get a single setting value by key"""
-        with SessionLocal() as db:
-            setting = db.query(Setting).filter(Setting.key == key).first()
-            return setting.value if setting else default
+        values = SettingsService._cached_values()
+        return values[key] if key in values else default
     
     @staticmethod
     def set_setting(key: str, value: str) -> bool:
@@ -23,7 +66,9 @@ class SettingsService:
             setting = db.query(Setting).filter(Setting.key == key).first()
             if setting:
                 setting.value = value
+                bump_version(db, SETTINGS_VERSION_KEY)
                 db.commit()
+                SettingsService.invalidate_cache()
                 return True
             return False
     
@@ -85,12 +130,15 @@ class SettingsService:
                     setting = db.query(Setting).filter(Setting.key == key).first()
                     if setting:
                         setting.value = value
+                bump_version(db, SETTINGS_VERSION_KEY)
                 db.commit()
                 return True
             except Exception as e:
                 db.rollback()
                 print(f"Batch update failed: {e}")
                 return False
+            finally:
+                SettingsService.invalidate_cache()
 
     @staticmethod
     def initialize_defaults():
@@ -139,6 +187,260 @@ class SettingsService:
                 "description": "Bangumi 个人访问令牌 (Access Token)，部分接口需要",
                 "order": 2
             },
+            {
+                "key": "bangumi.metadata_ttl_hours",
+                "value": "24",
+                "name": "剧集元数据有效期 (小时)",
+                "class_type": "number",
+                "category": "bangumi",
+                "description": "已缓存的 Bangumi 剧集信息在此时间内视为最新，不会重复获取",
+                "order": 3
+            },
+            {
+                "key": "bangumi.fetch_batch_size",
+                "value": "20",
+                "name": "元数据获取批大小",
+                "class_type": "number",
+                "category": "bangumi",
+                "description": "后台获取 Bangumi 元数据时每批处理的番剧数量",
+                "order": 4
+            },
+            
+            # TMDB Settings
+            {
+                "key": "tmdb.cache_enabled",
+                "value": "true",
+                "name": "启用 TMDB 响应缓存",
+                "class_type": "select",
+                "options": json.dumps(["true", "false"]),
+                "category": "tmdb",
+                "description": "将 TMDB 查询结果缓存到本地数据库，避免重复请求",
+                "order": 10
+            },
+            
+            # Rate Limits (per upstream)
+            {
+                "key": "tmdb.rate_limit",
+                "value": "20",
+                "name": "TMDB 请求速率 (次/秒)",
+                "class_type": "number",
+                "category": "tmdb",
+                "description": "客户端限速：每秒最多发往 TMDB 的请求数，遇到 429 时自动退避",
+                "order": 11
+            },
+            {
+                "key": "tmdb.max_concurrency",
+                "value": "8",
+                "name": "TMDB 最大并发数",
+                "class_type": "number",
+                "category": "tmdb",
+                "description": "同时进行的 TMDB 请求数上限",
+                "order": 12
+            },
+            {
+                "key": "bangumi.rate_limit",
+                "value": "5",
+                "name": "Bangumi 请求速率 (次/秒)",
+                "class_type": "number",
+                "category": "bangumi",
+                "description": "客户端限速：每秒最多发往 Bangumi 的请求数，遇到 429 时自动退避",
+                "order": 10
+            },
+            {
+                "key": "bangumi.max_concurrency",
+                "value": "4",
+                "name": "Bangumi 最大并发数",
+                "class_type": "number",
+                "category": "bangumi",
+                "description": "同时进行的 Bangumi 请求数上限",
+                "order": 11
+            },
+            {
+                "key": "mikan.rate_limit",
+                "value": "2",
+                "name": "Mikan 请求速率 (次/秒)",
+                "class_type": "number",
+                "category": "mikan",
+                "description": "客户端限速：每秒最多发往 Mikan 的请求数，遇到 429 时自动退避",
+                "order": 10
+            },
+            {
+                "key": "mikan.max_concurrency",
+                "value": "4",
+                "name": "Mikan 最大并发数",
+                "class_type": "number",
+                "category": "mikan",
+                "description": "同时进行的 Mikan 请求数上限",
+                "order": 11
+            },
+            {
+                "key": "llm.rate_limit",
+                "value": "2",
+                "name": "LLM 请求速率 (次/秒)",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "客户端限速：每秒最多发往 LLM 的请求数，遇到 429 时自动退避",
+                "order": 10
+            },
+            {
+                "key": "llm.max_concurrency",
+                "value": "3",
+                "name": "LLM 最大并发数",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "同时进行的 LLM 请求数上限",
+                "order": 11
+            },
+            {
+                "key": "llm.cache_enabled",
+                "value": "true",
+                "name": "启用 LLM 结果缓存",
+                "class_type": "select",
+                "options": json.dumps(["true", "false"]),
+                "category": "llm_tuning",
+                "description": "缓存模型对相同文件列表的分析结果，重试或重新扫描未变化的目录时不再消耗 Token",
+                "order": 12
+            },
+            {
+                "key": "llm.cache_ttl_hours",
+                "value": "720",
+                "name": "LLM 缓存有效期 (小时)",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "缓存结果的保留时间，过期后重新请求模型",
+                "order": 13
+            },
+            {
+                "key": "llm.max_connections",
+                "value": "10",
+                "name": "LLM 最大连接数",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "复用的 LLM 客户端连接池大小",
+                "order": 14
+            },
+            {
+                "key": "llm.max_keepalive_connections",
+                "value": "5",
+                "name": "LLM 保活连接数",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "连接池中保持空闲 (keep-alive) 的连接数",
+                "order": 15
+            },
+            {
+                "key": "llm.timeout",
+                "value": "120",
+                "name": "LLM 请求超时 (秒)",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "单次模型请求的读写超时时间",
+                "order": 16
+            },
+            {
+                "key": "llm.connect_timeout",
+                "value": "10",
+                "name": "LLM 连接超时 (秒)",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "建立连接 (TCP + TLS) 的超时时间",
+                "order": 17
+            },
+            {
+                "key": "llm.chunk_token_budget",
+                "value": "3000",
+                "name": "命名分块 Token 预算",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "大目录的命名请求按此预算拆分为多个分块，避免输出过长被截断",
+                "order": 18
+            },
+            {
+                "key": "llm.max_parallel_chunks",
+                "value": "4",
+                "name": "命名分块并行数",
+                "class_type": "number",
+                "category": "llm_tuning",
+                "description": "同一目录同时请求的分块数量 (仍受 LLM 最大并发数限制)",
+                "order": 19
+            },
+            
+            # Network Settings (pooled HTTP clients for TMDB / Bangumi)
+            {
+                "key": "http.max_connections",
+                "value": "20",
+                "name": "最大连接数",
+                "class_type": "number",
+                "category": "network",
+                "description": "每个外部服务 (TMDB、Bangumi) 的连接池最大连接数",
+                "order": 1
+            },
+            {
+                "key": "http.max_keepalive_connections",
+                "value": "10",
+                "name": "最大保活连接数",
+                "class_type": "number",
+                "category": "network",
+                "description": "连接池中保持空闲复用的最大连接数",
+                "order": 2
+            },
+            {
+                "key": "http.keepalive_expiry",
+                "value": "60",
+                "name": "保活时间 (秒)",
+                "class_type": "number",
+                "category": "network",
+                "description": "空闲连接在连接池中保留的时间",
+                "order": 3
+            },
+            {
+                "key": "http.timeout",
+                "value": "10",
+                "name": "请求超时 (秒)",
+                "class_type": "number",
+                "category": "network",
+                "description": "外部元数据请求的读写超时时间",
+                "order": 4
+            },
+            {
+                "key": "http.connect_timeout",
+                "value": "5",
+                "name": "连接超时 (秒)",
+                "class_type": "number",
+                "category": "network",
+                "description": "建立连接 (TCP + TLS) 的超时时间",
+                "order": 5
+            },
+            
+            # Directory Watcher (inotify)
+            {
+                "key": "watcher.enabled",
+                "value": "false",
+                "name": "启用目录监听",
+                "class_type": "select",
+                "options": json.dumps(["true", "false"]),
+                "category": "watcher",
+                "description": "使用 inotify 监听下载目录与媒体库，文件变化时只处理受影响的目录 (仅 Linux，修改后需重启 Worker)",
+                "order": 1
+            },
+            {
+                "key": "watcher.debounce_seconds",
+                "value": "10",
+                "name": "防抖时间 (秒)",
+                "class_type": "number",
+                "category": "watcher",
+                "description": "目录在此时间内没有新事件后才触发处理",
+                "order": 2
+            },
+            {
+                "key": "watcher.max_delay_seconds",
+                "value": "120",
+                "name": "最长等待 (秒)",
+                "class_type": "number",
+                "category": "watcher",
+                "description": "持续有事件的目录最迟在此时间后处理",
+                "order": 3
+            },
             
             # App Defaults (Ensure they exist)
             {
@@ -170,6 +472,42 @@ class SettingsService:
                 "description": "默认的番剧归档根目录",
                 "order": 3
             },
+            {
+                "key": "app.scan_concurrency",
+                "value": "4",
+                "name": "整理扫描并发数",
+                "class_type": "number",
+                "category": "app",
+                "description": "整理扫描时同时分析的目录数量 (计划与日志顺序不变)",
+                "order": 4
+            },
+            {
+                "key": "app.library_concurrency",
+                "value": "8",
+                "name": "媒体库刷新并发数",
+                "class_type": "number",
+                "category": "app",
+                "description": "刷新媒体库时同时处理 (读取目录与查询 TMDB) 的番剧数量",
+                "order": 5
+            },
+            {
+                "key": "app.stream_chunk_size_kb",
+                "value": "1024",
+                "name": "视频流分块大小 (KB)",
+                "class_type": "number",
+                "category": "app",
+                "description": "在线播放时每次读取并发送的数据块大小，服务器支持零拷贝时不生效",
+                "order": 6
+            },
+            {
+                "key": "app.image_cache_mb",
+                "value": "512",
+                "name": "海报缓存上限 (MB)",
+                "class_type": "number",
+                "category": "app",
+                "description": "本地缓存的海报原图与缩略图总大小，超出后按最近最少使用淘汰",
+                "order": 7
+            },
             
             # Notification Settings - Email
             {
@@ -281,9 +619,16 @@ class SettingsService:
         ]
         
         with SessionLocal() as db:
+            changed = False
             for item in defaults:
                 existing = db.query(Setting).filter(Setting.key == item['key']).first()
-                if not existing:
+                if existing:
+                    # Settings moved to another category keep their value
+                    if existing.category != item['category']:
+                        existing.category = item['category']
+                        changed = True
+                else:
+                    changed = True
                     new_setting = Setting(
                         key=item['key'],
                         value=item['value'],
@@ -295,5 +640,8 @@ class SettingsService:
                         order=item['order']
                     )
                     db.add(new_setting)
+            if changed:
+                bump_version(db, SETTINGS_VERSION_KEY)
             db.commit()
+        SettingsService.invalidate_cache()
 
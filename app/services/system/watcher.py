@@ -0,0 +1,240 @@
+"""
+Event-driven directory watcher (Linux inotify via ctypes).
+
+Watches whole trees (inotify itself is not recursive, so every directory
+gets a watch and new directories are added as they appear), debounces the
+events and hands coalesced per-directory batches to a callback. Unavailable
+on other platforms: check INOTIFY_AVAILABLE.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Set, Tuple
+from loguru import logger
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Finished files and directory changes. IN_MODIFY is left out on purpose:
+# a downloading torrent emits it for every written block.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+if sys.platform.startswith("linux"):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1  # noqa: B018 - raises AttributeError on libcs without inotify
+    except (OSError, AttributeError):
+        _libc = None
+INOTIFY_AVAILABLE = _libc is not None
+
+class Inotify:
+    """Minimal recursive inotify wrapper"""
+
+    def __init__(self):
+        if not INOTIFY_AVAILABLE:
+            raise RuntimeError("inotify is not available on this platform")
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.paths: Dict[int, str] = {}  # watch descriptor -> directory
+
+    def add(self, path: str) -> bool:
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.warning(f"inotify watch limit reached at {path} (raise fs.inotify.max_user_watches)")
+            elif err not in (errno.ENOENT, errno.ENOTDIR):
+                logger.warning(f"Failed to watch {path}: {os.strerror(err)}")
+            return False
+        self.paths[wd] = path
+        return True
+
+    def remove_tree(self, root: str):
+        """Stop watching a directory and everything below it"""
+        for wd, path in list(self.paths.items()):
+            if path == root or path.startswith(root + os.sep):
+                _libc.inotify_rm_watch(self.fd, wd)
+                del self.paths[wd]
+
+    def rename(self, old: str, new: str):
+        """Point the watches of a moved directory tree at its new location"""
+        for wd, path in self.paths.items():
+            if path == old or path.startswith(old + os.sep):
+                self.paths[wd] = new + path[len(old):]
+
+    def add_tree(self, root: str) -> int:
+        """Watch a directory and everything below it, returns the number of watches added"""
+        count = 0
+        for dirpath, _, _ in os.walk(root):
+            count += self.add(dirpath)
+        return count
+
+    def read(self, timeout: float) -> List[Tuple[str, str, int]]:
+        """Wait up to `timeout` seconds and return [(directory, name, mask), ...]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        moved_from: Dict[int, str] = {}  # cookie -> old directory path
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(("", "", mask))
+                continue
+            path = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            if path is None:
+                continue
+            events.append((path, name, mask))
+
+            # Keep the map current so later events report where directories are now
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                moved_from[cookie] = os.path.join(path, name)
+            elif mask & IN_ISDIR and mask & IN_MOVED_TO and cookie in moved_from:
+                self.rename(moved_from.pop(cookie), os.path.join(path, name))
+            elif mask & IN_MOVE_SELF and not os.path.isdir(path):
+                # Moved out of the watched trees (or a root itself was moved)
+                self.remove_tree(path)
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class DirectoryWatcher:
+    """
+    Watches named roots and calls `on_changes(root_name, [changed paths])` once a
+    directory has been quiet for `debounce` seconds (or after `max_delay` at the latest).
+    Changed paths are the files and subdirectories events were reported for (the
+    directory itself for events on the directory), so callers can tell which subtree changed.
+    """
+
+    def __init__(self, roots: Dict[str, str], on_changes: Callable[[str, List[str]], None],
+                 debounce: float = 10.0, max_delay: float = 120.0):
+        self.roots = {name: os.path.normpath(path) for name, path in roots.items() if path and os.path.isdir(path)}
+        self.on_changes = on_changes
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # (root name, path) -> (first event, last event)
+        self._pending: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+
+    def _root_of(self, path: str) -> str:
+        """Name of the most specific root containing `path` (roots may be nested)"""
+        matches = [(len(root), name) for name, root in self.roots.items()
+                   if path == root or path.startswith(root + os.sep)]
+        return max(matches)[1] if matches else ""
+
+    def _mark(self, root_name: str, path: str, now: float):
+        first, _ = self._pending.get((root_name, path), (now, now))
+        self._pending[(root_name, path)] = (first, now)
+
+    def _handle(self, events: List[Tuple[str, str, int]], now: float):
+        for directory, name, mask in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: treat every root as changed
+                logger.warning("inotify queue overflow, marking all watched roots as changed")
+                for root_name, root in self.roots.items():
+                    self._mark(root_name, root, now)
+                continue
+
+            root_name = self._root_of(directory)
+            if not root_name:
+                continue
+            changed = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR and name and mask & (IN_CREATE | IN_MOVED_TO):
+                # New directories are not covered by existing watches
+                self._inotify.add_tree(changed)
+            self._mark(root_name, changed, now)
+
+    @staticmethod
+    def _coalesce(paths: Set[str]) -> List[str]:
+        """Drop paths whose ancestor is also in the batch"""
+        return sorted(p for p in paths if not any(p.startswith(q + os.sep) for q in paths))
+
+    def _flush(self, now: float):
+        due: Dict[str, Set[str]] = {}
+        for (root_name, path), (first, last) in list(self._pending.items()):
+            if now - last >= self.debounce or now - first >= self.max_delay:
+                due.setdefault(root_name, set()).add(path)
+                del self._pending[(root_name, path)]
+
+        for root_name, paths in due.items():
+            batch = self._coalesce(paths)
+            logger.info(f"Watcher: {len(batch)} changed paths under {root_name}")
+            try:
+                self.on_changes(root_name, batch)
+            except Exception as e:
+                logger.error(f"Watcher callback failed for {root_name}: {e}")
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                events = self._inotify.read(timeout=1.0)
+                now = time.monotonic()
+                if events:
+                    self._handle(events, now)
+                if self._pending:
+                    self._flush(now)
+        except Exception as e:
+            logger.error(f"Directory watcher stopped: {e}")
+        finally:
+            self._inotify.close()
+
+    def start(self) -> bool:
+        """Start watching in a daemon thread, returns False when nothing can be watched"""
+        if not INOTIFY_AVAILABLE:
+            logger.warning("Directory watcher disabled: inotify is not available on this platform")
+            return False
+        if not self.roots:
+            logger.warning("Directory watcher disabled: no existing directories to watch")
+            return False
+
+        self._inotify = Inotify()
+        for name, root in self.roots.items():
+            count = self._inotify.add_tree(root)
+            logger.info(f"Watching {name}: {root} ({count} directories)")
+        self._thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
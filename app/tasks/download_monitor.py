@@ -1,4 +1,4 @@
-from app.worker import huey
+from app.worker import huey, run_async
 from app.services.external.downloader import DownloaderService
 from app.services.core.organizer import OrganizerService
 from app.db.session import get_db
@@ -68,7 +68,7 @@ def check_downloads_task():
                 try:
                     # Execute scan with context
                     # OrganizerService.scan_directory is async, but we are in sync worker
-                    # Use asyncio.run
+                    # Run on the worker thread's persistent event loop
                     context = task.extra_vars or {}
                     
                     # We need to construct absolute save path
@@ -97,7 +97,7 @@ def check_downloads_task():
                             return True
                         return False
 
-                    completed = asyncio.run(run_scan())
+                    completed = run_async(run_scan())
                     
                     if completed:
                         task.status = "completed"
@@ -1,8 +1,10 @@
+import time
+from typing import Iterable
 from huey import crontab
-from app.worker import huey
+from app.worker import huey, run_async
 from loguru import logger
+from app.services.core.fetch_queue import LEASE
 from app.services.core.library import LibraryService
-import asyncio
 
 @huey.task(name='task_scan_library')
 def task_scan_library():
@@ -13,10 +15,7 @@ def task_scan_library():
     try:
         service = LibraryService()
         # Since LibraryService.scan_and_refresh is async, we need to run it in event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        stats = loop.run_until_complete(service.scan_and_refresh())
-        loop.close()
+        stats = run_async(service.scan_and_refresh())
         
         logger.info(f"Background scan finished. Stats: {stats}")
         return stats
@@ -24,21 +23,90 @@ def task_scan_library():
         logger.error(f"Background scan failed: {e}")
         import traceback
         traceback.print_exc()
-@huey.task(name='task_fetch_bangumi_metadata')
-def task_fetch_bangumi_metadata(item_id: int):
+# Set while a queue drain is scheduled but has not started, so bursts of
+# queued items schedule a single worker run
+DRAIN_SCHEDULED_KEY = "bangumi_fetch_drain_scheduled"
+# Set while a delayed drain for items with an expiring lease is scheduled
+RETRY_SCHEDULED_KEY = "bangumi_fetch_retry_scheduled"
+# Delay of that drain: past the lease of the items it retries
+RETRY_DELAY = int(LEASE.total_seconds()) + 60
+# A flag older than its task's delay plus this margin belongs to a task that never ran
+# (flushed queue, revoked task, crashed worker) and no longer blocks scheduling
+FLAG_STALE_AFTER = int(LEASE.total_seconds()) + 300
+
+def _set_flag(key: str, delay: float = 0) -> bool:
     """
-    Background task to fetch and cache Bangumi metadata for an item's episodes.
+    Set a scheduling flag to the current time. Returns True if it was not set,
+    or had been set longer than `delay` + FLAG_STALE_AFTER seconds ago.
     """
-    logger.info(f"Starting background Bangumi metadata fetch for item {item_id}...")
+    now = time.time()
+    if huey.put_if_empty(key, now):
+        return True
     try:
-        service = LibraryService()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        # We need a method that specifically fetches and saves, without returning data
-        loop.run_until_complete(service.fetch_item_metadata_background(item_id))
-        loop.close()
-        logger.info(f"Background metadata fetch finished for item {item_id}")
+        stale = now - float(huey.get(key, peek=True)) > delay + FLAG_STALE_AFTER
+    except (TypeError, ValueError):
+        stale = True  # Cleared meanwhile
+    if not stale:
+        return False
+    logger.warning(f"Scheduling flag {key} is stale, its task never ran; scheduling again")
+    huey.get(key)
+    return huey.put_if_empty(key, now)
+
+def queue_bangumi_fetch(item_ids: Iterable[int]):
+    """Queue items for a Bangumi metadata fetch and schedule a drain if none is pending"""
+    from app.services.core.fetch_queue import BangumiFetchQueue
+    if BangumiFetchQueue.push(item_ids) and _set_flag(DRAIN_SCHEDULED_KEY):
+        task_drain_bangumi_queue()
+
+@huey.task(name='task_drain_bangumi_queue')
+def task_drain_bangumi_queue():
+    """
+    Fetch Bangumi metadata for every queued item, batch by batch, in one worker run.
+    All batches share this worker's event loop, so they share the pooled HTTP client
+    and the Bangumi rate limiter.
+    """
+    from app.services.core.fetch_queue import BangumiFetchQueue
+    from app.services.system.settings_service import SettingsService
+
+    # Items queued from now on schedule the next run
+    huey.get(DRAIN_SCHEDULED_KEY)
+    try:
+        batch_size = max(1, int(SettingsService.get_setting("bangumi.fetch_batch_size", "20")))
+    except (TypeError, ValueError):
+        batch_size = 20
+
+    service = LibraryService()
+    totals = {"fetched": 0, "fresh": 0, "failed": 0}
+    try:
+        while True:
+            token, item_ids = BangumiFetchQueue.claim(batch_size)
+            if not item_ids:
+                break
+            failed_ids = []
+            stats = run_async(service.fetch_metadata_batch(item_ids, failed_ids))
+            # Failed items keep their lease and are retried once it expires
+            BangumiFetchQueue.complete(token, set(item_ids) - set(failed_ids))
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+        logger.info(f"Bangumi metadata queue drained: {totals}")
     except Exception as e:
-        logger.error(f"Background metadata fetch failed for item {item_id}: {e}")
+        logger.error(f"Bangumi metadata queue drain failed: {e}")
         import traceback
         traceback.print_exc()
+
+    if BangumiFetchQueue.leased() and _set_flag(RETRY_SCHEDULED_KEY, RETRY_DELAY):
+        # Come back for failed (or abandoned) items when their lease has expired
+        task_retry_bangumi_queue.schedule(delay=RETRY_DELAY)
+    return totals
+
+@huey.task(name='task_retry_bangumi_queue')
+def task_retry_bangumi_queue():
+    """Drain the fetch queue again once leases of failed items have expired"""
+    huey.get(RETRY_SCHEDULED_KEY)
+    if _set_flag(DRAIN_SCHEDULED_KEY):
+        task_drain_bangumi_queue()
+
+@huey.task(name='task_fetch_bangumi_metadata')
+def task_fetch_bangumi_metadata(item_id: int):
+    """Kept for tasks enqueued by older versions: forwards to the fetch queue"""
+    queue_bangumi_fetch([item_id])
@@ -7,12 +7,19 @@ from app.services.external.mikan import MikanService
 from app.services.external.downloader import DownloaderService, extract_info_hash
 from app.services.system.settings_service import SettingsService
 from app.services.core.renamer import RenamerService
+from app.services.core.subscription_filter import subscription_filters
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from sqlalchemy import insert
+from typing import Dict, List, Optional
 from loguru import logger
 import re
 import time
 from app.services.notification.notifier import Notifier
 
+# GUIDs per IN (...) query, below SQLite's bound parameter limit
+GUID_BATCH_SIZE = 500
+
 @huey.periodic_task(crontab(minute='*/30'), name='check_rss_updates')
 def check_rss_updates():
     """定时检查 RSS 更新（默认每 30 分钟）"""
@@ -20,6 +27,7 @@ def check_rss_updates():
     interval = int(settings.get_setting("mikan.check_interval", 30))
     
     logger.info("Starting periodic RSS check...")
+    started = time.perf_counter()
     
     db = SessionLocal()
     try:
@@ -29,12 +37,46 @@ def check_rss_updates():
             Subscription.auto_download == True
         ).all()
         
-        for sub in subscriptions:
-            try:
-                check_subscription_sync(sub, db)
-            except Exception as e:
-                logger.error(f"Error checking subscription {sub.title}: {e}")
+        # Feeds are fetched concurrently (bounded like the mikan rate limiter, one keep-alive
+        # session per pool thread); this thread is the only DB writer and handles each feed
+        # as soon as it arrives
+        try:
+            workers = max(1, int(settings.get_setting("mikan.max_concurrency", "4")))
+        except (TypeError, ValueError):
+            workers = 4
+        new_count = 0
+        failed = 0
+        unchanged = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rss-fetch") as pool:
+            futures = {
+                pool.submit(MikanService().fetch_rss, sub.rss_url,
+                            sub.rss_etag, sub.rss_last_modified, sub.rss_body_hash): sub
+                for sub in subscriptions
+            }
+            for future in as_completed(futures):
+                sub = futures[future]
+                try:
+                    items, validators = future.result()
+                    if items is None:
+                        # Feed unchanged (304 or same body): nothing to parse or match
+                        unchanged.append((sub.id, validators))
+                        continue
+                    new_count += check_subscription_sync(sub, db, items=items, validators=validators)
+                except Exception as e:
+                    failed += 1
+                    db.rollback()
+                    logger.error(f"Error checking subscription {sub.title}: {e}")
+        
+        if unchanged:
+            now = datetime.utcnow()
+            db.bulk_update_mappings(Subscription, [
+                {"id": sub_id, "last_check_at": now, **_validator_columns(validators)}
+                for sub_id, validators in unchanged
+            ])
+            db.commit()
             
+        logger.info(f"RSS check finished: {len(subscriptions)} subscriptions ({len(unchanged)} unchanged), "
+                    f"{new_count} new items, {failed} failed in {time.perf_counter() - started:.1f}s")
     finally:
         db.close()
 
@@ -54,8 +96,28 @@ def check_subscription_immediate(sub_id: int):
     finally:
         db.close()
 
-def check_subscription_sync(sub: Subscription, db):
-    """同步执行单个订阅检查逻辑"""
+def _validator_columns(validators: dict) -> dict:
+    return {
+        "rss_etag": validators.get("etag"),
+        "rss_last_modified": validators.get("last_modified"),
+        "rss_body_hash": validators.get("body_hash"),
+    }
+
+def _existing_items(db, guids: List[str]) -> Dict[str, RSSItem]:
+    """Already known RSS items of a feed by GUID, with one IN query per GUID_BATCH_SIZE"""
+    guids = list(dict.fromkeys(g for g in guids if g))
+    known = {}
+    for i in range(0, len(guids), GUID_BATCH_SIZE):
+        for rss_item in db.query(RSSItem).filter(RSSItem.guid.in_(guids[i:i + GUID_BATCH_SIZE])):
+            known[rss_item.guid] = rss_item
+    return known
+
+def check_subscription_sync(sub: Subscription, db, items: Optional[List[dict]] = None,
+                            validators: Optional[dict] = None) -> int:
+    """
+    同步执行单个订阅检查逻辑, returns the number of new items.
+    items/validators: feed entries and conditional GET validators already fetched by the caller.
+    """
     mikan = MikanService()
     downloader = DownloaderService()
     renamer = RenamerService()
@@ -63,14 +125,17 @@ def check_subscription_sync(sub: Subscription, db):
     logger.info(f"Checking updates for subscription: {sub.title}")
     
     # Parse RSS
-    items = mikan.parse_rss(sub.rss_url)
+    if items is None:
+        items, validators = mikan.fetch_rss(sub.rss_url)
     
     new_count = 0
+    failed_count = 0
+    known = _existing_items(db, [item['guid'] for item in items])
+    title_filter = subscription_filters.get(sub)
+    new_items = []
     for item in items:
         # Check if exists by GUID
-        existing = db.query(RSSItem).filter(
-            RSSItem.guid == item['guid']
-        ).first()
+        existing = known.get(item['guid'])
         
         rss_item = None
         
@@ -84,7 +149,7 @@ def check_subscription_sync(sub: Subscription, db):
             rss_item = existing
         else:
             # Apply filters for NEW items
-            if not _match_filters(item['title'], sub):
+            if not title_filter.matches(item['title']):
                 logger.info(f"Skipping due to filter: {item['title']} (Regex: {sub.filter_regex}, Kws: {sub.filter_keywords})")
                 continue
             
@@ -100,7 +165,9 @@ def check_subscription_sync(sub: Subscription, db):
                 torrent_url=item['torrent_url'],
                 pub_date=datetime(*item['pub_date'][:6]) if item['pub_date'] else datetime.utcnow()
             )
-            db.add(rss_item)
+            # Kept out of the session, inserted together after the loop
+            new_items.append(rss_item)
+            known[item['guid']] = rss_item
         
         # Try to get valid source
         source = item['magnet'] or item['torrent_url'] or item['link']
@@ -217,36 +284,30 @@ def check_subscription_sync(sub: Subscription, db):
             new_count += 1
             
         except Exception as e:
+            failed_count += 1
             logger.error(f"Failed to add torrent for {item['title']}: {e}", exc_info=True)
 
+    if new_items:
+        db.flush()  # Download tasks referenced by the new items
+        db.connection().execute(insert(RSSItem.__table__), [{
+            "subscription_id": rss_item.subscription_id,
+            "guid": rss_item.guid,
+            "title": rss_item.title,
+            "magnet_link": rss_item.magnet_link,
+            "torrent_url": rss_item.torrent_url,
+            "pub_date": rss_item.pub_date,
+            "downloaded": bool(rss_item.downloaded),
+            "download_task_id": rss_item.download_task_id,
+        } for rss_item in new_items])
+
+    # Remember the feed version, unless items failed and must be retried on the next poll
+    for column, value in _validator_columns(validators if validators and not failed_count else {}).items():
+        setattr(sub, column, value)
+
     # Update check time
     sub.last_check_at = datetime.utcnow()
     db.commit()
-
-def _match_filters(title: str, subscription: Subscription) -> bool:
-    """检查标题是否匹配过滤规则"""
-    # Regex Filter (First priority)
-    if subscription.filter_regex:
-        try:
-            if not re.search(subscription.filter_regex, title, re.IGNORECASE):
-                return False
-        except Exception as e:
-            logger.error(f"Invalid regex for sub {subscription.id}: {e}")
-            return False
-
-    # Includes
-    if subscription.filter_keywords:
-         for kw in subscription.filter_keywords:
-             if kw and kw.lower() not in title.lower():
-                 return False
-    
-    # Excludes
-    if subscription.exclude_keywords:
-        for kw in subscription.exclude_keywords:
-            if kw and kw.lower() in title.lower():
-                return False
-    
-    return True
+    return new_count
 
 @huey.periodic_task(crontab(minute='*'), name='auto_rename_files')
 def auto_rename_files():
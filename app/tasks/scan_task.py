@@ -1,19 +1,19 @@
 """扫描任务执行模块"""
-from app.worker import huey
+from app.worker import huey, run_async
 from app.db.session import SessionLocal
 from app.models.scan_task import ScanTask, beijing_now
 from app.services.core.organizer import OrganizerService
 from datetime import datetime
-import asyncio
 
 
 @huey.task(name='execute_scan_task')
-def execute_scan_task(task_id: str):
+def execute_scan_task(task_id: str, bypass_llm_cache: bool = False):
     """
     异步执行扫描任务
     
     Args:
         task_id: 任务 ID
+        bypass_llm_cache: 忽略 LLM 缓存，重新请求模型
     """
     db = SessionLocal()
     
@@ -30,6 +30,9 @@ def execute_scan_task(task_id: str):
         
         # 执行扫描
         organizer = OrganizerService()
+        organizer.bypass_llm_cache = bypass_llm_cache
+        # Manual scans usually repeat on the same directory: only changed folders are listed again
+        organizer.incremental_scan = True
         
         # 重写日志保存方法，直接保存到数据库
         original_add_log = organizer.add_log
@@ -57,12 +60,7 @@ def execute_scan_task(task_id: str):
         organizer.add_log = add_log_to_db
         
         # 执行扫描 (需要异步环境)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            plan = loop.run_until_complete(organizer.scan_directory(task.directory_path))
-        finally:
-            loop.close()
+        plan = run_async(organizer.scan_directory(task.directory_path))
         
         # 保存结果
         task.plan = [
@@ -0,0 +1,67 @@
+"""目录监听任务：由 inotify 事件驱动重命名与媒体库刷新"""
+import os
+from typing import List
+from loguru import logger
+from app.worker import huey, run_async
+from app.services.system.settings_service import SettingsService
+from app.services.system.watcher import DirectoryWatcher
+
+def _inside(path: str, content_path: str) -> bool:
+    """True if `path` is the torrent content path or lies inside it"""
+    return path == content_path or path.startswith(content_path + os.sep)
+
+@huey.task(name='task_process_download_changes')
+def task_process_download_changes(paths: List[str]):
+    """
+    Rename finished downloads whose files changed under `paths`
+    (same logic as auto_rename_files, limited to the affected torrents).
+    """
+    from app.services.core.renamer import RenamerService
+    from app.services.external.downloader import DownloaderService
+
+    tasks = DownloaderService().get_hoshino_tasks()
+    renamer = RenamerService()
+    for task in tasks:
+        if task.state in ['metaDL', 'allocating', 'queuedDL', 'checkingResumeData']:
+            continue
+        if not task.content_path:
+            continue
+        content_path = os.path.normpath(task.content_path)
+        if not any(_inside(os.path.normpath(p), content_path) for p in paths):
+            continue
+        try:
+            renamer.rename_torrent_files(task.hash)
+        except Exception as e:
+            logger.error(f"Watcher rename failed for {task.name}: {e}")
+
+@huey.task(name='task_refresh_library_paths')
+def task_refresh_library_paths(paths: List[str]):
+    """Refresh only the library items under the changed paths"""
+    from app.services.core.library import LibraryService
+    try:
+        stats = run_async(LibraryService().refresh_paths(paths))
+        logger.info(f"Watcher library refresh finished. Stats: {stats}")
+    except Exception as e:
+        logger.error(f"Watcher library refresh failed: {e}")
+
+def _on_changes(root_name: str, paths: List[str]):
+    if root_name == "downloads":
+        task_process_download_changes(paths)
+    elif root_name == "library":
+        task_refresh_library_paths(paths)
+
+def start_watcher() -> DirectoryWatcher:
+    """Start the directory watcher if watcher.enabled is set, returns None otherwise"""
+    if SettingsService.get_setting("watcher.enabled", "false") != "true":
+        return None
+
+    watcher = DirectoryWatcher(
+        {
+            "downloads": SettingsService.get_setting("downloader.download_path", ""),
+            "library": SettingsService.get_setting("app.target_library_path", ""),
+        },
+        _on_changes,
+        debounce=float(SettingsService.get_setting("watcher.debounce_seconds", "10")),
+        max_delay=float(SettingsService.get_setting("watcher.max_delay_seconds", "120")),
+    )
+    return watcher if watcher.start() else None
@@ -1,4 +1,6 @@
 from huey import SqliteHuey
+import asyncio
+import threading
 import os
 
 # 使用 SQLite 作为 Huey 后端
@@ -14,3 +16,29 @@ huey = SqliteHuey(
     filename=db_path,
     immediate=False  # 异步执行
 )
+
+# 每个 worker 线程持有一个常驻事件循环，使连接池化的 HTTP 客户端可以跨任务复用
+_local = threading.local()
+
+def run_async(coro):
+    """Run a coroutine on this worker thread's persistent event loop"""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+@huey.on_shutdown()
+def close_event_loop():
+    """Close pooled HTTP clients and the event loop of this worker thread"""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        return
+    from app.services.external.http_client import HttpClients
+    from app.services.analysis.llm_client import LLMClients
+    try:
+        loop.run_until_complete(HttpClients.aclose())
+        loop.run_until_complete(LLMClients.aclose())
+    finally:
+        loop.close()
@@ -33,6 +33,38 @@ def main():
                 conn.commit()
             print("✅ Migration 'add_seeding_time' completed.")
 
+        columns = [c['name'] for c in inspector.get_columns('library_items')]
+        if 'meta_hash' not in columns:
+            print("⚠️ 'meta_hash' column missing in 'library_items'. Migrating...")
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE library_items ADD COLUMN meta_hash VARCHAR"))
+                conn.commit()
+            print("✅ Migration 'add_library_meta_hash' completed.")
+        if 'fingerprint' not in columns:
+            print("⚠️ 'fingerprint' column missing in 'library_items'. Migrating...")
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE library_items ADD COLUMN fingerprint VARCHAR"))
+                conn.commit()
+            print("✅ Migration 'add_library_fingerprint' completed.")
+
+        columns = [c['name'] for c in inspector.get_columns('subscriptions')]
+        for column in ('rss_etag', 'rss_last_modified', 'rss_body_hash'):
+            if column not in columns:
+                print(f"⚠️ '{column}' column missing in 'subscriptions'. Migrating...")
+                with engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE subscriptions ADD COLUMN {column} VARCHAR"))
+                    conn.commit()
+                print(f"✅ Migration 'add_subscription_{column}' completed.")
+
+        columns = [c['name'] for c in inspector.get_columns('bangumi_fetch_queue')]
+        for column, sql_type in (('claimed_by', 'VARCHAR'), ('claimed_at', 'DATETIME')):
+            if column not in columns:
+                print(f"⚠️ '{column}' column missing in 'bangumi_fetch_queue'. Migrating...")
+                with engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE bangumi_fetch_queue ADD COLUMN {column} {sql_type}"))
+                    conn.commit()
+                print(f"✅ Migration 'add_fetch_queue_{column}' completed.")
+
     except Exception as e:
         print(f"❌ Failed to initialize Hoshino main database: {e}")
         sys.exit(1)
@@ -7,6 +7,7 @@ from app.tasks.scan_task import execute_scan_task
 import app.tasks.download_monitor # 导入监控任务
 import app.tasks.rss_monitor # 导入 RSS 监控任务
 import app.tasks.library_tasks # 导入媒体库扫描任务
+from app.tasks.watch_tasks import start_watcher # 目录监听 (inotify)
 
 if __name__ == "__main__":
     from huey.consumer import Consumer
@@ -15,6 +16,8 @@ if __name__ == "__main__":
     print("Registered tasks:")
     for task_name in huey._registry._registry:
         print(f"  - {task_name}")
+    if start_watcher():
+        print("Directory watcher started")
     print("Press Ctrl+C to stop")
     print()
     
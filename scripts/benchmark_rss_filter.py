@@ -0,0 +1,165 @@
+"""
+Benchmark RSS title filtering: the former per-title _match_filters against the
+compiled SubscriptionFilter.
+
+The corpus is a set of Mikan feed titles (various fansub groups, languages and
+naming styles) expanded over episode numbers, or the titles of saved RSS files.
+Each filter configuration is applied to every title with both implementations;
+decisions are checked to be identical before timing.
+
+Run with:
+    python scripts/benchmark_rss_filter.py
+    python scripts/benchmark_rss_filter.py --episodes 50 --repeat 20
+    python scripts/benchmark_rss_filter.py --feed saved_feed.xml --feed other.xml
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.core.subscription_filter import SubscriptionFilter, parse_resolution
+
+# {ep} is replaced by the episode number
+MIKAN_TITLES = [
+    "[ANi] 葬送的芙莉莲 - {ep} [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+    "[ANi] Sousou no Frieren - {ep} [1080P][Bilibili][WEB-DL][AAC AVC][CHT CHS][MP4]",
+    "[LoliHouse] 葬送的芙莉莲 / Sousou no Frieren - {ep} [WebRip 1080p HEVC-10bit AAC][简繁内封字幕]",
+    "[北宇治字幕组] 葬送的芙莉莲 / Sousou no Frieren [{ep}][WebRip][1080p][HEVC_AAC][简繁日内封]",
+    "【喵萌奶茶屋】★10月新番★[葬送的芙莉莲 / Sousou no Frieren][{ep}][1080p][简日双语][招募翻译]",
+    "【喵萌奶茶屋】★10月新番★[葬送的芙莉莲 / Sousou no Frieren][{ep}][720p][繁日双语][招募翻译]",
+    "[桜都字幕组] 葬送的芙莉莲 / Sousou no Frieren [{ep}][1080p][简体内嵌]",
+    "[桜都字幕组] 葬送的芙莉莲 / Sousou no Frieren [{ep}][1080p][繁體內嵌]",
+    "[Lilith-Raws] Sousou no Frieren - {ep} [Baha][WEB-DL][1080p][AVC AAC][CHT][MP4]",
+    "[SweetSub][葬送的芙莉莲][Sousou no Frieren][{ep}][WebRip][1080P][AVC 8bit][简日双语]",
+    "[SweetSub][葬送的芙莉莲][Sousou no Frieren][{ep}][WebRip][1080P][AVC 8bit][繁日雙語]",
+    "[Nekomoe kissaten&LoliHouse] Kusuriya no Hitorigoto - {ep} [WebRip 1080p HEVC-10bit AAC ASSx2]",
+    "[桜都字幕组] 药屋少女的呢喃 / Kusuriya no Hitorigoto [{ep}][1080p][简繁内封]",
+    "【幻樱字幕组】【10月新番】【药屋少女的呢喃 Kusuriya no Hitorigoto】【{ep}】【BIG5_MP4】【1280X720】",
+    "【幻樱字幕组】【10月新番】【药屋少女的呢喃 Kusuriya no Hitorigoto】【{ep}】【GB_MP4】【1920X1080】",
+    "[猎户发布组] 药屋少女的呢喃 Kusuriya no Hitorigoto [{ep}] [1080p] [简中内嵌] [2023年10月番]",
+    "[ANi] 迷宫饭 - {ep} [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+    "[LoliHouse] 迷宫饭 / Dungeon Meshi / Delicious in Dungeon - {ep} [WebRip 1080p HEVC-10bit AAC][简繁内封字幕]",
+    "[豌豆字幕组&LoliHouse] 迷宫饭 / Dungeon Meshi - {ep} [WebRip 1080p HEVC-10bit AAC][简繁外挂字幕]",
+    "[Sakurato] Dungeon Meshi [{ep}][AVC-8bit 1080p AAC][CHS]",
+    "[GJ.Y] 迷宫饭 / Dungeon Meshi - {ep} (CR 1920x1080 AVC AAC MKV)",
+    "[GJ.Y] 迷宫饭 / Dungeon Meshi - {ep} (NF 3840x2160 HEVC E-AC-3 MKV)",
+    "[ANi] 我独自升级 - {ep} [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+    "[LoliHouse] 我独自升级 / Ore dake Level Up na Ken - {ep} [WebRip 1080p HEVC-10bit AAC][无字幕]",
+    "[Skymoon-Raws] 我独自升级 / Ore dake Level Up na Ken - {ep} [ViuTV][WEB-DL][CHT][SRT][1080p][AVC AAC]",
+    "[Up to 21°C] 怪兽8号 / Kaijuu 8-gou - {ep} (ABEMA 1920x1080 AVC AAC MP4)",
+    "[Up to 21°C] 怪兽8号 / Kaijuu 8-gou - {ep} (CR 1920x1080 AVC AAC MKV)",
+    "[百冬练习组&LoliHouse] 怪兽8号 / Kaijuu 8-gou - {ep} [WebRip 1080p HEVC-10bit AAC][简繁内封字幕]",
+    "[DBD-Raws][怪兽8号/Kaijuu 8-gou][{ep}][1080P][BDRip][HEVC-10bit][FLAC][MKV]",
+    "[MingY] 摇曳露营△ 第三季 / Yuru Camp S3 [{ep}][1080p][CHS&JPN]",
+    "[MingY] 摇曳露营△ 第三季 / Yuru Camp S3 [{ep}][1080p][CHT&JPN]",
+    "[织梦字幕组][摇曳露营△ 第三季 Yuru Camp Season 3][{ep}集][1080P][AVC][简日双语]",
+    "[织梦字幕组][摇曳露营△ 第三季 Yuru Camp Season 3][{ep}集][720P][AVC][简日双语]",
+    "[Billion Meta Lab] 间谍过家家 SPY×FAMILY S02 [{ep}][1080][HEVC 10bit][简繁日内封][检索：间谍家家酒]",
+    "[ANi] SPY×FAMILY 间谍家家酒 第二季 - {ep} [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+    "[jibaketa合成&二次压制][TVB粤语]间谍过家家 / SPY×FAMILY - {ep} [粤日双语+内封繁体中文字幕][WEB 1920x1080 x264 AACx2 SRT TVB CHT]",
+    "[Moozzi2] Sousou no Frieren - {ep} (BD 1920x1080 x.264 FLACx2) [合集]",
+    "[VCB-Studio] Sousou no Frieren [Ma10p_2160p][x265_flac] [合集]",
+    "[ReinForce] Sousou no Frieren - {ep} (BDRip 3840x2160 x265 10bit FLAC)",
+    "【極影字幕社】 ★10月新番 葬送的芙莉蓮 第{ep}話 BIG5 MP4 720P",
+    "【極影字幕社】 ★10月新番 葬送的芙莉蓮 第{ep}話 GB MP4 1080P",
+    "[Haruhana] Sousou no Frieren - {ep} [WebRip][HEVC-10bit 1080p][CHI_JPN]",
+    "[Kamigami&VCB-Studio] 葬送的芙莉莲 / Sousou no Frieren [Ma10p_1080p][x265_flac_aac][SP{ep}]",
+    "[Erai-raws] Sousou no Frieren - {ep} [480p][Multiple Subtitle][A1B2C3D4]",
+    "[SubsPlease] Sousou no Frieren - {ep} (4K) [0FA0D2E1].mkv",
+]
+
+# (label, regex, include keywords, exclude keywords), the shapes the subscription dialog produces
+FILTERS = [
+    ("none", None, [], []),
+    ("keywords", None, ["1080p", "简"], ["合集", "720p"]),
+    ("many keywords", None, ["1080", "frieren", "web"], ["合集", "bdrip", "720p", "480p", "big5", "繁", "cht", "hevc"]),
+    ("tag regex", r"(?=.*1080p)(?=.*简繁)", [], []),
+    ("regex + keywords", r"(?=.*LoliHouse)(?=.*1080p)", ["内封"], ["合集", "外挂"]),
+    ("long exclude list", None, ["1080"], ["合集", "bdrip", "720p", "480p", "big5", "繁", "cht", "hevc", "x265", "flac",
+                                            "外挂", "内嵌", "mkv", "baha", "viutv", "粤语", "無修", "raws", "sp", "ma10p"]),
+    ("episode regex", r"(?:- |\[|第)(?:0?[1-9]|1[0-2])(?:\b|集|話|\])", ["1080"], ["合集"]),
+]
+
+class LegacySubscription:
+    def __init__(self, regex, include, exclude):
+        self.id = 0
+        self.filter_regex = regex
+        self.filter_keywords = include
+        self.exclude_keywords = exclude
+
+def legacy_match(title: str, subscription) -> bool:
+    """_match_filters as it was in app/tasks/rss_monitor.py"""
+    if subscription.filter_regex:
+        try:
+            if not re.search(subscription.filter_regex, title, re.IGNORECASE):
+                return False
+        except Exception:
+            return False
+    if subscription.filter_keywords:
+        for kw in subscription.filter_keywords:
+            if kw and kw.lower() not in title.lower():
+                return False
+    if subscription.exclude_keywords:
+        for kw in subscription.exclude_keywords:
+            if kw and kw.lower() in title.lower():
+                return False
+    return True
+
+def load_corpus(args) -> list:
+    if args.feed:
+        import feedparser
+        titles = []
+        for path in args.feed:
+            titles.extend(entry.title for entry in feedparser.parse(path).entries)
+        return titles
+    return [title.format(ep=f"{ep:02d}") for ep in range(1, args.episodes + 1) for title in MIKAN_TITLES]
+
+def timed(fn, titles, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        for title in titles:
+            fn(title)
+        best = min(best, time.perf_counter() - began)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feed", action="append", help="Saved Mikan RSS file to take titles from (repeatable)")
+    parser.add_argument("--episodes", type=int, default=24, help="Episodes per corpus title")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per filter (best is reported)")
+    args = parser.parse_args()
+
+    titles = load_corpus(args)
+    print(f"{len(titles)} titles, best of {args.repeat} runs")
+    print(f"{'filter':<18} {'kept':>6} {'legacy':>12} {'compiled':>12} {'speedup':>8}")
+
+    total_legacy = total_compiled = 0.0
+    for label, regex, include, exclude in FILTERS:
+        legacy_sub = LegacySubscription(regex, include, exclude)
+        compiled = SubscriptionFilter(regex, include, exclude, label=label)
+
+        kept = [t for t in titles if legacy_match(t, legacy_sub)]
+        mismatched = [t for t in titles if legacy_match(t, legacy_sub) != compiled.matches(t)]
+        if mismatched:
+            raise SystemExit(f"{label}: decisions differ for {len(mismatched)} titles, e.g. {mismatched[0]!r}")
+
+        legacy = timed(lambda t: legacy_match(t, legacy_sub), titles, args.repeat)
+        fast = timed(compiled.matches, titles, args.repeat)
+        total_legacy += legacy
+        total_compiled += fast
+        print(f"{label:<18} {len(kept):>6} {legacy * 1e6 / len(titles):>9.2f} µs {fast * 1e6 / len(titles):>9.2f} µs "
+              f"{legacy / fast:>7.2f}x")
+
+    print(f"{'total':<18} {'':>6} {total_legacy * 1000:>9.1f} ms {total_compiled * 1000:>9.1f} ms "
+          f"{total_legacy / total_compiled:>7.2f}x")
+
+    resolutions = Counter(parse_resolution(title) or "unknown" for title in titles)
+    print("Resolutions parsed: " + ", ".join(f"{k} {v}" for k, v in sorted(resolutions.items())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark ScannerService throughput (files/sec) against the previous
+os.walk + pathlib implementation.
+
+Run with:
+    python scripts/benchmark_scanner.py                 # synthetic tree
+    python scripts/benchmark_scanner.py /path/to/anime  # real directory
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.payload import FileNode
+from app.services.core.scanner import ScannerService, VIDEO_EXTENSIONS
+
+def legacy_scan(path: str):
+    """The os.walk + Path.stat() scanner this benchmark compares against"""
+    result = {}
+    root_path = Path(path)
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        current_dir_files = []
+        for f in filenames:
+            file_path = Path(dirpath) / f
+            if file_path.suffix.lower() in VIDEO_EXTENSIONS:
+                size_mb = file_path.stat().st_size / (1024 * 1024)
+                current_dir_files.append(FileNode(
+                    name=f,
+                    size_mb=round(size_mb, 2),
+                    rel_path=str(file_path.relative_to(root_path))
+                ))
+        if current_dir_files:
+            result[dirpath] = current_dir_files
+    return result
+
+def build_tree(root: str, shows: int, episodes: int):
+    """Shows with two seasons of episodes plus the usual non-video clutter"""
+    for s in range(shows):
+        for season in (1, 2):
+            season_dir = os.path.join(root, f"Show {s:04d}", f"Season {season}")
+            os.makedirs(season_dir)
+            for e in range(1, episodes + 1):
+                base = os.path.join(season_dir, f"[Group] Show {s:04d} - S{season:02d}E{e:02d} [1080p]")
+                for ext in (".mkv", ".ass", ".nfo", ".jpg"):
+                    with open(base + ext, "wb") as f:
+                        f.write(b"0")
+
+def measure(name: str, func, path: str, repeat: int):
+    best = None
+    files = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - start
+        files = sum(len(v) for v in result.values())
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<12} {files:>8} files  {best * 1000:>9.1f} ms  {files / best:>12,.0f} files/sec")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="Directory to scan (default: generate a synthetic tree)")
+    parser.add_argument("--shows", type=int, default=200, help="Shows in the synthetic tree")
+    parser.add_argument("--episodes", type=int, default=24, help="Episodes per season in the synthetic tree")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scanner, the best is reported")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.path
+    if not path:
+        tmp_dir = tempfile.mkdtemp(prefix="hoshino_scan_bench_")
+        print(f"Building synthetic tree in {tmp_dir} ...")
+        build_tree(tmp_dir, args.shows, args.episodes)
+        path = tmp_dir
+
+    try:
+        legacy = measure("os.walk", legacy_scan, path, args.repeat)
+        current = measure("scandir", ScannerService.scan_directory, path, args.repeat)
+        print(f"Speedup: {legacy / current:.2f}x")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
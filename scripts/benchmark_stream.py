@@ -0,0 +1,126 @@
+"""
+Benchmark the ranged video streaming response under concurrent viewers.
+
+Starts uvicorn on a local port with two endpoints serving the same file: the
+plain FileResponse the stream route used before, and RangeFileResponse. Each
+simulated viewer seeks to random offsets and reads a fixed-size range, the way
+a player fetches segments. Reports throughput and request latency per endpoint.
+
+Run with:
+    python scripts/benchmark_stream.py
+    python scripts/benchmark_stream.py --viewers 32 --range-mb 4 --chunk-kb 256
+    python scripts/benchmark_stream.py --file /path/to/video.mkv
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from app.services.core.streaming import RangeFileResponse, path_tokens, stat_regular_file
+
+def build_app(chunk_size: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy/{token}")
+    def legacy(token: str):
+        return FileResponse(path_tokens.resolve(token))
+
+    @app.get("/ranged/{token}")
+    async def ranged(token: str, request: Request):
+        path = path_tokens.resolve(token)
+        return RangeFileResponse(path, stat_regular_file(path), request.headers, chunk_size=chunk_size)
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def viewer(client: httpx.AsyncClient, url: str, size: int, range_bytes: int,
+                 deadline: float, latencies: list, rng: random.Random) -> int:
+    received = 0
+    while time.perf_counter() < deadline:
+        start = rng.randrange(0, max(size - range_bytes, 1))
+        headers = {"Range": f"bytes={start}-{start + range_bytes - 1}"}
+        began = time.perf_counter()
+        async with client.stream("GET", url, headers=headers) as resp:
+            async for chunk in resp.aiter_raw():
+                received += len(chunk)
+        latencies.append(time.perf_counter() - began)
+    return received
+
+async def measure(name: str, url: str, size: int, args) -> None:
+    latencies = []
+    limits = httpx.Limits(max_connections=args.viewers, max_keepalive_connections=args.viewers)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        # Warm up the connections and the page cache
+        await client.get(url, headers={"Range": "bytes=0-0"})
+        deadline = time.perf_counter() + args.duration
+        began = time.perf_counter()
+        totals = await asyncio.gather(*(
+            viewer(client, url, size, args.range_mb * 1024 * 1024, deadline, latencies, random.Random(i))
+            for i in range(args.viewers)
+        ))
+        elapsed = time.perf_counter() - began
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    mb_per_s = sum(totals) / elapsed / (1024 * 1024)
+    print(f"{name:<8} {len(latencies):>6} requests  {mb_per_s:>9,.1f} MB/s  p50 {p50:>7.1f} ms  p95 {p95:>7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="Video file to serve (default: a generated file)")
+    parser.add_argument("--size-mb", type=int, default=512, help="Size of the generated file")
+    parser.add_argument("--viewers", type=int, default=16, help="Concurrent viewers")
+    parser.add_argument("--range-mb", type=int, default=2, help="Bytes requested per range request")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="RangeFileResponse chunk size")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint")
+    args = parser.parse_args()
+
+    tmp_file = None
+    path = args.file
+    if not path:
+        fd, tmp_file = tempfile.mkstemp(prefix="hoshino_stream_bench_", suffix=".mkv")
+        print(f"Writing {args.size_mb} MB test file {tmp_file} ...")
+        block = os.urandom(1024 * 1024)
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(block)
+        path = tmp_file
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(args.chunk_kb * 1024), host="127.0.0.1",
+                                           port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        size = os.path.getsize(path)
+        token = path_tokens.encode(path)
+        print(f"{args.viewers} viewers, {args.range_mb} MB ranges, {args.duration:.0f}s per endpoint")
+        for name in ("legacy", "ranged"):
+            asyncio.run(measure(name, f"http://127.0.0.1:{port}/{name}/{token}", size, args))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+        if tmp_file:
+            os.remove(tmp_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""Shared test setup: a throwaway data directory, set before app modules open their databases"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("HOSHINO_DATA_DIR", tempfile.mkdtemp(prefix="hoshino-test-"))
+
+@pytest.fixture(scope="session")
+def database():
+    """Create the tables once per run and return the session factory"""
+    from app.db.session import SessionLocal, init_db
+    init_db()
+    return SessionLocal
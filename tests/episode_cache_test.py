@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.services.core.library import EpisodeIndexCache, LibraryService, episode_cache
+
+def age(*paths):
+    """Move directory mtimes out of the snapshot's racy window"""
+    past = time.time() - 3600
+    for path in paths:
+        os.utime(path, (past, past))
+
+@pytest.fixture
+def series(tmp_path, database, monkeypatch):
+    from app.db.models import LibraryItem
+    import app.tasks.library_tasks as library_tasks
+    monkeypatch.setattr(library_tasks, "queue_bangumi_fetch", lambda item_ids: None)
+
+    folder = tmp_path / "Sousou no Frieren"
+    season = folder / "Season 1"
+    season.mkdir(parents=True)
+    (season / "Sousou no Frieren - S01E01.mkv").write_bytes(b"x")
+    age(season, folder)
+    with database() as db:
+        item = LibraryItem(title="Sousou no Frieren", path=str(folder))
+        db.add(item)
+        db.commit()
+        item_id = item.id
+    episode_cache.invalidate()
+    yield item_id, folder, season
+    with database() as db:
+        db.query(LibraryItem).filter(LibraryItem.id == item_id).delete()
+        db.commit()
+
+def episodes(item_id):
+    return [(v["season"], v["episode"]) for v in asyncio.run(LibraryService().get_episodes(item_id))]
+
+def test_cached_until_a_file_is_written(series, monkeypatch):
+    item_id, folder, season = series
+    assert episodes(item_id) == [(1, 1)]
+
+    scans = []
+    original = LibraryService._scan_episodes
+    monkeypatch.setattr(LibraryService, "_scan_episodes", staticmethod(lambda path: scans.append(path) or original(path)))
+    assert episodes(item_id) == [(1, 1)]
+    assert scans == []  # Served from the cache
+
+    # The organizer moves the next episode in, without a library scan
+    (season / "Sousou no Frieren - S01E02.mkv").write_bytes(b"x")
+    assert episodes(item_id) == [(1, 1), (1, 2)]
+    assert scans == [str(folder)]
+
+def test_new_season_directory_invalidates(series):
+    item_id, folder, _ = series
+    assert episodes(item_id) == [(1, 1)]
+    (folder / "Season 2").mkdir()
+    (folder / "Season 2" / "Sousou no Frieren - S02E01.mkv").write_bytes(b"x")
+    assert episodes(item_id) == [(1, 1), (2, 1)]
+
+def test_entries_check_key_and_directories(tmp_path):
+    cache = EpisodeIndexCache(maxsize=2)
+    age(tmp_path)
+    mtime = os.stat(tmp_path).st_mtime_ns
+    cache.put(1, ("a", 1), [], {1}, {str(tmp_path): mtime})
+    assert cache.get(1, ("a", 1)) == ([], {1})
+    assert cache.get(1, ("a", 2)) is None  # Library version changed
+
+    cache.put(2, ("b", 1), [], set(), {str(tmp_path): 0})
+    assert cache.get(2, ("b", 1)) is None  # mtime inside the racy window is never trusted
+    cache.put(3, ("c", 1), [], set(), {str(tmp_path / "gone"): mtime})
+    assert cache.get(3, ("c", 1)) is None
+    assert cache.get(1, ("a", 1)) is None  # Evicted (maxsize 2)
@@ -0,0 +1,90 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from app.services.core.fetch_queue import LEASE, BangumiFetchQueue
+
+@pytest.fixture
+def queue(database):
+    from app.db.models import BangumiFetchQueueEntry
+    with database() as db:
+        db.query(BangumiFetchQueueEntry).delete()
+        db.commit()
+    return database
+
+def expire_leases(database):
+    from app.db.models import BangumiFetchQueueEntry
+    with database() as db:
+        db.query(BangumiFetchQueueEntry).filter(BangumiFetchQueueEntry.claimed_by.isnot(None)).update(
+            {BangumiFetchQueueEntry.claimed_at: datetime.utcnow() - LEASE * 2}, synchronize_session=False)
+        db.commit()
+
+def test_push_deduplicates(queue):
+    assert BangumiFetchQueue.push([1, 2, 2]) == 2
+    assert BangumiFetchQueue.push([2, 3]) == 1
+    token, ids = BangumiFetchQueue.claim(10)
+    assert sorted(ids) == [1, 2, 3]
+
+def test_claim_leases_items(queue):
+    BangumiFetchQueue.push([1, 2, 3])
+    first, ids = BangumiFetchQueue.claim(2)
+    assert len(ids) == 2
+    second, rest = BangumiFetchQueue.claim(2)
+    assert second != first
+    assert set(rest) == {1, 2, 3} - set(ids)  # Leased items are not handed out twice
+    assert BangumiFetchQueue.claim(2)[1] == []
+    assert BangumiFetchQueue.leased() == 3
+
+def test_complete_by_token(queue):
+    BangumiFetchQueue.push([1, 2])
+    token, ids = BangumiFetchQueue.claim(10)
+    BangumiFetchQueue.complete("other-token", ids)
+    assert BangumiFetchQueue.leased() == 2
+    BangumiFetchQueue.complete(token, [1])  # 2 failed: stays leased
+    assert BangumiFetchQueue.leased() == 1
+    assert BangumiFetchQueue.claim(10)[1] == []
+
+def test_expired_lease_is_claimed_again(queue):
+    BangumiFetchQueue.push([1])
+    stale, _ = BangumiFetchQueue.claim(10)
+    expire_leases(queue)
+    token, ids = BangumiFetchQueue.claim(10)
+    assert ids == [1]
+    # The crashed worker coming back late does not remove the item from the new lease
+    BangumiFetchQueue.complete(stale, [1])
+    assert BangumiFetchQueue.leased() == 1
+    BangumiFetchQueue.complete(token, [1])
+    assert BangumiFetchQueue.leased() == 0
+
+def test_push_while_claimed(queue):
+    BangumiFetchQueue.push([1])
+    token, _ = BangumiFetchQueue.claim(10)
+    # Queued again during the fetch: the running fetch must not remove it
+    assert BangumiFetchQueue.push([1]) == 1
+    BangumiFetchQueue.complete(token, [1])
+    assert BangumiFetchQueue.claim(10)[1] == [1]
+
+def test_push_while_waiting_is_a_no_op(queue):
+    BangumiFetchQueue.push([1])
+    assert BangumiFetchQueue.push([1]) == 0
+
+def test_stale_schedule_flag(database):
+    from app.tasks.library_tasks import FLAG_STALE_AFTER, _set_flag
+    from app.worker import huey
+    key = "test_schedule_flag"
+    huey.get(key)
+    assert _set_flag(key)
+    assert not _set_flag(key)  # Scheduled, its task has not run yet
+    assert not _set_flag(key, delay=60)
+
+    # The task never ran: after the margin, the flag no longer blocks scheduling
+    huey.get(key)
+    huey.put_if_empty(key, time.time() - FLAG_STALE_AFTER - 1)
+    assert _set_flag(key)
+    assert not _set_flag(key)
+
+    huey.get(key)
+    huey.put_if_empty(key, time.time() - FLAG_STALE_AFTER - 1)
+    assert not _set_flag(key, delay=3600)  # Delayed tasks get their delay on top
+    huey.get(key)
@@ -0,0 +1,64 @@
+import json
+
+from app.services.analysis.json_stream import JSONArrayStream
+
+RESULTS = [
+    {"title": "葬送的芙莉莲", "note": 'a "quoted" ]} part'},
+    {"title": "C:\\Anime\\", "episode": 2},
+]
+# Markdown fence and wrapper object around the array, as models answer
+ANSWER = "```json\n" + json.dumps({"results": RESULTS}, ensure_ascii=False) + "\n```"
+
+def feed_in_chunks(text, size):
+    parser = JSONArrayStream()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return parser, items
+
+def test_whole_answer():
+    parser, items = feed_in_chunks(ANSWER, len(ANSWER))
+    assert items == RESULTS
+    assert parser.opened and parser.closed
+    assert parser.count == 2
+
+def test_every_chunk_size_gives_the_same_items():
+    for size in range(1, 12):
+        parser, items = feed_in_chunks(ANSWER, size)
+        assert items == RESULTS, size
+        assert parser.closed
+
+def test_escape_split_across_chunks():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"t": "a\\') == []
+    # The quote after the split backslash is escaped and must not end the string
+    assert parser.feed('"]}"}') == [{"t": 'a"]}'}]
+    assert parser.feed("]") == []
+    assert parser.closed
+
+def test_chunk_boundary_inside_string():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"t": "{[') == []
+    assert parser.feed('"}, {"t": "}"') == [{"t": "{["}]
+    assert parser.feed("}]") == [{"t": "}"}]
+
+def test_items_are_returned_as_soon_as_complete():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"a": 1}, {"b": {"c": [1') == [{"a": 1}]
+    assert parser.feed("]}}") == [{"b": {"c": [1]}}]
+    assert not parser.closed
+
+def test_truncated_stream():
+    parser, items = feed_in_chunks('[{"a": 1}, {"b": ', 4)
+    assert items == [{"a": 1}]
+    assert parser.opened and not parser.closed
+
+def test_malformed_element_is_skipped():
+    parser = JSONArrayStream()
+    assert parser.feed('[{"a": 1,}, {"b": 2}]') == [{"b": 2}]
+    assert parser.count == 2
+
+def test_no_array():
+    parser = JSONArrayStream()
+    assert parser.feed('{"title": "x"}') == []
+    assert not parser.opened
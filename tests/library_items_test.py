@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.core.library import LibraryService
+
+BASE = datetime(2024, 1, 1)
+
+@pytest.fixture
+def library(database):
+    from app.db.models import LibraryItem
+    with database() as db:
+        db.query(LibraryItem).delete()
+        rows = [
+            # Ties on updated_at and rating, NULL updated_at / rating / year
+            LibraryItem(title="Frieren", status="Ended", path="/lib/frieren", updated_at=BASE + timedelta(days=2), year="2023", vote_average=8.9),
+            LibraryItem(title="Dungeon Meshi", status="Returning Series", path="/lib/dungeon", updated_at=BASE + timedelta(days=2), year="2024", vote_average=8.9),
+            LibraryItem(title="Yuru Camp", status="Ended", path="/lib/yuru", updated_at=BASE + timedelta(days=1), year="2024", vote_average=8.1),
+            LibraryItem(title="Kaijuu 8-gou", path="/lib/kaijuu", updated_at=None, year=None, vote_average=None),
+            LibraryItem(title="Spy x Family", status="In Production", path="/lib/spy", updated_at=None, year="2022", vote_average=8.4),
+            LibraryItem(title="Kusuriya", path="/lib/kusuriya", updated_at=BASE, year="2023", vote_average=None),
+            LibraryItem(title="86", status="Canceled", path="/lib/86", updated_at=BASE + timedelta(days=3), year="2021", vote_average=8.2, is_subscribed=True),
+        ]
+        db.add_all(rows)
+        db.flush()
+        # The column default replaces None on insert
+        db.query(LibraryItem).filter(LibraryItem.title.in_(["Kaijuu 8-gou", "Spy x Family"])).update(
+            {LibraryItem.updated_at: None}, synchronize_session=False)
+        db.commit()
+    return LibraryService()
+
+def collect(service, limit, **filters):
+    """Follow next_cursor to the end, returning the titles of every page"""
+    pages, cursor = [], None
+    while True:
+        page = service.list_items(cursor=cursor, limit=limit, **filters)
+        pages.append([item["title"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+@pytest.mark.parametrize("sort", list(LibraryService.ITEM_SORTS))
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_pages_cover_every_item_once(library, sort, limit):
+    full = library.list_items(limit=100, sort=sort)["items"]
+    assert len(full) == 7
+    pages = collect(library, limit, sort=sort)
+    assert [title for page in pages for title in page] == [item["title"] for item in full]
+    assert all(len(page) == limit for page in pages[:-1])
+    assert pages[-1]  # No empty last page
+
+def test_updated_sort_keeps_null_rows_last(library):
+    titles = [title for page in collect(library, 2, sort="updated") for title in page]
+    assert titles[0] == "86"
+    assert set(titles[1:3]) == {"Dungeon Meshi", "Frieren"}
+    assert set(titles[-2:]) == {"Kaijuu 8-gou", "Spy x Family"}
+
+def test_last_page_has_no_cursor(library):
+    page = library.list_items(limit=7)
+    assert len(page["items"]) == 7
+    assert page["next_cursor"] is None
+
+def test_filters(library):
+    assert collect(library, 2, is_subscribed=True) == [["86"]]
+    assert sorted(t for page in collect(library, 1, year="2024") for t in page) == ["Dungeon Meshi", "Yuru Camp"]
+    assert collect(library, 10, initial="#", sort="title") == [["86"]]
+    assert collect(library, 10, initial="k", sort="title") == [["Kaijuu 8-gou", "Kusuriya"]]
+    assert collect(library, 1, status="current", sort="title") == [["Dungeon Meshi"], ["Spy x Family"]]
+    assert collect(library, 10, status="ended", sort="title") == [["86", "Frieren", "Yuru Camp"]]
+
+def test_invalid_arguments(library):
+    with pytest.raises(ValueError):
+        library.list_items(sort="random")
+    with pytest.raises(ValueError):
+        library.list_items(status="paused")
+    with pytest.raises(ValueError):
+        library.list_items(cursor="not-a-cursor")
@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.analysis.llm_engine import LLMEngine
+from app.services.system.settings_service import SettingsService
+
+def test_closing_the_stream_waits_for_chunks(monkeypatch):
+    monkeypatch.setattr(LLMEngine, "_settings", staticmethod(lambda: ("key", "url", "model")))
+    monkeypatch.setattr(SettingsService, "get_setting", staticmethod(lambda key, default="": default))
+    monkeypatch.setattr(LLMEngine, "_chunk_payload", staticmethod(lambda payload, budget: ["a", "b", "c"]))
+    unwound = []
+
+    async def stream_chunk(chunk, emit, bypass_cache=False):
+        try:
+            await emit(chunk)
+            await asyncio.Event().wait()  # A request that never finishes
+        finally:
+            await asyncio.sleep(0)
+            unwound.append(chunk)
+
+    monkeypatch.setattr(LLMEngine, "_stream_chunk", staticmethod(stream_chunk))
+
+    async def run():
+        stream = LLMEngine.analyze_stream(SimpleNamespace(files=[]))
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        # Every chunk task has finished its cleanup by the time the stream is closed
+        assert sorted(unwound) == ["a", "b", "c"]
+
+    asyncio.run(run())
@@ -0,0 +1,192 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.external import rate_limiter
+from app.services.external.rate_limiter import RateLimiter
+from app.services.system.settings_service import SettingsService
+
+class FakeTime:
+    """Stands in for the time module inside rate_limiter: sleeping advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def settings(monkeypatch):
+    values = {}
+    monkeypatch.setattr(SettingsService, "get_setting", staticmethod(lambda key, default="": values.get(key, default)))
+    return values
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "random", SimpleNamespace(uniform=lambda a, b: a))
+
+def test_burst_then_queue(settings, clock):
+    settings["test.rate_limit"] = "4"
+    limiter = RateLimiter("test")
+    # A full bucket lets `rate` requests through at once
+    assert [limiter._reserve() for _ in range(4)] == [0.0] * 4
+    # Then callers queue behind each other: negative tokens, 1/rate apart
+    assert [limiter._reserve() for _ in range(3)] == [0.25, 0.5, 0.75]
+    clock.now += 1.0
+    assert limiter._reserve() == 0.0  # 4 tokens refilled, 3 owed: one left
+
+def test_refill_is_capped_at_burst(settings, clock):
+    settings["test.rate_limit"] = "2"
+    limiter = RateLimiter("test")
+    limiter._reserve()
+    clock.now += 3600
+    assert [limiter._reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+def test_slow_rate_still_allows_one_request(settings, clock):
+    settings["test.rate_limit"] = "0.5"
+    limiter = RateLimiter("test")
+    assert limiter._reserve() == 0.0
+    assert limiter._reserve() == 2.0
+
+def test_invalid_settings_fall_back_to_defaults(settings):
+    settings["tmdb.rate_limit"] = "fast"
+    settings["tmdb.max_concurrency"] = "0"
+    limiter = RateLimiter("tmdb")
+    assert limiter.rate == 20.0
+    assert limiter.concurrency == 1
+
+def test_block_delays_every_caller(settings, clock):
+    limiter = RateLimiter("test")
+    limiter.block(30)
+    assert limiter._reserve() == 30
+    limiter.block(5)  # A shorter block does not shorten the pause
+    clock.now += 10
+    assert limiter._reserve() == 20
+
+def test_retry_delay(no_jitter):
+    limiter = RateLimiter("test")
+    assert limiter._retry_delay("5", 0) == 5.0
+    assert limiter._retry_delay("3600", 0) == RateLimiter.BACKOFF_CAP
+    assert limiter._retry_delay("-3", 0) == 0.0
+    in_ten = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert 8.5 < limiter._retry_delay(in_ten, 0) <= 10.0
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    assert limiter._retry_delay(past, 0) == 0.0
+    # Without a usable Retry-After: exponential back-off from BACKOFF_BASE, half of it jittered
+    assert limiter._retry_delay(None, 0) == 0.5
+    assert limiter._retry_delay("soon", 3) == 4.0
+    assert limiter._retry_delay(None, 10) == RateLimiter.BACKOFF_CAP / 2
+
+def test_retry_delay_jitter():
+    limiter = RateLimiter("test")
+    for _ in range(50):
+        assert 20.0 <= limiter._retry_delay("20", 0) <= 22.0
+        assert 0.5 <= limiter._retry_delay(None, 0) <= 1.0
+
+def test_back_off_stops_at_max_retries(settings, clock, no_jitter):
+    limiter = RateLimiter("test")
+    headers = {"Retry-After": "7"}
+    assert all(limiter._back_off(429, headers, attempt) for attempt in range(RateLimiter.MAX_RETRIES))
+    assert limiter._blocked_until == clock.now + 7
+    assert not limiter._back_off(429, headers, RateLimiter.MAX_RETRIES)
+    assert limiter._back_off(503, None, 0)
+    assert not limiter._back_off(200, headers, 0)
+    assert not limiter._back_off(None, None, 0)
+
+def test_request_sync_retries(settings, clock, no_jitter):
+    responses = [SimpleNamespace(status_code=429, headers={"Retry-After": "3"}),
+                 SimpleNamespace(status_code=200, headers={})]
+    session = SimpleNamespace(request=lambda method, url, **kw: responses.pop(0))
+    limiter = RateLimiter("test")
+    assert limiter.request_sync(session, "GET", "https://example.org").status_code == 200
+    assert clock.slept == [3.0]  # The retry waited for Retry-After
+
+def test_request_sync_gives_up(settings, clock, no_jitter):
+    calls = []
+    session = SimpleNamespace(request=lambda *a, **kw: calls.append(1) or SimpleNamespace(status_code=503, headers={}))
+    limiter = RateLimiter("test")
+    assert limiter.request_sync(session, "GET", "https://example.org").status_code == 503
+    assert len(calls) == RateLimiter.MAX_RETRIES + 1
+
+def test_call_retries_sdk_errors(settings, monkeypatch):
+    class StatusError(Exception):
+        def __init__(self, status):
+            self.status_code = status
+            self.response = SimpleNamespace(headers={"Retry-After": "0"})
+
+    limiter = RateLimiter("test")
+    monkeypatch.setattr(limiter, "_retry_delay", lambda retry_after, attempt: 0.0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(429)
+        return "ok"
+
+    async def broken():
+        raise StatusError(400)
+
+    assert asyncio.run(limiter.call(flaky)) == "ok"
+    assert len(attempts) == 3
+    with pytest.raises(StatusError):
+        asyncio.run(limiter.call(broken))
+
+def test_slot_follows_concurrency_changes(settings):
+    settings["test.rate_limit"] = "1000"
+    settings["test.max_concurrency"] = "3"
+    limiter = RateLimiter("test")
+
+    async def run():
+        active, peak = [0], [0]
+        release = {i: asyncio.Event() for i in range(5)}
+
+        async def job(i):
+            async with limiter.slot():
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                await release[i].wait()
+                active[0] -= 1
+
+        tasks = [asyncio.create_task(job(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert active[0] == 3
+
+        # Lowered while three slots are held: new callers wait until fewer than 1 is in use
+        settings["test.max_concurrency"] = "1"
+        tasks += [asyncio.create_task(job(i)) for i in (3, 4)]
+        release[0].set()
+        release[1].set()
+        await asyncio.sleep(0.01)
+        assert active[0] == 1  # Only job 2 still holds its slot
+        release[2].set()
+        await asyncio.sleep(0.01)
+        assert active[0] == 1  # One of jobs 3 and 4
+        release[3].set()
+        release[4].set()
+        await asyncio.gather(*tasks)
+        assert peak[0] == 3
+
+    asyncio.run(run())
+
+def test_slot_sync_counts_holders(settings, clock):
+    settings["test.max_concurrency"] = "2"
+    limiter = RateLimiter("test")
+    with limiter.slot_sync():
+        with limiter.slot_sync():
+            assert limiter._thread_active == 2
+    assert limiter._thread_active == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.core.resolution_cache import ResolutionCache
+from app.services.external.tmdb_service import TMDBCandidate
+
+class FakeTMDB:
+    """Answers like TMDBService with raise_errors=True, failing the first `failures` searches"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.searches = 0
+
+    async def search_anime(self, query, year=None, raise_errors=False):
+        assert raise_errors
+        self.searches += 1
+        await asyncio.sleep(0.01)
+        if self.searches <= self.failures:
+            raise httpx.ConnectError("TMDB unreachable")
+        return [TMDBCandidate({"id": 1, "name": query, "first_air_date": "2023-09-29"})]
+
+    def calculate_confidence(self, candidate, query, year=None):
+        return 1.0
+
+def test_successful_lookup_is_shared():
+    async def run():
+        tmdb = FakeTMDB()
+        cache = ResolutionCache(tmdb)
+        results = await asyncio.gather(*(cache.resolve("Sousou  no Frieren") for _ in range(3)),
+                                       cache.resolve("sousou no frieren"))
+        assert {r.candidate.id for r in results} == {1}
+        assert tmdb.searches == 1
+        assert (cache.misses, cache.hits) == (1, 3)
+    asyncio.run(run())
+
+def test_failed_lookup_is_retried():
+    async def run():
+        tmdb = FakeTMDB(failures=1)
+        cache = ResolutionCache(tmdb)
+        # Directories waiting on the failed request all see the error...
+        results = await asyncio.gather(cache.resolve("Frieren"), cache.resolve("Frieren"), return_exceptions=True)
+        assert all(isinstance(r, httpx.ConnectError) for r in results)
+        # ...but the failure is not memoized: the next directory asks TMDB again
+        assert (await cache.resolve("Frieren")).candidate.id == 1
+        assert tmdb.searches == 2
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from app.services.core.scanner import ScannerService
+from app.services.core.snapshot import SnapshotIndex
+
+def age(*paths):
+    """Move mtimes out of the racy window, as if the tree was written an hour ago"""
+    past = time.time() - 3600
+    for path in paths:
+        os.utime(path, (past, past))
+
+def write(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+@pytest.fixture
+def tree(tmp_path, database):
+    root = tmp_path / "library"
+    write(root / "Frieren" / "Season 1" / "E01.mkv")
+    write(root / "Frieren" / "Season 1" / "E02.mkv")
+    write(root / "Yuru Camp" / "E01.mkv")
+    age(root, root / "Frieren", root / "Frieren" / "Season 1", root / "Yuru Camp")
+    return root
+
+def test_first_refresh_adds_everything(tree):
+    diff = SnapshotIndex(str(tree)).refresh()
+    assert sorted(os.path.relpath(p, tree) for p in diff.added) == [
+        os.path.join("Frieren", "Season 1", "E01.mkv"),
+        os.path.join("Frieren", "Season 1", "E02.mkv"),
+        os.path.join("Yuru Camp", "E01.mkv"),
+    ]
+    assert not diff.removed and not diff.modified
+    assert diff.listed_dirs == 4
+
+def test_unchanged_directories_are_reused(tree):
+    SnapshotIndex(str(tree)).refresh()
+    index = SnapshotIndex(str(tree))
+    diff = index.refresh()
+    assert not diff.changed
+    assert diff.listed_dirs == 0 and diff.reused_dirs == 4
+    assert sorted(index.listdir(str(tree / "Frieren" / "Season 1"))[1]) == ["E01.mkv", "E02.mkv"]
+
+def test_added_removed_modified(tree):
+    SnapshotIndex(str(tree)).refresh()
+    season = tree / "Frieren" / "Season 1"
+    write(season / "E03.mkv")
+    (season / "E01.mkv").unlink()
+    # Rewritten through a rename: the directory mtime changes, so it is listed again
+    write(season / "E02.tmp", b"longer")
+    os.replace(season / "E02.tmp", season / "E02.mkv")
+
+    diff = SnapshotIndex(str(tree)).refresh()
+    assert diff.added == [str(season / "E03.mkv")]
+    assert diff.removed == [str(season / "E01.mkv")]
+    assert diff.modified == [str(season / "E02.mkv")]
+    assert diff.changed_dirs() == {str(season)}
+    assert diff.listed_dirs == 1
+
+def test_racy_directory_is_listed_again(tree):
+    season = tree / "Frieren" / "Season 1"
+    os.utime(season)  # Modified just now: within RACY_WINDOW_NS
+    index = SnapshotIndex(str(tree))
+    index.refresh()
+    assert index.mtime_ns(str(season)) == 0
+    assert index.mtime_ns(str(tree)) == os.stat(tree).st_mtime_ns
+
+    # A file changed in place within the same mtime tick is still noticed
+    write(season / "E01.mkv", b"rewritten")
+    os.utime(season)
+    diff = SnapshotIndex(str(tree)).refresh()
+    assert diff.listed_dirs == 1
+    assert diff.modified == [str(season / "E01.mkv")]
+
+def test_removed_directory(tree):
+    SnapshotIndex(str(tree)).refresh()
+    shutil.rmtree(tree / "Frieren")
+    index = SnapshotIndex(str(tree))
+    diff = index.refresh()
+    assert sorted(diff.removed) == [str(tree / "Frieren" / "Season 1" / "E01.mkv"),
+                                    str(tree / "Frieren" / "Season 1" / "E02.mkv")]
+    assert index.listdir(str(tree / "Frieren")) is None
+    # The vanished rows are deleted, so the next refresh has nothing left to report
+    assert not SnapshotIndex(str(tree)).refresh().changed
+
+def test_refresh_without_persisting(tree):
+    SnapshotIndex(str(tree)).refresh()
+    series = tree / "Yuru Camp"
+    write(series / "E02.mkv")
+
+    # A read of one series sees the change but leaves it to the library-root refresh
+    subtree = SnapshotIndex(str(series))
+    assert subtree.refresh(persist=False).added == [str(series / "E02.mkv")]
+    assert sorted(subtree.listdir(str(series))[1]) == ["E01.mkv", "E02.mkv"]
+    assert SnapshotIndex(str(tree)).refresh().added == [str(series / "E02.mkv")]
+
+def test_scan_incremental(tree):
+    result, diff = ScannerService.scan_incremental(str(tree))
+    assert len(diff.added) == 3
+    def names(scan):
+        return {d: sorted(n.name for n in nodes) for d, nodes in scan.items()}
+    assert names(result) == names(ScannerService.scan_directory(str(tree)))
+
+    write(tree / "Yuru Camp" / "E02.mkv")
+    result, diff = ScannerService.scan_incremental(str(tree))
+    assert diff.added == [str(tree / "Yuru Camp" / "E02.mkv")]
+    assert [n.name for n in result[str(tree / "Yuru Camp")]] == ["E01.mkv", "E02.mkv"]
+    assert result[str(tree / "Yuru Camp")][1].rel_path == os.path.join("Yuru Camp", "E02.mkv")
@@ -0,0 +1,131 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.core.streaming import MAX_RANGES, RangeFileResponse, parse_range
+
+SIZE = 1000
+
+def test_single_ranges():
+    assert parse_range("bytes=0-99", SIZE) == [(0, 99)]
+    assert parse_range("bytes=500-", SIZE) == [(500, 999)]
+    assert parse_range("bytes=900-5000", SIZE) == [(900, 999)]  # End clamped to the file
+    assert parse_range("Bytes = 0-0", SIZE) == [(0, 0)]
+
+def test_suffix_ranges():
+    assert parse_range("bytes=-100", SIZE) == [(900, 999)]
+    assert parse_range("bytes=-5000", SIZE) == [(0, 999)]  # Longer than the file: all of it
+    assert parse_range("bytes=-0", SIZE) == []
+    assert parse_range("bytes=-1", 0) == []
+
+def test_merged_ranges():
+    assert parse_range("bytes=0-99,100-199", SIZE) == [(0, 199)]  # Adjacent
+    assert parse_range("bytes=50-150,0-99", SIZE) == [(0, 150)]  # Overlapping, out of order
+    assert parse_range("bytes=0-99,-100,300-", SIZE) == [(0, 99), (300, 999)]
+    assert parse_range("bytes=0-9,20-29", SIZE) == [(0, 9), (20, 29)]
+    assert parse_range("bytes=0-9, ,20-29,", SIZE) == [(0, 9), (20, 29)]
+
+def test_unsatisfiable():
+    assert parse_range("bytes=1000-", SIZE) == []
+    assert parse_range("bytes=2000-3000,-0", SIZE) == []
+    # Unsatisfiable parts are dropped when another one can be served
+    assert parse_range("bytes=2000-3000,0-9", SIZE) == [(0, 9)]
+
+def test_ignored_headers():
+    assert parse_range("items=0-9", SIZE) is None
+    assert parse_range("bytes=", SIZE) is None
+    assert parse_range("bytes=abc", SIZE) is None
+    assert parse_range("bytes=a-9", SIZE) is None
+    assert parse_range("bytes=9-0", SIZE) is None
+    assert parse_range("bytes=--5", SIZE) is None
+    assert parse_range("bytes=+5-9", SIZE) is None
+    assert parse_range("bytes=1_0-20", SIZE) is None
+    assert parse_range("bytes=-", SIZE) is None
+    too_many = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+    assert parse_range(f"bytes={too_many}", SIZE) is None
+
+def make_response(tmp_path, headers, size=SIZE, **kwargs):
+    """Response for a file of `size` bytes, written once so its ETag stays the same within a test"""
+    path = tmp_path / f"episode-{size}.mkv"
+    if not path.exists():
+        path.write_bytes(bytes(i % 256 for i in range(size)))
+    return RangeFileResponse(str(path), os.stat(path), headers, **kwargs)
+
+def body_of(response):
+    """Run the response without the ASGI disconnect listener, returning (messages, body)"""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response._send({"type": "http"}, send))
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return messages, body
+
+def header(response, name):
+    return dict(response.raw_headers).get(name.encode()).decode()
+
+def test_plan_full_file(tmp_path):
+    response = make_response(tmp_path, {})
+    assert response.status_code == 200
+    assert header(response, "content-length") == str(SIZE)
+    messages, body = body_of(response)
+    assert body == bytes(i % 256 for i in range(SIZE))
+    assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+def test_plan_not_modified(tmp_path):
+    etag = make_response(tmp_path, {}).etag
+    response = make_response(tmp_path, {"if-none-match": f'"other", {etag}', "range": "bytes=0-9"})
+    assert response.status_code == 304
+    assert body_of(response)[1] == b""
+    weak = make_response(tmp_path, {"if-none-match": "W/" + etag})
+    assert weak.status_code == 304
+
+def test_plan_single_range(tmp_path):
+    response = make_response(tmp_path, {"range": "bytes=-10"})
+    assert response.status_code == 206
+    assert header(response, "content-range") == f"bytes {SIZE - 10}-{SIZE - 1}/{SIZE}"
+    assert body_of(response)[1] == bytes(i % 256 for i in range(SIZE - 10, SIZE))
+
+def test_plan_if_range(tmp_path):
+    current = make_response(tmp_path, {})
+    matching = make_response(tmp_path, {"range": "bytes=0-9", "if-range": current.etag})
+    assert matching.status_code == 206
+    by_date = make_response(tmp_path, {"range": "bytes=0-9", "if-range": current.last_modified})
+    assert by_date.status_code == 206
+
+    # The file changed since the client's copy: the whole file is sent instead
+    for if_range in ('"stale-etag"', "W/" + current.etag, "Mon, 01 Jan 2001 00:00:00 GMT", "garbage"):
+        response = make_response(tmp_path, {"range": "bytes=0-9", "if-range": if_range})
+        assert response.status_code == 200, if_range
+        assert header(response, "content-length") == str(SIZE)
+
+def test_plan_unsatisfiable(tmp_path):
+    response = make_response(tmp_path, {"range": f"bytes={SIZE}-"})
+    assert response.status_code == 416
+    assert header(response, "content-range") == f"bytes */{SIZE}"
+    assert body_of(response)[1] == b""
+
+def test_multipart_content_length(tmp_path):
+    response = make_response(tmp_path, {"range": "bytes=0-9,-5,100-199"}, chunk_size=4096)
+    assert response.status_code == 206
+    assert header(response, "content-type").startswith("multipart/byteranges; boundary=")
+    _, body = body_of(response)
+    assert int(header(response, "content-length")) == len(body)
+    data = bytes(i % 256 for i in range(SIZE))
+    assert body.count(b"Content-Range: ") == 3
+    assert data[:10] in body and data[100:200] in body and data[-5:] in body
+    assert body.endswith(b"--\r\n")
+
+def test_head_sends_no_body(tmp_path):
+    response = make_response(tmp_path, {}, head=True)
+    assert header(response, "content-length") == str(SIZE)
+    assert body_of(response)[1] == b""
+
+def test_file_shrinking_while_streaming(tmp_path):
+    response = make_response(tmp_path, {}, size=20000, chunk_size=4096)
+    with open(response.path, "r+b") as f:
+        f.truncate(5000)
+    with pytest.raises(RuntimeError):
+        body_of(response)
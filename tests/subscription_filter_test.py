@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+from app.services.core.subscription_filter import (
+    COMBINED_MIN_KEYWORDS,
+    KeywordMatcher,
+    SubscriptionFilter,
+    SubscriptionFilterCache,
+    lookahead_tags,
+    parse_resolution,
+)
+
+TITLE = "[LoliHouse] 葬送的芙莉莲 / Sousou no Frieren - 05 [WebRip 1080p HEVC-10bit AAC][简繁内封字幕]"
+
+def padded(*keywords):
+    """Keywords plus unrelated fillers, enough to use the combined pattern"""
+    fillers = [f"filler{i}" for i in range(COMBINED_MIN_KEYWORDS)]
+    return KeywordMatcher([*keywords, *fillers])
+
+def test_small_and_combined_matchers_agree():
+    small = KeywordMatcher(["1080P", "简繁", "内封"])
+    assert small.pattern is None
+    assert small.all_in(TITLE.lower())
+    combined = padded("1080P", "简繁", "内封")
+    assert combined.pattern is not None
+    assert combined.any_in(TITLE.lower())
+    assert not combined.all_in(TITLE.lower())  # The fillers are missing
+
+def test_all_in_overlapping_keywords():
+    matcher = padded("webrip 1080p", "1080p hevc", "1080", "p hevc", "hevc-10bit", "10bit")
+    lowered = TITLE.lower() + "".join(f" filler{i}" for i in range(COMBINED_MIN_KEYWORDS))
+    # findall only reports non-overlapping matches ("webrip 1080p", "hevc-10bit"), the rest is checked directly
+    assert set(matcher.pattern.findall(lowered)) < set(matcher.keywords)
+    assert matcher.all_in(lowered)
+    assert not matcher.all_in(lowered.replace("hevc", "avc"))
+
+def test_keyword_prefix_is_not_hidden():
+    matcher = padded("frieren", "frie")
+    assert matcher.any_in("sousou no frie")
+    assert matcher.any_in("sousou no frieren")
+
+def test_empty_and_duplicate_keywords():
+    matcher = KeywordMatcher(["", None, "AAC", "aac"])
+    assert matcher.keywords == ("aac",)
+    assert not KeywordMatcher([])
+
+def test_lookahead_tags():
+    assert lookahead_tags(r"(?=.*LoliHouse)(?=.*1080p)") == ["LoliHouse", "1080p"]
+    assert lookahead_tags(r"(?=.*Up to 21°C)(?=.*\[1080p\])") == ["Up to 21°C", "[1080p]"]
+    assert lookahead_tags(r"(?=.*\d+)") is None  # Escapes with a regex meaning stay a regex
+    assert lookahead_tags(r"(?=.*1080p).*Frieren") is None
+    assert lookahead_tags(r"Frieren(?=.*1080p)") is None
+    assert lookahead_tags(r"(?=.*720p|1080p)") is None
+    assert lookahead_tags("") is None
+
+def test_parse_resolution():
+    assert parse_resolution(TITLE) == "1080p"
+    assert parse_resolution("[GJ.Y] Dungeon Meshi - 03 (NF 3840x2160 HEVC E-AC-3 MKV)") == "2160p"
+    assert parse_resolution("【幻樱字幕组】【GB_MP4】【1280X720】") == "720p"
+    assert parse_resolution("[SubsPlease] Sousou no Frieren - 05 (4K) [0FA0D2E1].mkv") == "2160p"
+    assert parse_resolution("[Billion Meta Lab] SPY×FAMILY S02 [10][1080][HEVC 10bit]") is None
+    assert parse_resolution("1080") is None
+    assert parse_resolution(None) is None
+
+def test_filter_matches():
+    keywords = SubscriptionFilter(None, ["1080P", "简繁"], ["合集"])
+    assert keywords.matches(TITLE)
+    assert not keywords.matches(TITLE + "[合集]")
+
+    tags = SubscriptionFilter(r"(?=.*LoliHouse)(?=.*1080p)")
+    assert tags.regex is None and tags.include.keywords == ("lolihouse", "1080p")
+    assert tags.matches(TITLE)
+    assert not tags.matches(TITLE.replace("LoliHouse", "ANi"))
+
+    episodes = SubscriptionFilter(r"- 0[1-5] ")
+    assert episodes.matches(TITLE)
+    assert not episodes.matches(TITLE.replace("- 05", "- 06"))
+
+def test_filter_resolution():
+    wanted = SubscriptionFilter(resolution="1080P")
+    assert wanted.matches(TITLE)
+    assert not wanted.matches(TITLE.replace("1080p", "720p"))
+    # Titles without a recognizable resolution are kept
+    assert wanted.matches("[ANi] 葬送的芙莉莲 - 05 [Baha][WEB-DL][CHT][MP4]")
+
+def test_invalid_regex_matches_nothing():
+    invalid = SubscriptionFilter("[1080p")
+    assert invalid.invalid
+    assert not invalid.matches(TITLE)
+
+def test_cache_rebuilds_on_change():
+    cache = SubscriptionFilterCache()
+    sub = SimpleNamespace(id=1, filter_regex=None, filter_keywords=["1080p"], exclude_keywords=[], filter_resolution=None)
+    first = cache.get(sub)
+    assert cache.get(sub) is first
+    sub.exclude_keywords = ["内封"]
+    assert cache.get(sub) is not first
+    assert not cache.get(sub).matches(TITLE)
+    cache.invalidate(1)
+    assert cache.get(sub) is not first
@@ -9,10 +9,11 @@ export function scanLibrary() {
   })
 }
 
-export function getLibraryItems() {
+export function getLibraryItems(params) {
   return request({
     url: '/library/items',
-    method: 'get'
+    method: 'get',
+    params
   })
 }
 